@@ -29,8 +29,15 @@ specific language governing rights and limitations under the License.
 # IMPORT (Python Standard Library)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+import hashlib
+import http.server
 import os
+import random
+import socketserver
 import subprocess
+import tempfile
+import threading
+import time
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # CONST
@@ -38,6 +45,21 @@ import subprocess
 
 TRANSLATION_FLD = 'i18n'
 
+BENCHMARK_PLUGINS = 1000 # generated plugins ...
+BENCHMARK_RELEASES = 10 # ... with releases each ...
+BENCHMARK_DEPENDENCIES = 4 # ... with up to this many dependencies each
+BENCHMARK_REQUESTS = 20 # resolved plugin sets ...
+BENCHMARK_REQUEST_SIZE = 10 # ... of this many plugins each
+
+CHECK_MIRROR_DELAY = 0.3 # seconds, slow mirror
+CHECK_ARCHIVE_SIZE = 256 * 1024 # bytes, i.e. throughput is measured
+CHECK_INDEX = (
+    b'<?xml version="1.0"?><plugins><pyqgis_plugin name="foo" version="1.0" plugin_id="1">'
+    b'<version>1.0</version><file_name>foo.1.0.zip</file_name><qgis_minimum_version>3.0</qgis_minimum_version>'
+    b'<description>-</description><about>-</about><author_name>-</author_name><email>-</email>'
+    b'<repository>-</repository></pyqgis_plugin></plugins>'
+    )
+
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # "PUBLIC" API
@@ -55,10 +77,230 @@ def translate():
     os.remove(tmpProFileName)
 
 
+def check():
+    "Regression checks, runnable without QGIS"
+
+    _checkResolver_()
+    _checkMirrors_()
+
+
+def benchmark(seed = 0):
+    "Dependency resolver against generated dependency graphs"
+
+    from qgist.pluginmanager.dtype_resolver import dtype_resolver_class
+    from qgist.pluginmanager.error import QgistDependencyError
+
+    rnd = random.Random(seed)
+    plugins = _genBenchmarkPlugins_(rnd)
+    print('%d plugins, %d releases' % (len(plugins), len(plugins) * BENCHMARK_RELEASES))
+
+    solved, failed, durations = 0, 0, []
+    for _ in range(BENCHMARK_REQUESTS):
+        requirements = rnd.sample(sorted(plugins.keys()), BENCHMARK_REQUEST_SIZE)
+        resolver = dtype_resolver_class(plugins, allow_experimental = True, allow_deprecated = True)
+        start = time.perf_counter()
+        try:
+            solution = resolver.resolve(requirements)
+            solved += 1
+        except QgistDependencyError:
+            solution = {}
+            failed += 1
+        durations.append(time.perf_counter() - start)
+        print('%3d requested -> %4d resolved in %8.2f ms' % (len(requirements), len(solution), durations[-1] * 1000))
+
+    durations.sort()
+    print('solved %d, unsatisfiable %d, median %.2f ms, max %.2f ms' % (
+        solved, failed, durations[len(durations) // 2] * 1000, durations[-1] * 1000,
+        ))
+
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # INTERNAL ROUTINES
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+def _checkResolver_():
+
+    from qgist.pluginmanager.dtype_resolver import dtype_resolver_class
+    from qgist.pluginmanager.error import QgistDependencyError
+
+    # nogoods learned under one set of root requirements must not prune solutions of the next one
+    plugins = _getCheckPlugins_({
+        'x': {'1.0': [], '2.0': ['y>=1.0']},
+        'y': {'0.1': [], '0.2': [], '0.3': [], '1.0': []},
+        })
+    resolver = dtype_resolver_class(plugins)
+    _checkEqual_('resolver: x, y<1.0', _getVersions_(resolver.resolve(['x', 'y<1.0'])), {'x': '1.0', 'y': '0.3'})
+    _checkEqual_('resolver: x after x, y<1.0', _getVersions_(resolver.resolve(['x'])), {'x': '2.0', 'y': '1.0'})
+
+    # requirements of installed plugins hold unless they are replaced
+    plugins = _getCheckPlugins_({
+        'alpha': {'1.0': [], '1.1': []},
+        'beta': {'1.0': ['Alpha>=1.1'], '2.0': []},
+        }, installed = {'alpha': '1.1', 'beta': '1.0'}, names = {'alpha': 'Alpha'})
+    try:
+        dtype_resolver_class(plugins).get_plan(['alpha==1.0'])
+    except QgistDependencyError:
+        print('ok: resolver: alpha==1.0 with installed beta 1.0 is refused')
+    else:
+        raise AssertionError('resolver: alpha==1.0 with installed beta 1.0 must be refused')
+    plan = dtype_resolver_class(plugins).get_plan(['alpha==1.0', 'beta==2.0'])
+    _checkEqual_('resolver: alpha==1.0, beta==2.0', _getVersions_(plan['upgrade']), {'alpha': '1.0', 'beta': '2.0'})
+
+def _checkMirrors_():
+    "Failover and ranking against local HTTP servers with injected delays and failures"
+
+    from qgist.pluginmanager.backends.qgis.dtype_repository import dtype_repository_class
+    from qgist.pluginmanager.dtype_archive_cache import dtype_archive_cache_class
+    from qgist.pluginmanager.dtype_mirrors import dtype_mirrors_class
+    from qgist.pluginmanager.error import QgistRepoError
+
+    archive = random.Random(0).getrandbits(8 * CHECK_ARCHIVE_SIZE).to_bytes(CHECK_ARCHIVE_SIZE, 'little')
+    servers = {
+        failure: _startCheckServer_(archive, failure)
+        for failure in ('ok', 'slow', 'error', 'drop', 'broken', 'corrupt')
+        }
+    urls = {failure: 'http://%s:%d/repo/plugins.xml' % server.server_address for failure, server in servers.items()}
+    parse = lambda content: list(dtype_repository_class._get_releases_from_xml(content))
+
+    try:
+
+        for failure in ('error', 'drop', 'broken'):
+            mirrors = dtype_mirrors_class((urls[failure], urls['ok']))
+            releases = mirrors.get_content(parse = parse)
+            _checkEqual_('mirrors: fail over from %s' % failure, (
+                [release.id for release in releases], mirrors.stats[urls[failure]]['failures'],
+                ), (['foo'], 1))
+            _checkEqual_('mirrors: %s ranked last' % failure, mirrors.get_candidates()[-1][0], urls[failure])
+
+        mirrors = dtype_mirrors_class((urls['error'], urls['broken']))
+        try:
+            mirrors.get_content(parse = parse)
+        except QgistRepoError:
+            print('ok: mirrors: all failing mirrors are refused')
+        else:
+            raise AssertionError('mirrors: all failing mirrors must be refused')
+
+        mirrors = dtype_mirrors_class((urls['slow'], urls['ok']))
+        mirrors.probe()
+        _checkEqual_('mirrors: slow mirror ranked last', [mirror for mirror, _ in mirrors.get_candidates()], [urls['ok'], urls['slow']])
+        mirrors.get_content(parse = parse) # from fastest mirror, slow one stays last
+        _checkEqual_('mirrors: slow mirror still ranked last', mirrors.get_candidates()[-1][0], urls['slow'])
+
+        mirrors = dtype_mirrors_class((urls['slow'], urls['ok']))
+        mirrors.record_success(urls['slow'], 0.3) # probed only, higher latency
+        mirrors.record_success(urls['ok'], 0.1, size = 1024 * 1024, duration = 0.5)
+        _checkEqual_('mirrors: probed-only mirror ranked by median throughput', mirrors.get_candidates()[0][0], urls['ok'])
+
+        mirrors = dtype_mirrors_class((urls['corrupt'], urls['drop'], urls['ok']))
+        archive_url = urls['corrupt'].replace('plugins.xml', 'foo.1.0.zip')
+        with tempfile.TemporaryDirectory() as cache_fld:
+            cache = dtype_archive_cache_class(cache_fld)
+            path = cache.fetch(archive_url, sha256 = hashlib.sha256(archive).hexdigest(), size = len(archive), mirrors = mirrors)
+            with open(path, 'rb') as f:
+                _checkEqual_('mirrors: archive from working mirror, cached by canonical URL', (
+                    f.read() == archive, cache.get(archive_url) == path, mirrors.stats[urls['ok']]['throughput'] is not None,
+                    ), (True, True, True))
+
+    finally:
+        for server in servers.values():
+            server.shutdown()
+            server.server_close()
+
+def _startCheckServer_(archive, failure):
+    "Serves CHECK_INDEX and (below the same folder) archive, with failure injected"
+
+    class handler(http.server.BaseHTTPRequestHandler):
+
+        def do_HEAD(self):
+            self._respond(body = False)
+
+        def do_GET(self):
+            self._respond(body = True)
+
+        def log_message(self, *args):
+            pass
+
+        def _respond(self, body):
+            if failure == 'slow':
+                time.sleep(CHECK_MIRROR_DELAY)
+            if failure == 'error':
+                self.send_response(500)
+                self.end_headers()
+                return
+            content = archive if self.path.endswith('.zip') else CHECK_INDEX
+            if failure == 'broken' and not self.path.endswith('.zip'):
+                content = content[:len(content) // 2]
+            if failure == 'corrupt' and self.path.endswith('.zip'):
+                content = bytes(len(content))
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            if not body:
+                return
+            if failure == 'drop': # connection breaks off mid-body
+                self.wfile.write(content[:len(content) // 2])
+                self.wfile.flush()
+                self.close_connection = True
+                return
+            self.wfile.write(content)
+
+    class server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+        daemon_threads = True
+
+    check_server = server(('127.0.0.1', 0), handler)
+    threading.Thread(target = check_server.serve_forever, daemon = True).start()
+
+    return check_server
+
+def _checkEqual_(name, actual, expected):
+
+    if actual != expected:
+        raise AssertionError('%s: expected %r, got %r' % (name, expected, actual))
+    print('ok: %s' % name)
+
+def _getVersions_(releases):
+
+    return {plugin_id: release.version.original for plugin_id, release in releases.items()}
+
+def _getCheckPlugins_(spec, installed = None, names = None):
+    "Plugins from {plugin id: {version: [requirement, ...]}}, installed versions by plugin id"
+
+    from qgist.pluginmanager.dtype_plugin import dtype_plugin_class
+
+    installed = {} if installed is None else installed
+    names = {} if names is None else names
+
+    plugins = {}
+    for index, (plugin_id, versions) in enumerate(sorted(spec.items())):
+        releases = [
+            _getRelease_(plugin_id, names.get(plugin_id, plugin_id), index, version, dependencies)
+            for version, dependencies in versions.items()
+            ]
+        installed_release = [release for release in releases if release.version.original == installed.get(plugin_id, None)]
+        plugins[plugin_id] = dtype_plugin_class(
+            plugin_id = plugin_id,
+            installed = len(installed_release) > 0,
+            installed_release = installed_release[0] if len(installed_release) > 0 else None,
+            available_releases = releases,
+            protected = False,
+            active = False,
+            deprecated = False,
+            )
+
+    return plugins
+
+def _getRelease_(plugin_id, name, index, version, dependencies):
+
+    from qgist.pluginmanager.backends.qgis.dtype_pluginrelease import dtype_pluginrelease_class
+
+    return dtype_pluginrelease_class.from_xmldict({
+        '@name': name, '@version': version, '@plugin_id': str(index),
+        'version': version, 'file_name': '%s.%s.zip' % (plugin_id, version),
+        'qgis_minimum_version': '3.0', 'description': '-', 'about': '-',
+        'author_name': '-', 'email': '-', 'repository': '-',
+        'plugin_dependencies': ','.join(dependencies) if len(dependencies) > 0 else None,
+        })
+
 def _genQgistPythonFiles_():
 
     for path, _, filesList in os.walk('qgist'):
@@ -80,6 +322,38 @@ def _genQgistTranslationFiles_():
             continue
         yield translationPath
 
+def _genBenchmarkPlugins_(rnd):
+    "Plugins depend on plugins with higher index only, i.e. the dependency graph has no cycles"
+
+    from qgist.pluginmanager.backends.qgis.dtype_pluginrelease import dtype_pluginrelease_class
+    from qgist.pluginmanager.dtype_plugin import dtype_plugin_class
+
+    plugins = {}
+    for index in range(BENCHMARK_PLUGINS):
+        plugin_id = 'plugin%04d' % index
+        releases = []
+        for minor in range(BENCHMARK_RELEASES):
+            version = '1.%d' % minor
+            dependencies = [
+                'plugin%04d%s' % (dep_index, rnd.choice(('', '>=1.%d' % rnd.randrange(BENCHMARK_RELEASES), '<1.%d' % rnd.randrange(1, BENCHMARK_RELEASES))))
+                for dep_index in sorted(rnd.sample(
+                    range(index + 1, BENCHMARK_PLUGINS), min(rnd.randrange(BENCHMARK_DEPENDENCIES + 1), BENCHMARK_PLUGINS - index - 1)
+                    ))
+                ]
+            releases.append(dtype_pluginrelease_class.from_xmldict({
+                '@name': plugin_id, '@version': version, '@plugin_id': str(index),
+                'version': version, 'file_name': '%s.%s.zip' % (plugin_id, version),
+                'qgis_minimum_version': '3.0', 'description': '-', 'about': '-',
+                'author_name': '-', 'email': '-', 'repository': '-',
+                'plugin_dependencies': ','.join(dependencies) if len(dependencies) > 0 else None,
+                }))
+        plugin = dtype_plugin_class.from_release(releases[0])
+        for release in releases[1:]:
+            plugin.add_release(release)
+        plugins[plugin_id] = plugin
+
+    return plugins
+
 def _runCommand_(commandList):
 
     proc = subprocess.Popen(
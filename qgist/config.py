@@ -33,13 +33,6 @@ import json
 import os
 
 
-# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-# IMPORT (QGIS)
-# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-
-from qgis.core import QgsApplication
-
-
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # IMPORT (Internal)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -61,9 +54,14 @@ from .util import tr
 # ROUTINES
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-def get_config_path():
+def get_config_path(root_fld = None):
+
+    if not isinstance(root_fld, str) and root_fld is not None:
+        raise QgistTypeError(tr('"root_fld" must be a str or None.'))
 
-    root_fld = QgsApplication.qgisSettingsDirPath()
+    if root_fld is None:
+        from qgis.core import QgsApplication # only required here, keeps config_class usable without QGIS
+        root_fld = QgsApplication.qgisSettingsDirPath()
     if os.path.exists(root_fld) and not os.path.isdir(root_fld):
         raise QgistValueError(tr('QGIS settings path does not point to a directory.'))
     if not os.path.exists(root_fld):
@@ -30,14 +30,6 @@ specific language governing rights and limitations under the License.
 
 import traceback
 
-# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-# IMPORT (External Dependencies)
-# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-
-from PyQt5.Qt import QWidget
-from PyQt5.QtWidgets import QMessageBox
-
-
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # IMPORT (Internal)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -60,6 +52,11 @@ def msg_warning(exception, widget = None):
 
 def _msg(msg_type, msg_title, exception, widget = None):
 
+    from PyQt5.QtWidgets import ( # Qt is only imported once a message actually needs to be shown
+        QMessageBox,
+        QWidget,
+        )
+
     if not isinstance(exception, Exception):
         raise QgistTypeError(tr('"exception" must be of type Exception'), 'msg')
     if not isinstance(widget, QWidget) and widget is not None:
@@ -142,7 +142,7 @@ class _backend:
         if self.module_loaded:
             return
 
-        self._module = importlib.import_module('pluginmanager.qgist.pluginmanager.backends.%s' % self._name)
+        self._module = importlib.import_module('.%s' % self._name, package = __package__)
 
     def keys(self):
         "provides access to backend meta data dict keys"
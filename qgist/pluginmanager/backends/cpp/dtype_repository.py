@@ -52,6 +52,10 @@ class dtype_repository_class(dtype_repository_base_class):
 
     _repo_type = REPO_BACKEND_QGISLEGACYCPP
 
+    def refresh(self, qgis_version = None):
+
+        pass # C++ plugins ship with QGIS, there is no remote source
+
     @classmethod
     def find_plugins(cls, config, protected, plugin_modules):
 
@@ -71,7 +75,6 @@ class dtype_repository_class(dtype_repository_base_class):
             name = name,
             active = True,
             protected = True,
-            repository_type = cls._repo_type,
             plugin_releases = list(),
             config_group = config.get_group(CONFIG_GROUP_MANAGER_REPOS).get_group(repo_id),
             )
@@ -32,18 +32,7 @@ import glob
 import os
 import random
 import sys
-
-# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-# IMPORT (QGIS)
-# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-
-from qgis.core import QgsApplication
-
-# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-# IMPORT (External)
-# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-
-# import xmltodict
+import time
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # IMPORT (Internal)
@@ -54,19 +43,24 @@ from .dtype_pluginrelease import dtype_pluginrelease_class
 from ...const import (
     CONFIG_DELIMITER,
     CONFIG_KEY_CACHE,
+    CONFIG_KEY_MIRRORS,
+    CONFIG_KEY_REFRESH_LAST,
     CONFIG_GROUP_QGISLEGACY_REPOS,
     REPO_DEFAULT_URL,
     REPO_BACKEND_QGISLEGACYPYTHON,
     )
 from ...error import (
     QgistNotADirectoryError,
+    QgistRepoError,
     )
+from ...dtype_mirrors import dtype_mirrors_class
 from ...dtype_plugin import dtype_plugin_class
 from ...dtype_repository_base import dtype_repository_base_class
 from ...dtype_settings import (
     dtype_settings_group_class,
     dtype_settings_class,
     )
+from ...dtype_version import dtype_version_class
 
 from ....error import (
     QgistTypeError,
@@ -91,7 +85,7 @@ class dtype_repository_class(dtype_repository_base_class):
     _repo_type = REPO_BACKEND_QGISLEGACYPYTHON
 
     def __init__(self, *args,
-        valid = None, authcfg = None, url = None,
+        valid = None, authcfg = None, url = None, mirrors = None,
         **kwargs,
         ):
 
@@ -105,10 +99,15 @@ class dtype_repository_class(dtype_repository_base_class):
             raise QgistTypeError(tr('"url" must be str'))
         if not url.lower().startswith('http://') and not url.lower().startswith('https://'):
             raise QgistValueError(tr(''))
+        if mirrors is None:
+            mirrors = tuple()
+        if not isinstance(mirrors, list) and not isinstance(mirrors, tuple):
+            raise QgistTypeError(tr('"mirrors" must be a list, tuple or None'))
 
         self._valid = valid # TODO Appears to be meaningless!?
         self._url = url
         self._authcfg = authcfg
+        self._mirrors = dtype_mirrors_class((url, *(mirror for mirror in mirrors if mirror != url)))
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # SPECIAL PROPERTIES (ONLY THIS REPO TYPE)
@@ -118,10 +117,87 @@ class dtype_repository_class(dtype_repository_base_class):
     def url(self):
         return self._url
 
+    @property
+    def mirrors(self):
+        return self._mirrors
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# MANAGEMENT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def refresh(self, qgis_version = None):
+        "Refresh index, i.e. fetch plugins.xml from remote source and update cache in config"
+
+        self.apply_fetched(self.fetch(qgis_version = qgis_version))
+
+    def fetch(self, qgis_version = None):
+        "Fetch and parse plugins.xml from fastest working mirror, returns list of releases - repo and config are not touched"
+
+        if not isinstance(qgis_version, dtype_version_class) and qgis_version is not None:
+            raise QgistTypeError(tr('"qgis_version" must be a version or None.'))
+
+        params = {} if qgis_version is None else {'qgis': f'{qgis_version[0]:s}.{qgis_version[1]:s}'}
+
+        if len(self._mirrors) > 1:
+            self._mirrors.probe() # mirrors never used before, i.e. the fastest one is known
+
+        return self._mirrors.get_content( # TODO authcfg
+            params = params,
+            parse = lambda content: list(self._get_releases_from_xml(content)), # broken index: next mirror
+            )
+
+    def apply_fetched(self, fetched):
+        "Replace releases by result of `fetch` and update cache in config"
+
+        if not isinstance(fetched, list):
+            raise QgistTypeError(tr('"fetched" must be a list.'))
+        if not all((isinstance(release, dtype_pluginrelease_class) for release in fetched)):
+            raise QgistTypeError(tr('All fetched releases must be plugin releases.'))
+
+        self._plugin_releases = fetched
+
+        self._save_to_config()
+        self._config_group[CONFIG_KEY_CACHE] = self.dump_releases()
+        self._config_group[CONFIG_KEY_REFRESH_LAST] = str(int(time.time())) # QgsSettings keep str
+
+    def dump_releases(self):
+        "Releases as compressed str, like cache in config"
+
+        return dtype_settings_class.dump([
+            release.meta.as_config_decompressed() for release in self._plugin_releases
+            ])
+
+    def load_releases(self, releases_dumped):
+        "Replace releases by compressed str from `dump_releases` (in memory only, config is not touched)"
+
+        if not isinstance(releases_dumped, str):
+            raise QgistTypeError(tr('"releases_dumped" must be a str'))
+
+        self._plugin_releases = list(self._get_releases_from_dump(releases_dumped))
+
+    def _save_to_config(self):
+
+        self._config_group['url'] = self._url
+        self._config_group[CONFIG_KEY_MIRRORS] = list(self._mirrors.urls[1:])
+        self._config_group['authcfg'] = self._authcfg
+        self._config_group['enabled'] = dtype_settings_class.bool_to_str(self._active)
+        self._config_group['valid'] = dtype_settings_class.bool_to_str(self._valid)
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # HELPER
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+    @staticmethod
+    def _get_mirrors_from_config(config_group):
+
+        mirrors = config_group.get(CONFIG_KEY_MIRRORS, [])
+        if isinstance(mirrors, str): # QgsSettings turn one-item lists into str
+            mirrors = [mirrors]
+        if not isinstance(mirrors, list):
+            return []
+
+        return [mirror for mirror in mirrors if isinstance(mirror, str) and len(mirror.strip()) > 0]
+
     @classmethod
     def _get_releases_from_config_cache(cls, config_group):
 
@@ -132,6 +208,11 @@ class dtype_repository_class(dtype_repository_base_class):
         if repo_cache_compressed is None:
             return tuple()
 
+        return cls._get_releases_from_dump(repo_cache_compressed)
+
+    @classmethod
+    def _get_releases_from_dump(cls, repo_cache_compressed):
+
         repo_cache_decompressed = dtype_settings_class.load(repo_cache_compressed)
 
         return (
@@ -139,6 +220,32 @@ class dtype_repository_class(dtype_repository_base_class):
             for release_config_dict in repo_cache_decompressed
             )
 
+    @classmethod
+    def _get_releases_from_xml(cls, xml_raw):
+
+        if not isinstance(xml_raw, bytes) and not isinstance(xml_raw, str):
+            raise QgistTypeError(tr('"xml_raw" must be bytes or str'))
+
+        import xmltodict # only required when talking to remote sources
+
+        try:
+            xml_tree = xmltodict.parse(xml_raw)
+        except Exception as e:
+            raise QgistRepoError(tr('Repository index is not valid XML') + f': {str(e):s}')
+
+        xml_dicts = (xml_tree.get('plugins', None) or {}).get('pyqgis_plugin', [])
+        if not isinstance(xml_dicts, list): # only one plugin in repository
+            xml_dicts = [xml_dicts]
+
+        releases = []
+        for xml_dict in xml_dicts:
+            try:
+                releases.append(dtype_pluginrelease_class.from_xmldict(xml_dict))
+            except (KeyError, IndexError, QgistTypeError, QgistValueError): # like QGIS, skip broken entries
+                continue
+
+        return (release for release in releases)
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # CLASS-LEVEL API (ALL REPO TYPES)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -174,14 +281,9 @@ class dtype_repository_class(dtype_repository_base_class):
         if not all((isinstance(plugin_id, str) for plugin_id in plugin_modules.keys())):
             raise QgistTypeError(tr('Every plugin_id in "plugin_modules" must be str'))
 
-        if protected:
-            plugin_paths = (_get_python_path(),)
-        else:
-            plugin_paths = (*_get_extra_plugins_paths(), _get_home_python_path())
-
         plugins = []
 
-        for plugin_path in plugin_paths:
+        for plugin_path in cls.get_plugin_paths(config, protected):
             for entry in glob.glob(plugin_path + '/*'):
                 if not dtype_pluginrelease_class.is_python_plugin_dir(entry):
                     continue
@@ -191,6 +293,31 @@ class dtype_repository_class(dtype_repository_base_class):
 
         return (plugin for plugin in plugins)
 
+    @classmethod
+    def get_plugin_paths(cls, config, protected):
+        "Protected: QGIS' own plugin folder. Otherwise: `QGIS_PLUGINPATH` and user's plugin folder of profile"
+
+        if not isinstance(config, dtype_settings_class):
+            raise QgistTypeError(tr('"config" must be a "dtype_settings_class" object.'))
+        if not isinstance(protected, bool):
+            raise QgistTypeError(tr('"protected" must be a bool'))
+
+        if protected:
+            plugin_paths = (_get_python_path(),)
+        else:
+            plugin_paths = (*_get_extra_plugins_paths(), _get_home_python_path(config))
+
+        return tuple(plugin_path for plugin_path in plugin_paths if plugin_path is not None)
+
+    @classmethod
+    def get_install_path(cls, config):
+        "User's plugin folder of profile"
+
+        if not isinstance(config, dtype_settings_class):
+            raise QgistTypeError(tr('"config" must be a "dtype_settings_class" object.'))
+
+        return _get_home_python_path(config)
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # PRE-CONSTRUCTOR
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -237,6 +364,7 @@ class dtype_repository_class(dtype_repository_base_class):
             valid = config_group.settings.str_to_bool(config_group.get('valid', 'true')),
             authcfg = config_group['authcfg'],
             url = config_group['url'],
+            mirrors = cls._get_mirrors_from_config(config_group),
             )
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -245,6 +373,11 @@ class dtype_repository_class(dtype_repository_base_class):
 
 def _get_python_path():
 
+    try:
+        from qgis.core import QgsApplication
+    except ModuleNotFoundError: # headless, there is no QGIS installation to look at
+        return None
+
     root_fld = (
         QgsApplication.buildOutputPath()
         if QgsApplication.isRunningFromBuildDir() else
@@ -253,9 +386,9 @@ def _get_python_path():
 
     return os.path.abspath(os.path.join(root_fld, 'python', 'plugins'))
 
-def _get_home_python_path():
+def _get_home_python_path(config):
 
-    root_fld = QgsApplication.qgisSettingsDirPath()
+    root_fld = config.settings_dir
 
     if os.path.abspath(root_fld) == os.path.abspath(os.path.join(os.path.expanduser('~'), '.qgis3')):
         return os.path.abspath(os.path.join(os.path.expanduser('~'), '.qgis3', 'python', 'plugins'))
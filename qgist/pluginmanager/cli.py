@@ -0,0 +1,496 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/cli.py: Headless command line interface
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .const import (
+    ARCHIVE_CACHE_ENV,
+    CLI_EXIT_ERROR,
+    CLI_EXIT_OK,
+    CLI_EXIT_UPGRADABLE,
+    INSTALL_DOWNLOAD_JOBS,
+    )
+from .compatmatrix import get_compat_matrix
+from .dtype_archive_cache import dtype_archive_cache_class
+from .dtype_resolver import dtype_resolver_class
+from .dtype_searchindex import dtype_searchindex_class
+from .dtype_version import dtype_version_class
+from .error import QgistPluginManager_ALL_Errors
+from .loadstats import get_summary
+from .profiles import (
+    find_profiles,
+    get_profile_index,
+    sync_profiles,
+    )
+from .snapshots import (
+    get_changes,
+    get_snapshot,
+    )
+
+from ..config import config_class
+from ..error import (
+    Qgist_ALL_Errors,
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_ERRORS = (*Qgist_ALL_Errors, *QgistPluginManager_ALL_Errors)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES: ENTRY POINT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def main(argv = None):
+    "Command line entry point, returns exit code"
+
+    parser = _get_parser()
+    args = parser.parse_args(argv) # exits with CLI_EXIT_USAGE on bad arguments
+    if args.json and args.csv:
+        parser.error(tr('--json and --csv are mutually exclusive'))
+
+    if args.command == 'sync':
+        profile_flds = find_profiles(args.profiles)
+        if len(profile_flds) == 0:
+            parser.error(tr('no profile folders found'))
+        if args.profile is None: # reference profile for repositories
+            args.profile = profile_flds[0]
+    elif args.profile is None:
+        parser.error(tr('--profile is required'))
+
+    if args.cache_dir is not None: # inherited by sync worker processes, i.e. shared by all profiles
+        os.environ[ARCHIVE_CACHE_ENV] = os.path.abspath(args.cache_dir)
+
+    try:
+        index = get_profile_index(args.profile, args.qgis_version)
+        if args.refresh:
+            for error in index.refresh_repos().values(): # stale repos are no reason to stop
+                _print_error(error, args.json)
+        if args.command == 'sync':
+            result, exit_code = _command_sync(index, args, profile_flds)
+        else:
+            result, exit_code = _COMMANDS[args.command](index, args)
+    except _ERRORS as e:
+        _print_error(e, args.json)
+        return CLI_EXIT_ERROR
+
+    try:
+        _print_result(result, args.json, args.csv)
+        sys.stdout.flush()
+    except BrokenPipeError: # e.g. piped into head
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno()) # no second error when flushing at exit
+
+    return exit_code
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES: COMMANDS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _command_list(index, args):
+
+    if args.installed:
+        plugins = index.get_all_installed_plugins()
+    elif args.upgradable:
+        plugins = index.get_all_upgradable_plugins()
+    else:
+        plugins = index.plugins
+
+    return [_plugin_to_dict(index, plugin) for plugin in _sorted(plugins)], CLI_EXIT_OK
+
+def _command_search(index, args):
+    "Ranked full-text search over meta data, best matches first"
+
+    return [
+        {**_plugin_to_dict(index, index.get_plugin(plugin_id)), 'score': score}
+        for plugin_id, score in dtype_searchindex_class(index).search(args.query)
+        ], CLI_EXIT_OK
+
+def _command_refresh(index, args):
+    "Fetch repositories, report new plugins, new versions and removed releases"
+
+    before = get_snapshot(index)
+    errors = index.refresh_repos()
+    for error in errors.values(): # like --refresh, changes of other repos are still reported
+        _print_error(error, args.json)
+
+    return get_changes(before, get_snapshot(index)), CLI_EXIT_ERROR if len(errors) > 0 else CLI_EXIT_OK
+
+def _command_check(index, args):
+
+    result = [_plugin_to_dict(index, plugin) for plugin in _sorted(index.get_all_upgradable_plugins())]
+
+    return result, CLI_EXIT_UPGRADABLE if len(result) > 0 else CLI_EXIT_OK
+
+def _command_install(index, args):
+    "Installs requested plugins and their dependencies, upgrades installed dependencies if required"
+
+    plan = dtype_resolver_class.from_index(index).get_plan(args.requirements)
+    releases = [*plan['install'].values(), *plan['upgrade'].values()]
+
+    errors = index.install_releases(releases, jobs = args.jobs, dry_run = args.dry_run)
+
+    return _get_install_result([release.id for release in releases], errors)
+
+def _command_upgrade(index, args):
+
+    plugin_ids = (
+        [plugin.id for plugin in index.get_all_upgradable_plugins()]
+        if args.all else args.plugin_ids
+        )
+
+    return _upgrade_plugins(index, plugin_ids, jobs = args.jobs, dry_run = args.dry_run)
+
+def _command_uninstall(index, args):
+
+    plugin_ids, errors = [], {}
+
+    for plugin_id in args.plugin_ids:
+        try:
+            plugin = index.get_plugin(plugin_id)
+            if not plugin.installed:
+                raise QgistValueError(tr('plugin is not installed'))
+            if plugin.protected:
+                raise QgistValueError(tr('plugin is protected'))
+        except _ERRORS as e:
+            errors[plugin_id] = e
+            continue
+        plugin_ids.append(plugin_id)
+
+    errors.update(index.uninstall_plugins(plugin_ids, dry_run = args.dry_run))
+
+    return _get_install_result(args.plugin_ids, errors)
+
+def _command_sync(index, args, profile_flds):
+
+    desired = config_class.import_config(args.desired)
+    if not isinstance(desired, dict):
+        raise QgistTypeError(tr('Desired plugin set must be a JSON object of plugin ids and versions (or null).'))
+
+    result = sync_profiles(
+        profile_flds, desired,
+        repos_dumped = index.dump_repos(), # fetched once, shared by all profiles
+        qgis_version_str = args.qgis_version,
+        apply = args.apply,
+        jobs = args.jobs,
+        )
+
+    if any((len(item['errors']) > 0 for item in result)):
+        return result, CLI_EXIT_ERROR
+    if not args.apply and any((len(item['targets']) > 0 for item in result)):
+        return result, CLI_EXIT_UPGRADABLE
+    return result, CLI_EXIT_OK
+
+def _command_matrix(index, args):
+    "Latest compatible release of every plugin per QGIS version, for planning QGIS upgrades"
+
+    qgis_versions = [
+        dtype_version_class.from_qgisversion(qgis_version_str, fix_plugin_compatibility = True)
+        for qgis_version_str in args.qgis_versions
+        ]
+
+    return get_compat_matrix(
+        index, qgis_versions,
+        allow_experimental = not args.no_experimental,
+        allow_deprecated = not args.no_deprecated,
+        ), CLI_EXIT_OK
+
+def _command_cache(index, args):
+
+    cache = dtype_archive_cache_class.from_config(index.config)
+
+    if args.clear:
+        cache.clear()
+    elif args.evict:
+        cache.evict()
+
+    return [{
+        'path': cache.path,
+        'archives': len(cache),
+        'size': cache.size,
+        'max_size': cache.max_size,
+        }], CLI_EXIT_OK
+
+def _command_stats(index, args):
+    "Load statistics recorded inside QGIS: medians over recent loads or (`--history`) every load"
+
+    load_stats = index.get_load_stats()
+    plugin_ids = args.plugin_ids if len(args.plugin_ids) > 0 else sorted(load_stats.keys(), key = str.lower)
+
+    for plugin_id in plugin_ids:
+        index.get_plugin(plugin_id) # raises on unknown plugins
+
+    if args.history:
+        return [
+            {'id': plugin_id, **record}
+            for plugin_id in plugin_ids for record in load_stats.get(plugin_id, [])
+            ], CLI_EXIT_OK
+
+    result = [{'id': plugin_id, **get_summary(load_stats.get(plugin_id, []))} for plugin_id in plugin_ids]
+    result.sort(key = lambda item: item['total'] if item['total'] is not None else -1.0, reverse = True) # slowest first
+
+    return result, CLI_EXIT_OK
+
+def _upgrade_plugins(index, plugin_ids, jobs, dry_run):
+    "Install latest releases in one pipeline, skip current plugins, continue on failure - exit code reflects any failure"
+
+    releases, errors = [], {}
+
+    for plugin_id in plugin_ids:
+        try:
+            plugin = index.get_plugin(plugin_id)
+            if not plugin.installed:
+                raise QgistValueError(tr('plugin is not installed'))
+            if not index.is_upgradable(plugin_id): # already current, i.e. ok without doing anything
+                continue
+            release = index.get_latest_release(plugin_id)
+            if release is None:
+                raise QgistValueError(tr('No matching release'))
+        except _ERRORS as e:
+            errors[plugin_id] = e
+            continue
+        releases.append(release)
+
+    errors.update(index.install_releases(releases, jobs = jobs, dry_run = dry_run))
+
+    return _get_install_result(plugin_ids, errors)
+
+def _get_install_result(plugin_ids, errors):
+
+    result = [
+        {
+            'id': plugin_id,
+            'ok': plugin_id not in errors.keys(),
+            'error': _error_to_str(errors[plugin_id]) if plugin_id in errors.keys() else None,
+        }
+        for plugin_id in plugin_ids
+        ]
+
+    return result, CLI_EXIT_ERROR if len(errors) > 0 else CLI_EXIT_OK
+
+_COMMANDS = {
+    'list': _command_list,
+    'search': _command_search,
+    'refresh': _command_refresh,
+    'check': _command_check,
+    'install': _command_install,
+    'upgrade': _command_upgrade,
+    'uninstall': _command_uninstall,
+    'matrix': _command_matrix,
+    'cache': _command_cache,
+    'stats': _command_stats,
+    }
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES: HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _get_parser():
+
+    parser = argparse.ArgumentParser(
+        prog = 'pluginmanager',
+        description = tr('Manage QGIS plugins of a QGIS profile without starting QGIS'),
+        parents = [_get_output_parser()], # before the command ...
+        )
+    parser.add_argument(
+        '--profile', default = None,
+        help = tr('QGIS profile folder, i.e. QGIS settings folder (for "sync": reference profile for repositories)'),
+        )
+    parser.add_argument(
+        '--qgis-version', dest = 'qgis_version', default = None,
+        help = tr('QGIS version for compatibility checks, e.g. 3.16.0'),
+        )
+    parser.add_argument(
+        '--refresh', action = 'store_true',
+        help = tr('fetch repositories before running command'),
+        )
+    parser.add_argument(
+        '--cache-dir', dest = 'cache_dir', default = None,
+        help = tr('archive cache folder, shared by profiles (default: user cache folder)'),
+        )
+    parser.set_defaults(json = False, csv = False) # changes defaults of actions, i.e. not shared with commands
+
+    output = _get_output_parser() # ... and after it
+    commands = parser.add_subparsers(dest = 'command')
+    add_command = lambda name, **kwargs: commands.add_parser(name, parents = [output], **kwargs)
+    commands.required = True
+
+    command_list = add_command('list', help = tr('list plugins'))
+    command_list_filter = command_list.add_mutually_exclusive_group()
+    command_list_filter.add_argument('--installed', action = 'store_true')
+    command_list_filter.add_argument('--upgradable', action = 'store_true')
+
+    command_search = add_command('search', help = tr('search plugins'))
+    command_search.add_argument('query')
+
+    add_command('refresh', help = tr('fetch repositories and show what changed'))
+
+    add_command('check', help = tr('check for upgrades'))
+
+    command_install = add_command('install', help = tr('install plugins'))
+    command_install.add_argument(
+        'requirements', nargs = '+', metavar = 'requirement',
+        help = tr('plugin id, optionally with version, e.g. foo or foo>=1.2 - dependencies are installed too'),
+        )
+    command_install.add_argument('--jobs', type = int, default = INSTALL_DOWNLOAD_JOBS, help = tr('concurrent downloads'))
+    command_install.add_argument('--dry-run', dest = 'dry_run', action = 'store_true', help = tr('only check, change nothing'))
+
+    command_upgrade = add_command('upgrade', help = tr('upgrade plugins'))
+    command_upgrade_target = command_upgrade.add_mutually_exclusive_group(required = True)
+    command_upgrade_target.add_argument('plugin_ids', nargs = '*', metavar = 'plugin_id', default = [])
+    command_upgrade_target.add_argument('--all', action = 'store_true')
+    command_upgrade.add_argument('--jobs', type = int, default = INSTALL_DOWNLOAD_JOBS, help = tr('concurrent downloads'))
+    command_upgrade.add_argument('--dry-run', dest = 'dry_run', action = 'store_true', help = tr('only check, change nothing'))
+
+    command_uninstall = add_command('uninstall', help = tr('uninstall plugins'))
+    command_uninstall.add_argument('plugin_ids', nargs = '+', metavar = 'plugin_id')
+    command_uninstall.add_argument('--dry-run', dest = 'dry_run', action = 'store_true', help = tr('only check, change nothing'))
+
+    command_sync = add_command('sync', help = tr('sync many profiles with a desired plugin set'))
+    command_sync.add_argument(
+        '--desired', required = True,
+        help = tr('JSON file: object of plugin ids and versions, null for latest'),
+        )
+    command_sync.add_argument('--apply', action = 'store_true', help = tr('install and upgrade, otherwise only diff'))
+    command_sync.add_argument('--jobs', type = int, default = os.cpu_count() or 1, help = tr('parallel processes'))
+    command_sync.add_argument('profiles', nargs = '+', help = tr('profile folders, glob patterns allowed'))
+
+    command_matrix = add_command('matrix', help = tr('show latest compatible releases across QGIS versions'))
+    command_matrix.add_argument('qgis_versions', nargs = '+', metavar = 'qgis_version', help = tr('e.g. 3.16 3.22 3.28'))
+    command_matrix.add_argument('--no-experimental', dest = 'no_experimental', action = 'store_true', help = tr('ignore experimental releases'))
+    command_matrix.add_argument('--no-deprecated', dest = 'no_deprecated', action = 'store_true', help = tr('ignore deprecated releases'))
+
+    command_cache = add_command('cache', help = tr('show archive cache'))
+    command_cache_action = command_cache.add_mutually_exclusive_group()
+    command_cache_action.add_argument('--clear', action = 'store_true', help = tr('remove all archives'))
+    command_cache_action.add_argument('--evict', action = 'store_true', help = tr('shrink cache to its maximum size'))
+
+    command_stats = add_command('stats', help = tr('show plugin load times and memory, as recorded inside QGIS'))
+    command_stats.add_argument('plugin_ids', nargs = '*', metavar = 'plugin_id', default = [])
+    command_stats.add_argument('--history', action = 'store_true', help = tr('every recorded load instead of medians'))
+
+    return parser
+
+def _get_output_parser():
+    "Output flags of every command - not given flags are not set, i.e. flags given before the command are kept"
+
+    parser = argparse.ArgumentParser(add_help = False)
+
+    parser_output = parser.add_mutually_exclusive_group()
+    parser_output.add_argument(
+        '--json', action = 'store_true', default = argparse.SUPPRESS,
+        help = tr('machine readable output'),
+        )
+    parser_output.add_argument(
+        '--csv', action = 'store_true', default = argparse.SUPPRESS,
+        help = tr('CSV output, e.g. for spreadsheets'),
+        )
+
+    return parser
+
+def _sorted(plugins):
+
+    return sorted(plugins, key = lambda plugin: plugin.id.lower())
+
+def _plugin_to_dict(index, plugin):
+
+    latest_release = index.get_latest_release(plugin.id)
+
+    return {
+        'id': plugin.id,
+        'installed': plugin.installed,
+        'active': plugin.active,
+        'protected': plugin.protected,
+        'deprecated': plugin.deprecated,
+        'installed_version': plugin.installed_release.version.original if plugin.installed else None,
+        'latest_version': latest_release.version.original if latest_release is not None else None,
+        'upgradable': index.is_upgradable(plugin.id),
+        }
+
+def _error_to_str(exception):
+
+    return str(exception.args[0]) if len(exception.args) > 0 else type(exception).__name__
+
+def _print_error(exception, as_json):
+
+    if as_json:
+        print(json.dumps({
+            'error': type(exception).__name__,
+            'message': _error_to_str(exception),
+            }), file = sys.stderr)
+    else:
+        print(f'{type(exception).__name__:s}: {_error_to_str(exception):s}', file = sys.stderr)
+
+def _print_result(result, as_json, as_csv):
+
+    if as_json:
+        print(json.dumps(result, indent = 4))
+        return
+
+    if as_csv:
+        if len(result) > 0:
+            writer = csv.DictWriter(sys.stdout, fieldnames = list(result[0].keys()), extrasaction = 'ignore')
+            writer.writeheader()
+            writer.writerows(
+                {key: '' if value is None else _value_to_str(value) for key, value in item.items()}
+                for item in result
+                )
+        return
+
+    if len(result) == 0:
+        return
+
+    keys = list(result[0].keys())
+    print('\t'.join(keys))
+    for item in result:
+        print('\t'.join(_value_to_str(item[key]) for key in keys))
+
+def _value_to_str(value):
+
+    if value is None:
+        return '-'
+    if isinstance(value, list):
+        return ','.join(value) if len(value) > 0 else '-'
+    if isinstance(value, dict):
+        return ','.join(f'{k:s}={v:s}' for k, v in value.items()) if len(value) > 0 else '-'
+    if isinstance(value, float):
+        return f'{value:.4f}'
+    return str(value)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/compatmatrix.py: Compatibility matrix of plugins across QGIS versions
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .dtype_compatindex import dtype_compatindex_class
+from .dtype_index import dtype_index_class
+from .dtype_version import dtype_version_class
+
+from ..error import QgistTypeError
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def get_compat_matrix(index, qgis_versions, allow_experimental = True, allow_deprecated = True):
+    """
+    Latest compatible release of every plugin for every QGIS version, JSON-serializable
+    One row per plugin and QGIS version, plugins sorted by id, versions in given order.
+    `version` is None if no release is compatible. One interval index query per QGIS version,
+    i.e. releases are not evaluated per plugin and version.
+    """
+
+    if not isinstance(index, dtype_index_class):
+        raise QgistTypeError(tr('"index" must be a "dtype_index_class" object.'))
+    if not isinstance(qgis_versions, (list, tuple)):
+        raise QgistTypeError(tr('"qgis_versions" must be a list or tuple.'))
+    if not all((isinstance(qgis_version, dtype_version_class) for qgis_version in qgis_versions)):
+        raise QgistTypeError(tr('"qgis_versions" must only contain versions.'))
+
+    compatindex = dtype_compatindex_class(index)
+    try:
+        columns = [
+            compatindex.get_latest_releases(
+                qgis_version,
+                allow_experimental = allow_experimental,
+                allow_deprecated = allow_deprecated,
+                )
+            for qgis_version in qgis_versions
+            ]
+    finally:
+        compatindex.close()
+
+    return [
+        _get_row(plugin_id, qgis_version, column.get(plugin_id, None))
+        for plugin_id in sorted((plugin.id for plugin in index.plugins), key = str.lower)
+        for qgis_version, column in zip(qgis_versions, columns)
+        ]
+
+def _get_row(plugin_id, qgis_version, release):
+
+    return {
+        'id': plugin_id,
+        'qgis_version': qgis_version.original,
+        'version': release.version.original if release is not None else None,
+        'experimental': release.experimental if release is not None else None,
+        'deprecated': bool(release.meta['deprecated'].value) if release is not None else None,
+        }
@@ -32,6 +32,15 @@ CONFIG_FN = 'pluginmanager.json'
 PLUGIN_ICON_FN = 'pluginmanager.svg'
 PLUGIN_NAME = 'QgistPluginManager'
 
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# COMMAND LINE INTERFACE
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+CLI_EXIT_OK = 0
+CLI_EXIT_ERROR = 1
+CLI_EXIT_USAGE = 2 # argparse
+CLI_EXIT_UPGRADABLE = 100 # "check": upgrades are available, like `dnf check-update`
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # TYPE SPECS
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -42,6 +51,18 @@ CONFIG_KEY_ALLOW_DEPRECATED = 'app/plugin_installer/allowDeprecated' # TODO
 CONFIG_KEY_ALLOW_EXPERIMENTAL = 'app/plugin_installer/allowExperimental' # TODO
 
 CONFIG_KEY_CACHE = 'cache'
+CONFIG_KEY_REFRESH_INTERVAL = 'refresh_interval' # in config group of repo, seconds between background refreshes, 0 for never
+CONFIG_KEY_REFRESH_LAST = 'refresh_last' # in config group of repo, Unix time of last refresh
+CONFIG_KEY_MIRRORS = 'mirrors' # in config group of repo, list of further URLs serving the same repo
+CONFIG_KEY_ARCHIVE_CACHE_FLD = 'app/pluginmanager/archive_cache/folder'
+CONFIG_KEY_ARCHIVE_CACHE_SIZE = 'app/pluginmanager/archive_cache/max_size'
+CONFIG_KEY_ACTIVATION_PLUGINS = 'app/pluginmanager/activation/plugins' # list of plugin ids activated by the manager
+CONFIG_KEY_ACTIVATION_CRITICAL = 'app/pluginmanager/activation/critical' # list of plugin ids never deferred
+CONFIG_KEY_ACTIVATION_DEFER = 'app/pluginmanager/activation/defer'
+CONFIG_KEY_ACTIVATION_LAZY = 'app/pluginmanager/activation/lazy' # list of plugin ids activated on first use
+CONFIG_KEY_WATCH = 'app/pluginmanager/watch' # list of plugin ids hot-reloaded on changes (development)
+CONFIG_KEY_WATCH_PLUGIN_PATHS = 'app/pluginmanager/watch_plugin_paths' # update index on changes of plugin folders
+CONFIG_KEY_LOAD_STATS = 'app/pluginmanager/load_stats' # dict of lists of load records by plugin id
 
 CONFIG_GROUP_MANAGER_REPOS = 'app/pluginmanager/repositories' # TODO
 CONFIG_GROUP_QGISLEGACY_REPOS = 'app/plugin_repositories' # TODO
@@ -66,6 +87,40 @@ QGSSETTINGS_SPEC = {
         ]
     }
 
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PLUGIN LIST MODEL
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+PLUGINMODEL_PAGE_SIZE = 100 # rows materialized per `fetchMore`
+PLUGINMODEL_ROLES = ('plugin_id', 'version', 'installed', 'upgradable') # custom roles, from `Qt.UserRole` on
+PLUGINMODEL_SORT_KEYS = ('name', 'id', 'installed', 'upgradable')
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# FACETS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+FACETS = ('tag', 'category', 'experimental', 'deprecated', 'installed', 'upgradable', 'backend')
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# FULL-TEXT SEARCH
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+SEARCH_FIELDS = { # meta data field -> weight, i.e. a match in a name counts more than one in a description
+    'id': 3.0,
+    'name': 3.0,
+    'tags': 2.0,
+    'description': 1.5,
+    'author': 1.0,
+    'about': 1.0,
+    }
+SEARCH_BM25_K1 = 1.2 # term frequency saturation
+SEARCH_BM25_B = 0.75 # document length normalization
+SEARCH_PREFIX_WEIGHT = 0.8 # "geo" matches "geocoding", ranked below exact matches
+SEARCH_PREFIX_MAX_TERMS = 100 # expansions per query term, shortest terms first
+SEARCH_PREFIX_MIN_LENGTH = 2
+SEARCH_TYPO_WEIGHT = 0.6 # "raster" matches "rastr", one edit (insert, delete, replace, swap) at most
+SEARCH_TYPO_MIN_LENGTH = 4
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # REPO META
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -73,6 +128,99 @@ QGSSETTINGS_SPEC = {
 REPO_DEFAULT_URL = 'https://plugins.qgis.org/plugins/plugins.xml'
 REPO_BACKEND_QGISLEGACYPYTHON = 'qgis'
 REPO_BACKEND_QGISLEGACYCPP = 'cpp'
+REPO_FETCH_TIMEOUT = 30 # seconds
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# REPO MIRRORS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+MIRROR_EWMA_WEIGHT = 0.3 # weight of latest measurement in moving averages of latency and throughput
+MIRROR_MIN_SIZE = 64 * 1024 # bytes, smaller responses do not tell throughput
+MIRROR_PROBE_TIMEOUT = 5 # seconds, for measuring latency of mirrors never used before
+MIRROR_RETRY_AFTER = 5 * 60 # seconds, failed mirrors are tried last for this long
+MIRROR_SCORE_SIZE = 1024 * 1024 # bytes, mirrors are ranked by estimated time for this much data
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# REPO REFRESH
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+REFRESH_INTERVAL = 24 * 60 * 60 # seconds, default of repos without interval in config
+REFRESH_JITTER = 0.1 # +/- fraction of interval or backoff, spreads many clients over time
+REFRESH_STARTUP_SPREAD = 10 * 60 # seconds, repos overdue at start are refreshed at random within
+REFRESH_BACKOFF_MIN = 60 # seconds, after first failure, doubles with every further failure
+REFRESH_BACKOFF_MAX = 6 * 60 * 60 # seconds
+REFRESH_TICK = 5000 # milliseconds between checks for due repos
+REFRESH_JOBS = 2 # concurrent fetches
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ARCHIVE CACHE
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+ARCHIVE_CACHE_ENV = 'QGIST_PLUGINMANAGER_CACHE' # overrides folder from config, e.g. machine-wide cache
+ARCHIVE_CACHE_MAX_SIZE = 2 ** 30 # bytes
+ARCHIVE_CHUNK_SIZE = 2 ** 16 # bytes
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# INDEX STORE
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+INDEXSTORE_CACHED_STATEMENTS = 64 # prepared statements kept per connection
+INDEXSTORE_FN = 'index.sqlite' # next to config file
+INDEXSTORE_SCHEMA_VERSION = 1 # databases of other versions are recreated
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# INDEX EVENTS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+EVENT_PLUGIN_ADDED = 'plugin_added'
+EVENT_PLUGIN_REMOVED = 'plugin_removed'
+EVENT_PLUGIN_UPDATED = 'plugin_updated' # releases, installation or activation state changed
+EVENT_REPO_ADDED = 'repo_added'
+EVENT_REPO_REMOVED = 'repo_removed'
+EVENT_REPO_UPDATED = 'repo_updated' # releases changed, e.g. refresh
+EVENT_REPOS_REORDERED = 'repos_reordered' # target is None, value is tuple of repo ids by priority
+EVENT_FILTER_CHANGED = 'filter_changed' # target is filter name, e.g. "allow_experimental"
+EVENT_KINDS = (
+    EVENT_PLUGIN_ADDED, EVENT_PLUGIN_REMOVED, EVENT_PLUGIN_UPDATED,
+    EVENT_REPO_ADDED, EVENT_REPO_REMOVED, EVENT_REPO_UPDATED, EVENT_REPOS_REORDERED,
+    EVENT_FILTER_CHANGED,
+    )
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# INDEX CHANGES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+CHANGE_NEW_PLUGIN = 'new_plugin' # release of a plugin the repo did not have before
+CHANGE_NEW_VERSION = 'new_version'
+CHANGE_REMOVED_RELEASE = 'removed_release' # other releases of plugin remain in repo
+CHANGE_REMOVED_PLUGIN = 'removed_plugin' # release of a plugin the repo does not have anymore
+CHANGE_KINDS = (CHANGE_NEW_PLUGIN, CHANGE_NEW_VERSION, CHANGE_REMOVED_RELEASE, CHANGE_REMOVED_PLUGIN)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# INSTALLER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+INSTALL_DOWNLOAD_JOBS = 4 # concurrent downloads
+INSTALL_JOURNAL_FN = 'journal.json' # inside transaction folder, its presence marks an incomplete transaction
+INSTALL_LOCK_FN = 'lock' # inside staging folder, held exclusively by the process running a transaction
+INSTALL_LOCK_TIMEOUT = 60 # seconds, waiting for transactions of other processes
+INSTALL_STAGING_FLD = '.qgist_staging' # inside plugin folder (same file system, i.e. atomic renames), hidden from glob
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# LOAD STATISTICS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+LOAD_STATS_HISTORY = 20 # load records kept per plugin
+LOAD_STATS_TIMES = ('import', 'class_factory', 'init_gui', 'total', 'unload') # seconds
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# WATCHDOG
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+WATCHDOG_DEBOUNCE = 1000 # milliseconds without changes before index is updated
+WATCHDOG_INTERVAL = 500 # milliseconds
+WATCHDOG_PATTERNS = ('*.py',) # hot reload: changes of other files are ignored
+WATCHDOG_PLUGIN_PATTERNS = ('metadata.txt', '__init__.py') # index: files which make a folder a plugin
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # VERSIONS
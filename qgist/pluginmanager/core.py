@@ -31,28 +31,26 @@ specific language governing rights and limitations under the License.
 import os
 import platform
 
-# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-# IMPORT (External Dependencies)
-# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-
-from PyQt5.QtGui import (
-    QIcon,
-    )
-from PyQt5.QtWidgets import (
-    QAction,
-    )
-
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # IMPORT (Internal)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 from .const import (
     CONFIG_FN,
+    CONFIG_KEY_WATCH,
+    CONFIG_KEY_WATCH_PLUGIN_PATHS,
     IFACE_SPEC,
     PLUGIN_ICON_FN,
     )
 from .dtype_index import dtype_index_class
+from .dtype_loader import dtype_loader_class
+from .dtype_refresher import dtype_refresher_class
 from .dtype_settings import dtype_settings_class
+from .error import QgistPluginLoadError
+from .loadstats import (
+    hook_qgis_loader,
+    unhook_qgis_loader,
+    )
 from .typechecking import conforms_to_spec
 
 from ..const import (
@@ -68,7 +66,10 @@ from ..error import (
     QgistValueError,
     Qgist_ALL_Errors,
     )
-from ..msg import msg_critical
+from ..msg import (
+    msg_critical,
+    msg_warning,
+    )
 from ..util import (
     tr,
     setupTranslation,
@@ -100,12 +101,20 @@ class pluginmanager:
         self._mainwindow = self._iface.mainWindow()
         self._system = platform.system()
         self._index = None
+        self._loader = None
 
     def initGui(self):
         """
         QGis Plugin Interface Routine
         """
 
+        from PyQt5.QtGui import ( # GUI only, keeps the package importable without Qt
+            QIcon,
+            )
+        from PyQt5.QtWidgets import (
+            QAction,
+            )
+
         self._translator, self._translator_path = setupTranslation(os.path.join(
             self._plugin_root_fld, TRANSLATION_FLD
             ))
@@ -125,6 +134,18 @@ class pluginmanager:
             lambda: self._iface.removePluginMenu(pluginManagerMenuText, self._ui_dict['action_manage'])
             )
 
+        try:
+            config = dtype_settings_class(config_class(os.path.join(get_config_path(), CONFIG_FN)))
+            self._index = dtype_index_class(config = config)
+            hook_qgis_loader(self._index.add_load_stats) # plugins QGIS loads after this one
+            self._loader = dtype_loader_class(self._index)
+            self._report_activation_errors(self._loader.activate_critical()) # before main window is shown
+            self._loader.add_placeholders(activated = self._report_activation_errors)
+            self._ui_cleanup.append(self._loader.remove_placeholders)
+        except Qgist_ALL_Errors as e:
+            msg_critical(e, self._mainwindow)
+            self._index, self._loader = None, None
+
         self._wait_for_mainwindow = True
         self._iface.initializationCompleted.connect(self._connect_ui)
 
@@ -135,18 +156,82 @@ class pluginmanager:
         self._wait_for_mainwindow = False
         self._iface.initializationCompleted.disconnect(self._connect_ui)
 
-        try:
-            config = dtype_settings_class(config_class(os.path.join(get_config_path(), CONFIG_FN)))
-            self._index = dtype_index_class(config = config)
-        except Qgist_ALL_Errors as e:
-            msg_critical(e, self._mainwindow)
+        if self._index is None:
             return
 
+        self._loader.activate_deferred(finished = self._activation_finished)
+
         self._iface.pindex = self._index # TODO HACK for debugging in console
 
         # self._ui_dict['action_manage'].triggered.connect(self._open_manager) # TODO
         self._ui_dict['action_manage'].setEnabled(True)
 
+    def _activation_finished(self, errors):
+
+        self._report_activation_errors(errors)
+        self._index.save_load_stats() # once per startup, QGIS has loaded its plugins by now
+        self._watch_plugins()
+        self._watch_plugin_paths()
+        self._refresh_repos_in_background()
+
+    def _watch_plugins(self):
+        "Development mode: hot reload plugins listed in config"
+
+        plugin_ids = self._index.config.get(CONFIG_KEY_WATCH, [])
+        if isinstance(plugin_ids, str): # QgsSettings turn one-item lists into str
+            plugin_ids = [plugin_ids]
+
+        for plugin_id in plugin_ids:
+            try:
+                self._index.get_plugin(plugin_id).watch(on_reload = self._report_reload)
+            except Qgist_ALL_Errors as e:
+                msg_warning(e, self._mainwindow)
+                continue
+            self._ui_cleanup.append(self._index.get_plugin(plugin_id).unwatch)
+
+    def _watch_plugin_paths(self):
+        "Keep index current if plugins are added or removed by others, e.g. deployment scripts"
+
+        if not self._index.config.str_to_bool(self._index.config.get(
+            CONFIG_KEY_WATCH_PLUGIN_PATHS, self._index.config.bool_to_str(True)
+            )):
+            return
+
+        self._index.watch(on_update = self._report_index_update)
+        self._ui_cleanup.append(self._index.unwatch)
+
+    def _refresh_repos_in_background(self):
+        "Refresh repos by their intervals in config, never while the map canvas renders - failures are retried quietly"
+
+        refresher = dtype_refresher_class(self._index, is_busy = self._iface.mapCanvas().isDrawing)
+        refresher.start()
+        self._ui_cleanup.append(refresher.close)
+
+    def _report_index_update(self, plugin_ids, error):
+
+        if error is not None:
+            msg_warning(error, self._mainwindow)
+
+    def _report_reload(self, plugin_id, names, error):
+
+        if error is not None:
+            msg_warning(error, self._mainwindow)
+            return
+        if len(names) == 0:
+            return
+
+        self._iface.messageBar().pushInfo(tr('Plugin reloaded'), f'{plugin_id:s}: {", ".join(names):s}')
+
+    def _report_activation_errors(self, errors):
+
+        if len(errors) == 0:
+            return
+
+        msg_warning(QgistPluginLoadError('\n'.join(
+            str(error.args[0]) if len(error.args) > 0 else plugin_id
+            for plugin_id, error in errors.items()
+            )), self._mainwindow)
+
     def unload(self):
         """
         QGis Plugin Interface Routine
@@ -154,3 +239,7 @@ class pluginmanager:
 
         for cleanup_action in self._ui_cleanup:
             cleanup_action()
+
+        unhook_qgis_loader()
+        if self._index is not None:
+            self._index.save_load_stats()
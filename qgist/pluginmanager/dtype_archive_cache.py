@@ -0,0 +1,415 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_archive_cache.py: Plugin archive cache data type
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .const import (
+    ARCHIVE_CACHE_ENV,
+    ARCHIVE_CACHE_MAX_SIZE,
+    ARCHIVE_CHUNK_SIZE,
+    CONFIG_KEY_ARCHIVE_CACHE_FLD,
+    CONFIG_KEY_ARCHIVE_CACHE_SIZE,
+    REPO_FETCH_TIMEOUT,
+    )
+from .dtype_mirrors import dtype_mirrors_class
+from .dtype_settings import dtype_settings_class
+from .error import QgistDownloadError
+
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_archive_cache_class:
+    """
+    Content-addressed cache of downloaded plugin archives
+
+    Archives are stored once per SHA256 checksum (`blobs/`). Small key files (`keys/`) map URLs
+    (and release versions, if given) to checksums. All writes are atomic renames, so many processes
+    (i.e. profiles) can share one cache without locking. Least recently used archives are evicted
+    once `max_size` is exceeded.
+
+    Limitation: without checksum, a cached archive is trusted by its key. An archive replaced on the
+    server under the same URL and version is served from the cache until it is evicted - pass the
+    version (repositories bump it for every upload) or checksum and size, if known.
+
+    Mutable.
+    """
+
+    def __init__(self, path, max_size = ARCHIVE_CACHE_MAX_SIZE):
+
+        if not isinstance(path, str):
+            raise QgistTypeError(tr('"path" must be a str.'))
+        if not isinstance(max_size, int):
+            raise QgistTypeError(tr('"max_size" must be an int.'))
+        if max_size < 0:
+            raise QgistValueError(tr('"max_size" must not be negative.'))
+
+        self._path = os.path.abspath(path)
+        self._max_size = max_size
+
+        for fld in (self._path, self._blobs_fld, self._keys_fld, self._tmp_fld):
+            os.makedirs(fld, exist_ok = True)
+
+    def __repr__(self):
+
+        return f'<archive_cache path="{self._path:s}" max_size={self._max_size:d}>'
+
+    def __len__(self):
+
+        return len(self._get_blobs())
+
+    def __contains__(self, url):
+
+        return self.get(url) is not None
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    @property
+    def size(self):
+        return sum((size for _, size, _ in self._get_blobs()))
+
+    @property
+    def _blobs_fld(self):
+        return os.path.join(self._path, 'blobs')
+
+    @property
+    def _keys_fld(self):
+        return os.path.join(self._path, 'keys')
+
+    @property
+    def _tmp_fld(self):
+        return os.path.join(self._path, 'tmp')
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def get(self, url, sha256 = None, size = None, version = None):
+        "Path to cached archive or None - by checksum if known, by URL (and version) otherwise"
+
+        self._check_key(url, sha256, size, version)
+
+        if sha256 is None:
+            key = self._read_key(url, version)
+            if key is None:
+                return None
+            sha256 = key['sha256']
+
+        path = self._get_blob_path(sha256)
+        if not os.path.isfile(path): # evicted
+            return None
+        if size is not None and os.path.getsize(path) != size:
+            return None
+
+        try:
+            os.utime(path) # mark as recently used
+        except FileNotFoundError: # evicted meanwhile, e.g. by another process
+            return None
+        return path
+
+    def fetch(self, url, sha256 = None, size = None, mirrors = None, version = None):
+        """
+        Path to cached archive, downloads archive if it is not cached (streamed to disk)
+        With mirrors (see `dtype_mirrors_class`), the fastest working mirror is used - cached by url anyway
+        """
+
+        if not isinstance(mirrors, dtype_mirrors_class) and mirrors is not None:
+            raise QgistTypeError(tr('"mirrors" must be mirrors or None.'))
+
+        path = self.get(url, sha256, size, version)
+        if path is not None:
+            return path
+
+        candidates = [(None, url)] if mirrors is None else mirrors.get_candidates(url)
+        messages = []
+
+        for mirror, candidate_url in candidates:
+            try: # a broken copy on a mirror fails over too, i.e. checksum and size are part of the trial
+                return self._add(url, *self._download(candidate_url, mirror, mirrors), sha256, size, version)
+            except QgistDownloadError as e:
+                if mirror is not None:
+                    mirrors.record_failure(mirror)
+                messages.append(str(e.args[0]))
+
+        raise QgistDownloadError('; '.join(messages))
+
+    def put(self, url, path, version = None):
+        "Add existing archive (copy) to cache, returns path to cached archive"
+
+        if not isinstance(path, str):
+            raise QgistTypeError(tr('"path" must be a str.'))
+        if not os.path.isfile(path):
+            raise QgistValueError(tr('"path" must be a file.'))
+        self._check_key(url, version = version)
+
+        fd, tmp_path = tempfile.mkstemp(dir = self._tmp_fld, suffix = '.zip')
+        hasher = hashlib.sha256()
+        tmp_size = 0
+
+        try:
+            with os.fdopen(fd, 'wb') as f, open(path, 'rb') as src:
+                for chunk in iter(lambda: src.read(ARCHIVE_CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+                    f.write(chunk)
+                    tmp_size += len(chunk)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+
+        return self._add(url, tmp_path, hasher.hexdigest(), tmp_size, version = version)
+
+    def evict(self, max_size = None):
+        "Remove least recently used archives until cache is not larger than max_size, and keys of removed archives"
+
+        if not isinstance(max_size, int) and max_size is not None:
+            raise QgistTypeError(tr('"max_size" must be an int or None.'))
+
+        self._evict(self._max_size if max_size is None else max_size)
+
+    def clear(self):
+        "Remove all archives and keys"
+
+        self.evict(max_size = 0)
+
+        for name in os.listdir(self._keys_fld):
+            os.unlink(os.path.join(self._keys_fld, name))
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _add(self, url, tmp_path, actual_sha256, actual_size, sha256 = None, size = None, version = None):
+
+        try:
+            if (sha256 is not None and sha256 != actual_sha256) or (size is not None and size != actual_size):
+                raise QgistDownloadError(tr('Plugin archive does not match checksum or size') + f': {url:s}')
+            path = self._get_blob_path(actual_sha256)
+            os.makedirs(os.path.dirname(path), exist_ok = True)
+            os.replace(tmp_path, path) # atomic, identical content may already be present
+        finally:
+            if os.path.exists(tmp_path): # not moved, e.g. mismatch or disk full
+                os.unlink(tmp_path)
+        self._write_key(url, version, actual_sha256, actual_size)
+
+        self._evict(self._max_size, keep = path) # returned archive survives, even if it alone exceeds max_size
+
+        return path
+
+    def _evict(self, max_size, keep = None):
+
+        blobs = sorted(self._get_blobs(), key = lambda blob: blob[2]) # oldest first
+        total = sum((size for _, size, _ in blobs))
+
+        for path, size, _ in blobs:
+            if total <= max_size:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path) # readers on POSIX keep their open file
+            except FileNotFoundError: # evicted by other process
+                pass
+            total -= size
+
+        self._prune_keys()
+
+    def _prune_keys(self):
+        "Remove keys of evicted archives"
+
+        for name in os.listdir(self._keys_fld):
+            key_path = os.path.join(self._keys_fld, name)
+            try:
+                with open(key_path, 'r', encoding = 'utf-8') as f:
+                    sha256 = json.loads(f.read())['sha256']
+            except FileNotFoundError: # pruned by other process
+                continue
+            except (ValueError, KeyError, TypeError): # broken key
+                sha256 = None
+            if sha256 is not None and os.path.isfile(self._get_blob_path(sha256)):
+                continue
+            try:
+                os.unlink(key_path)
+            except FileNotFoundError:
+                pass
+
+    def _download(self, url, mirror, mirrors):
+        "Stream url into temporary file, returns its path, checksum and size - speed is recorded for mirror"
+
+        import requests # only required when talking to remote sources
+
+        fd, tmp_path = tempfile.mkstemp(dir = self._tmp_fld, suffix = '.zip')
+        hasher = hashlib.sha256()
+        tmp_size = 0
+        complete = False
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                start = time.perf_counter()
+                with requests.get(url, stream = True, timeout = REPO_FETCH_TIMEOUT) as response:
+                    response.raise_for_status()
+                    latency = time.perf_counter() - start
+                    for chunk in response.iter_content(chunk_size = ARCHIVE_CHUNK_SIZE):
+                        hasher.update(chunk)
+                        f.write(chunk)
+                        tmp_size += len(chunk)
+                    duration = time.perf_counter() - start - latency
+            complete = True
+        except requests.RequestException as e:
+            raise QgistDownloadError(tr('Downloading plugin archive failed') + f': {url:s} ({str(e):s})')
+        finally:
+            if not complete: # also on OSError, e.g. disk full
+                os.unlink(tmp_path)
+
+        if mirror is not None:
+            mirrors.record_success(mirror, latency, tmp_size, duration)
+
+        return tmp_path, hasher.hexdigest(), tmp_size
+
+    def _get_blob_path(self, sha256):
+
+        return os.path.join(self._blobs_fld, sha256[:2], sha256 + '.zip')
+
+    def _get_blobs(self):
+        "All archives: path, size, last use"
+
+        blobs = []
+
+        for sub_fld in os.listdir(self._blobs_fld):
+            for name in os.listdir(os.path.join(self._blobs_fld, sub_fld)):
+                path = os.path.join(self._blobs_fld, sub_fld, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError: # evicted by other process
+                    continue
+                blobs.append((path, stat.st_size, stat.st_mtime))
+
+        return blobs
+
+    def _get_key_path(self, url, version):
+
+        name = url if version is None else f'{url:s}\n{version:s}' # new line: not part of URLs
+
+        return os.path.join(self._keys_fld, hashlib.sha256(name.encode('utf-8')).hexdigest() + '.json')
+
+    def _read_key(self, url, version):
+
+        try:
+            with open(self._get_key_path(url, version), 'r', encoding = 'utf-8') as f:
+                key = json.loads(f.read())
+        except (FileNotFoundError, ValueError): # ValueError: partial or broken key
+            return None
+
+        if key.get('url', None) != url or key.get('version', None) != version:
+            return None
+
+        return key
+
+    def _write_key(self, url, version, sha256, size):
+
+        fd, tmp_path = tempfile.mkstemp(dir = self._tmp_fld, suffix = '.json')
+        with os.fdopen(fd, 'w', encoding = 'utf-8') as f:
+            f.write(json.dumps({'url': url, 'version': version, 'sha256': sha256, 'size': size}))
+        os.replace(tmp_path, self._get_key_path(url, version))
+
+    @staticmethod
+    def _check_key(url, sha256 = None, size = None, version = None):
+
+        if not isinstance(url, str):
+            raise QgistTypeError(tr('"url" must be a str.'))
+        if len(url) == 0:
+            raise QgistValueError(tr('"url" must not be empty.'))
+        if not isinstance(sha256, str) and sha256 is not None:
+            raise QgistTypeError(tr('"sha256" must be a str or None.'))
+        if isinstance(sha256, str) and (len(sha256) != 64 or not all((c in '0123456789abcdef' for c in sha256))):
+            raise QgistValueError(tr('"sha256" must be a lower case hex digest.'))
+        if not isinstance(size, int) and size is not None:
+            raise QgistTypeError(tr('"size" must be an int or None.'))
+        if not isinstance(version, str) and version is not None:
+            raise QgistTypeError(tr('"version" must be a str or None.'))
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PRE-CONSTRUCTOR
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @classmethod
+    def from_config(cls, config):
+        "Folder from environment, config or user cache folder (in this order) - shared by all profiles"
+
+        if not isinstance(config, dtype_settings_class):
+            raise QgistTypeError(tr('"config" must be a "dtype_settings_class" object.'))
+
+        path = os.environ.get(ARCHIVE_CACHE_ENV, None)
+        if path is None:
+            path = config.get(CONFIG_KEY_ARCHIVE_CACHE_FLD, None)
+        if path is None:
+            path = _get_user_cache_fld()
+
+        return cls(
+            path = path,
+            max_size = int(config.get(CONFIG_KEY_ARCHIVE_CACHE_SIZE, ARCHIVE_CACHE_MAX_SIZE)),
+            )
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _get_user_cache_fld():
+
+    if sys.platform.startswith('win'):
+        root_fld = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+    else:
+        root_fld = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+
+    return os.path.join(root_fld, 'qgist', 'pluginmanager')
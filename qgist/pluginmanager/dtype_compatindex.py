@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_compatindex.py: QGIS compatibility interval index data type
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import bisect
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .const import EVENT_PLUGIN_REMOVED
+from .dtype_index import dtype_index_class
+from .dtype_version import dtype_version_class
+
+from ..error import QgistTypeError
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_compatindex_class:
+    """
+    Interval index of releases over their QGIS compatibility ranges
+
+    All distinct `qgisMinimumVersion` and (effective) `qgisMaximumVersion` values are sorted once,
+    as versions, into boundaries. A QGIS version falls either onto or between boundaries, i.e. into
+    one of `2 * boundaries + 1` slots, found by binary search. Every release covers a contiguous
+    range of slots and is stored in the O(log slots) nodes of a segment tree covering that range.
+    A query walks from one leaf to the root, i.e. visits O(log slots) nodes, instead of evaluating
+    the meta data of every release. Per node, releases are grouped by plugin, newest first, with
+    their rank among all releases of their plugin - the latest release per plugin is picked by
+    integer comparisons. The interval index follows index change sets (see `dtype_index_class.events`).
+
+    Mutable.
+    """
+
+    def __init__(self, index):
+
+        if not isinstance(index, dtype_index_class):
+            raise QgistTypeError(tr('"index" must be a "dtype_index_class" object.'))
+
+        self._index = index
+
+        self._boundaries = [] # sorted distinct versions
+        self._size = 1 # leaves of segment tree, power of two
+        self._nodes = [] # segment tree: dict of plugin id -> list of (rank, release), newest first
+        self._ranges = {} # plugin id -> list of (rank, release, first slot, last slot), for updates
+        self._slots = {} # version elements -> slot, i.e. every version is searched once
+
+        self.rebuild()
+        self._index.events.subscribe(self._index_changed)
+
+    def __repr__(self):
+
+        return (
+            f'<compatindex ({id(self):x}) plugins={len(self._ranges):d} '
+            f'releases={self.len_releases:d} boundaries={len(self._boundaries):d}>'
+            )
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def len_releases(self):
+        return sum((len(ranges) for ranges in self._ranges.values()))
+
+    @property
+    def boundaries(self):
+        return tuple(self._boundaries)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def get_releases(self, qgis_version):
+        "Releases compatible to QGIS version (see `dtype_version_class.from_qgisversion`), by plugin id, newest first"
+
+        releases = {}
+
+        for node in self._get_nodes(qgis_version):
+            for plugin_id, ranked in node.items():
+                releases.setdefault(plugin_id, []).extend(ranked)
+
+        return {
+            plugin_id: [release for _, release in sorted(ranked, key = lambda item: item[0])]
+            for plugin_id, ranked in releases.items()
+            }
+
+    def get_latest_releases(self, qgis_version, allow_experimental = True, allow_deprecated = True):
+        "Latest release per plugin compatible to QGIS version, optionally without experimental or deprecated ones"
+
+        self._check_filters(allow_experimental, allow_deprecated)
+
+        latest = {} # plugin id -> (rank, release)
+
+        for node in self._get_nodes(qgis_version):
+            for plugin_id, ranked in node.items():
+                candidate = _get_first(ranked, allow_experimental, allow_deprecated)
+                if candidate is None:
+                    continue
+                if plugin_id not in latest.keys() or candidate[0] < latest[plugin_id][0]:
+                    latest[plugin_id] = candidate
+
+        return {plugin_id: release for plugin_id, (_, release) in latest.items()}
+
+    def get_latest_release(self, plugin_id, qgis_version, allow_experimental = True, allow_deprecated = True):
+        "Latest release of one plugin compatible to QGIS version, None if there is none"
+
+        if not isinstance(plugin_id, str):
+            raise QgistTypeError(tr('"plugin_id" must be a str.'))
+        self._check_filters(allow_experimental, allow_deprecated)
+
+        latest = None
+
+        for node in self._get_nodes(qgis_version):
+            if plugin_id not in node.keys():
+                continue
+            candidate = _get_first(node[plugin_id], allow_experimental, allow_deprecated)
+            if candidate is not None and (latest is None or candidate[0] < latest[0]):
+                latest = candidate
+
+        return None if latest is None else latest[1]
+
+    def rebuild(self):
+
+        releases = {
+            plugin.id: list(plugin.available_releases)
+            for plugin in self._index.plugins
+            }
+
+        boundaries = {} # distinct by elements, i.e. few versions to sort
+        for plugin_releases in releases.values():
+            for release in plugin_releases:
+                for bound in _get_bounds(release):
+                    if bound is not None:
+                        boundaries.setdefault(_get_elements(bound), bound)
+        self._boundaries = sorted(boundaries.values())
+        self._slots.clear()
+
+        self._size = 1
+        while self._size < 2 * len(self._boundaries) + 1:
+            self._size *= 2
+        self._nodes = [{} for _ in range(2 * self._size)]
+        self._ranges = {}
+
+        for plugin_id, plugin_releases in releases.items():
+            self._add_plugin(plugin_id, plugin_releases)
+
+    def close(self):
+        "Stop following index changes"
+
+        self._index.events.unsubscribe(self._index_changed)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _index_changed(self, events):
+
+        plugin_ids = {event.target for event in events if event.kind.startswith('plugin_')}
+        removed_ids = {event.target for event in events if event.kind == EVENT_PLUGIN_REMOVED}
+        added = {
+            plugin_id: list(self._index.get_plugin(plugin_id).available_releases)
+            for plugin_id in plugin_ids - removed_ids
+            }
+
+        if any(( # new boundaries move slots, i.e. everything has to be re-inserted
+            bound is not None and not self._is_boundary(bound)
+            for releases in added.values() for release in releases for bound in _get_bounds(release)
+            )):
+            self.rebuild()
+            return
+
+        for plugin_id in plugin_ids:
+            self._remove_plugin(plugin_id)
+            if plugin_id in added.keys():
+                self._add_plugin(plugin_id, added[plugin_id])
+
+    def _add_plugin(self, plugin_id, releases):
+
+        releases = sorted(releases, key = lambda release: release.version, reverse = True)
+        ranges = []
+
+        for rank, release in enumerate(releases):
+            slots = self._get_slots(release)
+            if slots is None:
+                continue
+            ranges.append((rank, release, *slots))
+            for node in self._get_covering_nodes(*slots):
+                _insert_ranked(self._nodes[node].setdefault(plugin_id, []), rank, release)
+
+        self._ranges[plugin_id] = ranges
+
+    def _remove_plugin(self, plugin_id):
+
+        for rank, _, first, last in self._ranges.pop(plugin_id, []):
+            for node in self._get_covering_nodes(first, last):
+                node_releases = [item for item in self._nodes[node][plugin_id] if item[0] != rank]
+                if len(node_releases) == 0:
+                    self._nodes[node].pop(plugin_id)
+                else:
+                    self._nodes[node][plugin_id] = node_releases
+
+    def _get_slots(self, release):
+        "First and last slot of compatibility range, None if it is empty"
+
+        minimum, maximum = _get_bounds(release)
+        if minimum is None:
+            return 0, 2 * len(self._boundaries)
+        if maximum < minimum:
+            return None
+
+        return self._get_slot(minimum), self._get_slot(maximum)
+
+    def _get_slot(self, version):
+        "Slot `2i + 1` is boundary i, even slots are between boundaries (or before first / after last)"
+
+        elements = _get_elements(version)
+        if elements in self._slots.keys():
+            return self._slots[elements]
+
+        position = bisect.bisect_left(self._boundaries, version)
+        if position < len(self._boundaries) and self._boundaries[position] == version:
+            slot = 2 * position + 1
+        else:
+            slot = 2 * position
+        self._slots[elements] = slot
+
+        return slot
+
+    def _get_covering_nodes(self, first, last):
+        "Nodes of segment tree covering slots first to last (inclusive)"
+
+        nodes = []
+        left, right = first + self._size, last + self._size + 1
+
+        while left < right:
+            if left & 1:
+                nodes.append(left)
+                left += 1
+            if right & 1:
+                right -= 1
+                nodes.append(right)
+            left //= 2
+            right //= 2
+
+        return nodes
+
+    def _get_nodes(self, qgis_version):
+        "Nodes from leaf of slot of QGIS version to root"
+
+        if not isinstance(qgis_version, dtype_version_class):
+            raise QgistTypeError(tr('"qgis_version" must be a version.'))
+
+        node = self._get_slot(qgis_version) + self._size
+
+        while node > 0:
+            yield self._nodes[node]
+            node //= 2
+
+    def _is_boundary(self, version):
+
+        return self._get_slot(version) % 2 == 1
+
+    @staticmethod
+    def _check_filters(allow_experimental, allow_deprecated):
+
+        if not isinstance(allow_experimental, bool):
+            raise QgistTypeError(tr('"allow_experimental" must be a bool.'))
+        if not isinstance(allow_deprecated, bool):
+            raise QgistTypeError(tr('"allow_deprecated" must be a bool.'))
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _get_bounds(release):
+    "Minimum and maximum QGIS version like `is_compatible`, (None, None) if compatible to everything"
+
+    minimum = release.meta['qgisMinimumVersion'].value
+    maximum = release.meta['qgisMaximumVersion'].value
+
+    if minimum is None:
+        return None, None
+    if maximum is None: # QGIS default: compatible within major release of minimum version
+        maximum = dtype_version_class(minimum[0], '99', '99')
+
+    return minimum, maximum
+
+def _get_elements(version):
+
+    return tuple(version[index] for index in range(len(version)))
+
+def _insert_ranked(ranked, rank, release):
+    "Keep list of (rank, release) ordered by rank, i.e. newest first"
+
+    position = bisect.bisect_left([item[0] for item in ranked], rank)
+    ranked.insert(position, (rank, release))
+
+def _get_first(ranked, allow_experimental, allow_deprecated):
+    "First, i.e. newest, (rank, release) passing filters, None if there is none"
+
+    for rank, release in ranked:
+        if not allow_experimental and release.experimental:
+            continue
+        if not allow_deprecated and release.meta['deprecated'].value:
+            continue
+        return rank, release
+
+    return None
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_events.py: Index change events and event bus data types
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import contextlib
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .const import (
+    EVENT_KINDS,
+    EVENT_PLUGIN_ADDED,
+    EVENT_PLUGIN_REMOVED,
+    EVENT_PLUGIN_UPDATED,
+    EVENT_REPO_ADDED,
+    EVENT_REPO_REMOVED,
+    EVENT_REPO_UPDATED,
+    )
+
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_ADDED, _REMOVED, _UPDATED = 'added', 'removed', 'updated'
+
+_LIFECYCLE = { # kind -> (target type, change)
+    EVENT_PLUGIN_ADDED: ('plugin', _ADDED),
+    EVENT_PLUGIN_REMOVED: ('plugin', _REMOVED),
+    EVENT_PLUGIN_UPDATED: ('plugin', _UPDATED),
+    EVENT_REPO_ADDED: ('repo', _ADDED),
+    EVENT_REPO_REMOVED: ('repo', _REMOVED),
+    EVENT_REPO_UPDATED: ('repo', _UPDATED),
+    }
+_KINDS = {value: kind for kind, value in _LIFECYCLE.items()}
+
+_COALESCE = { # (earlier change, later change) -> change, None if both cancel out
+    (_ADDED, _UPDATED): _ADDED,
+    (_ADDED, _REMOVED): None,
+    (_ADDED, _ADDED): _ADDED,
+    (_UPDATED, _UPDATED): _UPDATED,
+    (_UPDATED, _REMOVED): _REMOVED,
+    (_UPDATED, _ADDED): _UPDATED,
+    (_REMOVED, _ADDED): _UPDATED, # replaced, e.g. by rebuild
+    (_REMOVED, _UPDATED): _UPDATED,
+    (_REMOVED, _REMOVED): _REMOVED,
+    }
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS: EVENT
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_event_class:
+    """
+    One change of the index: kind (see `EVENT_KINDS`), target (plugin id, repo id, filter name or None)
+    and an optional value (new filter value, new repo order)
+
+    Immutable.
+    """
+
+    def __init__(self, kind, target = None, value = None):
+
+        if not isinstance(kind, str):
+            raise QgistTypeError(tr('"kind" must be a str.'))
+        if kind not in EVENT_KINDS:
+            raise QgistValueError(tr('"kind" is unknown.') + f' {kind:s}')
+        if not isinstance(target, str) and target is not None:
+            raise QgistTypeError(tr('"target" must be a str or None.'))
+
+        self._kind = kind
+        self._target = target
+        self._value = value
+
+    def __repr__(self):
+
+        return f'<event {self._kind:s} target={self._target!r:s} value={self._value!r:s}>'
+
+    def __eq__(self, other):
+
+        if not isinstance(other, type(self)):
+            return NotImplemented
+
+        return (self._kind, self._target, self._value) == (other.kind, other.target, other.value)
+
+    def __hash__(self):
+
+        return hash((self._kind, self._target))
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def kind(self):
+        return self._kind
+
+    @property
+    def target(self):
+        return self._target
+
+    @property
+    def value(self):
+        return self._value
+
+    @property
+    def key(self):
+        "Events with identical keys are coalesced within a batch"
+        if self._kind in _LIFECYCLE.keys():
+            return (_LIFECYCLE[self._kind][0], self._target)
+        return (self._kind, self._target)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS: EVENT BUS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_eventbus_class:
+    """
+    Delivers index events to subscribers as change sets, i.e. tuples of events
+
+    Outside of a batch, every event is delivered immediately as a change set of one. Inside of
+    a batch (`with bus.batch(): ...`, may be nested), events are collected and coalesced per
+    target: an added and then removed plugin disappears, a removed and re-added plugin becomes
+    an update, the last filter value and repo order win. The change set is delivered once the
+    outermost batch ends, in order of first occurrence.
+
+    Mutable.
+    """
+
+    def __init__(self):
+
+        self._subscribers = [] # (callback, kinds or None)
+        self._depth = 0 # of nested batches
+        self._pending = {} # event key -> event, ordered by first occurrence
+
+    def __repr__(self):
+
+        return (
+            f'<eventbus ({id(self):x}) subscribers={len(self._subscribers):d} '
+            f'batching={"yes" if self.batching else "no":s} pending={len(self._pending):d}>'
+            )
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def batching(self):
+        return self._depth > 0
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def subscribe(self, callback, kinds = None):
+        "`callback(events)` receives change sets, optionally only events of certain kinds (tuple)"
+
+        if not callable(callback):
+            raise QgistTypeError(tr('"callback" must be callable.'))
+        if not isinstance(kinds, tuple) and kinds is not None:
+            raise QgistTypeError(tr('"kinds" must be a tuple or None.'))
+        if kinds is not None and not all((kind in EVENT_KINDS for kind in kinds)):
+            raise QgistValueError(tr('"kinds" contains unknown kinds of events.'))
+        if any((subscriber == callback for subscriber, _ in self._subscribers)):
+            raise QgistValueError(tr('"callback" is already subscribed.'))
+
+        self._subscribers.append((callback, kinds))
+
+    def unsubscribe(self, callback):
+
+        self._subscribers = [
+            (subscriber, kinds) for subscriber, kinds in self._subscribers
+            if subscriber != callback
+            ]
+
+    def emit(self, event):
+
+        if not isinstance(event, dtype_event_class):
+            raise QgistTypeError(tr('"event" must be an event.'))
+
+        if self._depth == 0:
+            self._deliver((event,))
+            return
+
+        key = event.key
+        if key not in self._pending.keys():
+            self._pending[key] = event
+            return
+
+        coalesced = _coalesce(self._pending[key], event)
+        if coalesced is None:
+            self._pending.pop(key)
+        else:
+            self._pending[key] = coalesced
+
+    @contextlib.contextmanager
+    def batch(self):
+        "Collect and coalesce events, deliver them as one change set at the end of the outermost batch"
+
+        self._depth += 1
+        try:
+            yield self
+        finally:
+            self._depth -= 1
+            if self._depth == 0:
+                events, self._pending = tuple(self._pending.values()), {}
+                self._deliver(events)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _deliver(self, events):
+
+        if len(events) == 0:
+            return
+
+        for callback, kinds in list(self._subscribers): # subscribers may unsubscribe while being called
+            selected = events if kinds is None else tuple(event for event in events if event.kind in kinds)
+            if len(selected) > 0:
+                callback(selected)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _coalesce(earlier, later):
+    "One event replacing two events of identical key, None if they cancel out"
+
+    if later.kind not in _LIFECYCLE.keys(): # filter & repo order: last one wins
+        return later
+
+    target_type, earlier_change = _LIFECYCLE[earlier.kind]
+    change = _COALESCE[(earlier_change, _LIFECYCLE[later.kind][1])]
+    if change is None:
+        return None
+
+    return dtype_event_class(_KINDS[(target_type, change)], later.target, later.value)
@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_facetindex.py: Facet bitmap index data type
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .const import (
+    EVENT_FILTER_CHANGED,
+    EVENT_PLUGIN_REMOVED,
+    FACETS,
+    )
+from .dtype_index import dtype_index_class
+
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_facetindex_class:
+    """
+    Bitsets of plugins per facet value, for filter counts and combined filters
+
+    Every plugin occupies one bit (slots of removed plugins are reused). For every facet
+    (see `FACETS`) and value, e.g. `('tag', 'raster')` or `('installed', True)`, a Python int
+    holds the bits of all plugins with that value. Filters are combined with `|` (values of one
+    facet) and `&` (across facets), counts are population counts, i.e. the plugins themselves are
+    not looked at. Values are taken from each plugin's current release (see
+    `dtype_index_class.get_current_release`), tags and categories case-folded. The facet index
+    follows index change sets (see `dtype_index_class.events`).
+
+    Mutable.
+    """
+
+    def __init__(self, index):
+
+        if not isinstance(index, dtype_index_class):
+            raise QgistTypeError(tr('"index" must be a "dtype_index_class" object.'))
+
+        self._index = index
+
+        self._slots = {} # plugin id -> bit position
+        self._ids = [] # bit position -> plugin id, None if free
+        self._free = [] # free bit positions
+        self._all = 0 # bits of all plugins
+        self._bitsets = {} # (facet, value) -> int
+        self._values = {} # plugin id -> set of (facet, value), for updates
+
+        self.rebuild()
+        self._index.events.subscribe(self._index_changed)
+
+    def __repr__(self):
+
+        return f'<facetindex ({id(self):x}) plugins={len(self._slots):d} values={len(self._bitsets):d}>'
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def len_plugins(self):
+        return len(self._slots)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def get_values(self, facet):
+        "Values of facet present in index, sorted"
+
+        self._check_facet(facet)
+
+        return sorted((value for name, value in self._bitsets.keys() if name == facet), key = str)
+
+    def get_mask(self, filters = None):
+        """
+        Bitset of plugins matching filters: dict of facet -> value or tuple of values
+        Any value of one facet matches (or), all facets must match (and). None for all plugins
+        """
+
+        mask = self._all
+        if filters is None:
+            return mask
+
+        if not isinstance(filters, dict):
+            raise QgistTypeError(tr('"filters" must be a dict or None.'))
+
+        for facet, values in filters.items():
+            self._check_facet(facet)
+            if not isinstance(values, tuple):
+                values = (values,)
+            facet_mask = 0
+            for value in values:
+                facet_mask |= self._bitsets.get((facet, _normalize(facet, value)), 0)
+            mask &= facet_mask
+
+        return mask
+
+    def get_plugin_ids(self, filters = None):
+        "Ids of plugins matching filters (see `get_mask`), in no particular order"
+
+        return self._get_plugin_ids(self.get_mask(filters))
+
+    def get_count(self, filters = None):
+
+        return _get_popcount(self.get_mask(filters))
+
+    def get_counts(self, facet, filters = None):
+        """
+        Number of plugins per value of facet, among plugins matching filters (see `get_mask`)
+        Filters on the facet itself are ignored, i.e. counts show what selecting another value would give
+        """
+
+        self._check_facet(facet)
+        if isinstance(filters, dict):
+            filters = {name: values for name, values in filters.items() if name != facet}
+
+        mask = self.get_mask(filters)
+
+        return {
+            value: _get_popcount(bitset & mask)
+            for (name, value), bitset in self._bitsets.items() if name == facet
+            }
+
+    def rebuild(self):
+
+        self._slots.clear()
+        self._ids.clear()
+        self._free.clear()
+        self._all = 0
+        self._bitsets.clear()
+        self._values.clear()
+
+        for plugin in self._index.plugins:
+            self._add_plugin(plugin.id)
+
+    def close(self):
+        "Stop following index changes"
+
+        self._index.events.unsubscribe(self._index_changed)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _index_changed(self, events):
+
+        if any((event.kind == EVENT_FILTER_CHANGED for event in events)): # current releases & upgrades change
+            self.rebuild()
+            return
+
+        for event in events:
+            if not event.kind.startswith('plugin_'):
+                continue
+            self._remove_plugin(event.target)
+            if event.kind != EVENT_PLUGIN_REMOVED:
+                self._add_plugin(event.target)
+
+    def _add_plugin(self, plugin_id):
+
+        slot = self._free.pop() if len(self._free) > 0 else len(self._ids)
+        if slot == len(self._ids):
+            self._ids.append(plugin_id)
+        else:
+            self._ids[slot] = plugin_id
+        self._slots[plugin_id] = slot
+
+        bit = 1 << slot
+        self._all |= bit
+        values = self._get_plugin_values(plugin_id)
+        for key in values:
+            self._bitsets[key] = self._bitsets.get(key, 0) | bit
+        self._values[plugin_id] = values
+
+    def _remove_plugin(self, plugin_id):
+
+        if plugin_id not in self._slots.keys():
+            return
+
+        slot = self._slots.pop(plugin_id)
+        bit = 1 << slot
+        self._all &= ~bit
+        for key in self._values.pop(plugin_id):
+            bitset = self._bitsets[key] & ~bit
+            if bitset == 0:
+                self._bitsets.pop(key)
+            else:
+                self._bitsets[key] = bitset
+
+        self._ids[slot] = None
+        self._free.append(slot)
+
+    def _get_plugin_values(self, plugin_id):
+
+        plugin = self._index.get_plugin(plugin_id)
+        release = self._index.get_current_release(plugin_id)
+
+        values = {
+            ('installed', plugin.installed),
+            ('upgradable', self._index.is_upgradable(plugin_id)),
+            }
+        if release is None:
+            return values
+
+        values.update({
+            ('experimental', release.meta['experimental'].value if release.meta['experimental'].value_set else False),
+            ('deprecated', release.meta['deprecated'].value if release.meta['deprecated'].value_set else False),
+            ('backend', release.repo_type),
+            })
+        if release.meta['category'].value_set:
+            values.add(('category', _normalize('category', release.meta['category'].value)))
+        if release.meta['tags'].value_set:
+            values.update(
+                ('tag', _normalize('tag', tag)) for tag in release.meta['tags'].value
+                if len(tag.strip()) > 0
+                )
+
+        return values
+
+    def _get_plugin_ids(self, mask):
+
+        plugin_ids = []
+
+        while mask:
+            low = mask & -mask # lowest set bit
+            plugin_ids.append(self._ids[low.bit_length() - 1])
+            mask ^= low
+
+        return plugin_ids
+
+    @staticmethod
+    def _check_facet(facet):
+
+        if not isinstance(facet, str):
+            raise QgistTypeError(tr('"facet" must be a str.'))
+        if facet not in FACETS:
+            raise QgistValueError(tr('"facet" is unknown.') + f' {facet:s}')
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _normalize(facet, value):
+    "Tags and categories are free text, i.e. case and surrounding spaces vary"
+
+    if facet in ('tag', 'category') and isinstance(value, str):
+        return value.strip().casefold()
+
+    return value
+
+def _get_popcount(bitset):
+
+    return bin(bitset).count('1') # `int.bit_count` requires Python 3.10
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_footprint.py: Plugin footprint data type
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import gc
+import os
+import sys
+import weakref
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_footprint_class:
+    """
+    Everything one plugin added to the running application, recorded while it is loaded
+
+    - `sys.modules` entries: the plugin's own modules (removed) and third-party modules first
+      imported by it (only reported, they may be shared with other plugins by now)
+    - Qt objects: top-level widgets and direct children of the main window (actions, toolbars, docks)
+    - processing providers
+
+    After the plugin's own `unload`, `release` removes what is left and checks through weak references
+    whether the plugin's modules and its plugin object were actually collected.
+
+    Mutable.
+    """
+
+    def __init__(self, plugin_id, path = None):
+
+        if not isinstance(plugin_id, str):
+            raise QgistTypeError(tr('"plugin_id" must be a str.'))
+        if not isinstance(path, str) and path is not None:
+            raise QgistTypeError(tr('"path" must be a str or None.'))
+
+        self._plugin_id = plugin_id
+        self._path = os.path.abspath(path) if path is not None else None # plugin folder
+        self._state = 'new' # new -> recording -> recorded -> released
+
+        self._before = None # snapshot of application state before load
+        self._module_names = []
+        self._qt_objects = [] # weak references
+        self._provider_ids = []
+        self._refs = {} # by name: weak references on modules and plugin object, for leak check
+
+    def __repr__(self):
+
+        return (
+            f'<footprint ({id(self):x}) plugin="{self._plugin_id:s}" state={self._state:s} '
+            f'modules={len(self._module_names):d} qt_objects={len(self._qt_objects):d} providers={len(self._provider_ids):d}>'
+            )
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def module_names(self):
+        return (name for name in self._module_names)
+
+    @property
+    def provider_ids(self):
+        return (provider_id for provider_id in self._provider_ids)
+
+    @property
+    def state(self):
+        return self._state
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def get_own_module_names(self):
+        "Currently imported modules of plugin: its package, sub-modules and modules from its folder"
+
+        return sorted(name for name in list(sys.modules.keys()) if self._is_own_module(name))
+
+    def begin(self):
+        "Call right before plugin is imported"
+
+        if self._state != 'new':
+            raise QgistValueError(tr('footprint is already recording or recorded'))
+
+        self._before = {
+            'modules': set(sys.modules.keys()),
+            'qt_objects': {id(obj) for obj in _get_qt_objects()},
+            'providers': set(_get_provider_ids()),
+            }
+        self._state = 'recording'
+
+    def end(self, instance):
+        "Call right after plugin's `initGui`, with the plugin object"
+
+        if self._state != 'recording':
+            raise QgistValueError(tr('footprint is not recording'))
+
+        self._module_names = sorted(
+            name for name in sys.modules.keys()
+            if name not in self._before['modules'] or self._is_own_module(name)
+            )
+        self._qt_objects = [
+            weakref.ref(obj) for obj in _get_qt_objects()
+            if id(obj) not in self._before['qt_objects']
+            ]
+        self._provider_ids = [
+            provider_id for provider_id in _get_provider_ids()
+            if provider_id not in self._before['providers']
+            ]
+        self._add_refs(instance)
+
+        self._before = None
+        self._state = 'recorded'
+
+    def release(self):
+        """
+        Call after plugin's own `unload` and after all references held by QGIS were dropped
+        Removes leftover processing providers, Qt objects and modules, then checks for leaks
+        Returns report (dict)
+        """
+
+        if self._state not in ('recorded', 'new'):
+            raise QgistValueError(tr('footprint is still recording or was already released'))
+        self._add_refs(None) # also covers modules imported after `end`, e.g. by hot reloads
+        self._module_names = sorted(set(self._module_names) | set(self.get_own_module_names()))
+
+        report = {
+            'providers_removed': _remove_providers(self._provider_ids),
+            'qt_objects_removed': _remove_qt_objects(self._qt_objects),
+            'modules_removed': self._remove_modules(),
+            'modules_kept': [name for name in self._module_names if name in sys.modules.keys()],
+            }
+        self._qt_objects.clear()
+        self._state = 'released'
+
+        gc.collect()
+        report['leaks'] = {
+            name: _get_referrer_types(ref())
+            for name, ref in self._refs.items()
+            if ref() is not None
+            }
+        self._refs.clear()
+
+        return report
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _add_refs(self, instance):
+
+        for name in self.get_own_module_names(): # third-party modules imported by plugin may be shared
+            self._refs[name] = weakref.ref(sys.modules[name])
+
+        if instance is None:
+            return
+        try:
+            self._refs[f'{self._plugin_id:s} (plugin object)'] = weakref.ref(instance)
+        except TypeError: # e.g. classes with __slots__
+            pass
+
+    def _remove_modules(self):
+
+        from qgis import utils
+
+        removed = 0
+
+        for name in self._module_names:
+            if not self._is_own_module(name):
+                continue
+            module = sys.modules.pop(name, None)
+            if module is None:
+                continue
+            if hasattr(module, 'qCleanupResources'): # compiled Qt resources, like `qgis.utils._unloadPluginModules`
+                module.qCleanupResources()
+            removed += 1
+
+        getattr(utils, '_plugin_modules', {}).pop(self._plugin_id, None) # QGIS' own import tracking
+
+        return removed
+
+    def _is_own_module(self, name):
+        "Plugin's package and its sub-modules, or any module loaded from inside the plugin folder"
+
+        if name == self._plugin_id or name.startswith(f'{self._plugin_id:s}.'):
+            return True
+        if self._path is None:
+            return False
+
+        path = getattr(sys.modules.get(name, None), '__file__', None)
+        if not isinstance(path, str):
+            return False
+
+        return os.path.abspath(path).startswith(self._path + os.sep)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _get_qt_objects():
+    "Top-level widgets and direct children of main window - cheap, no recursive search"
+
+    try:
+        from PyQt5.QtWidgets import QApplication
+        from qgis.utils import iface
+    except ModuleNotFoundError:
+        return []
+
+    if iface is None:
+        return []
+
+    return [*QApplication.topLevelWidgets(), *iface.mainWindow().children()]
+
+def _get_provider_ids():
+
+    try:
+        from qgis.core import QgsApplication
+    except ModuleNotFoundError:
+        return []
+
+    registry = QgsApplication.processingRegistry()
+
+    return [provider.id() for provider in registry.providers()] if registry is not None else []
+
+def _remove_providers(provider_ids):
+
+    if len(provider_ids) == 0:
+        return []
+
+    from qgis.core import QgsApplication
+
+    registry = QgsApplication.processingRegistry()
+    removed = []
+
+    for provider_id in provider_ids:
+        if registry.providerById(provider_id) is not None:
+            registry.removeProvider(provider_id)
+            removed.append(provider_id)
+
+    return removed
+
+def _remove_qt_objects(refs):
+
+    if len(refs) == 0:
+        return 0
+
+    from PyQt5 import sip
+
+    removed = 0
+
+    for ref in refs:
+        obj = ref()
+        if obj is None or sip.isdeleted(obj):
+            continue
+        obj.deleteLater()
+        removed += 1
+
+    return removed
+
+def _get_referrer_types(obj):
+    "Type names of objects still referring to a leaked object, for finding the culprit"
+
+    return sorted({
+        type(referrer).__name__ for referrer in gc.get_referrers(obj)
+        if type(referrer).__name__ != 'frame' # i.e. the leak check itself
+        })
@@ -24,6 +24,12 @@ specific language governing rights and limitations under the License.
 
 """
 
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import os
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # IMPORT (Internal)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -32,20 +38,50 @@ from .const import (
     # CONFIG_GROUP_MANAGER_REPOS,
     CONFIG_KEY_ALLOW_DEPRECATED,
     CONFIG_KEY_ALLOW_EXPERIMENTAL,
+    CONFIG_KEY_LOAD_STATS,
+    EVENT_FILTER_CHANGED,
+    EVENT_PLUGIN_ADDED,
+    EVENT_PLUGIN_REMOVED,
+    EVENT_PLUGIN_UPDATED,
+    EVENT_REPO_ADDED,
+    EVENT_REPO_REMOVED,
+    EVENT_REPO_UPDATED,
+    EVENT_REPOS_REORDERED,
+    INSTALL_DOWNLOAD_JOBS,
     REPO_BACKEND_QGISLEGACYCPP,
     REPO_BACKEND_QGISLEGACYPYTHON,
     REPO_DEFAULT_URL,
+    WATCHDOG_DEBOUNCE,
+    WATCHDOG_PLUGIN_PATTERNS,
     )
 from .backends import backends
 from .error import (
+    QgistMetaKeyError,
+    QgistMetaTxtError,
+    QgistNotAPluginDirectoryError,
+    QgistNotADirectoryError,
     QgistPluginIdCollisionError,
     QgistRepoError,
     )
+from .dtype_events import (
+    dtype_event_class,
+    dtype_eventbus_class,
+    )
+from .dtype_installer import dtype_installer_class
 from .dtype_plugin import dtype_plugin_class
+from .dtype_pluginrelease_base import dtype_pluginrelease_base_class
 from .dtype_repository_base import dtype_repository_base_class
 from .dtype_settings import dtype_settings_class
+from .dtype_transaction import dtype_transaction_class
+from .dtype_version import dtype_version_class
+from .dtype_watchdog import dtype_watchdog_class
+from .loadstats import (
+    get_load_record,
+    parse_qgis_plugin_time,
+    )
 
 from ..error import (
+    QgistNotImplementedError,
     QgistTypeError,
     QgistValueError,
     )
@@ -62,24 +98,38 @@ class dtype_index_class:
     Mutable.
     """
 
-    def __init__(self, config):
+    def __init__(self, config, qgis_version = None):
 
         if not isinstance(config, dtype_settings_class):
             raise QgistTypeError(tr('"config" must be a "dtype_settings_class" object.'))
+        if not isinstance(qgis_version, dtype_version_class) and qgis_version is not None:
+            raise QgistTypeError(tr('"qgis_version" must be a version or None.'))
 
         self._config = config
+        self._qgis_version = qgis_version if qgis_version is not None else self._get_qgis_version()
         self._repos = [] # From high to low priority
         self._plugins = {} # Individual plugins, not their releases
 
         # TODO <HACK>
         # remove this eventually - Plugin Manager should manage this on its own
-        from qgis.utils import plugins as _plugins
+        try:
+            from qgis.utils import plugins as _plugins
+        except ModuleNotFoundError: # headless, nothing has been loaded by QGIS
+            _plugins = {}
         self._plugin_modules = _plugins # dict by plugin_id: reference on imported Python plugin modules
         del _plugins
         # TODO </HACK>
-
-        self._allow_deprecated = self._config.str_to_bool(self._config[CONFIG_KEY_ALLOW_DEPRECATED])
-        self._allow_experimental = self._config.str_to_bool(self._config[CONFIG_KEY_ALLOW_EXPERIMENTAL])
+        self._qgis_timed = set() # plugin ids, loaded by QGIS and recorded in load statistics
+        self._watchdogs = [] # dtype_watchdog_class per plugin path while plugin paths are watched
+        self._events = dtype_eventbus_class() # change sets for UI models and caches
+        self._latest_releases = {} # QGIS version str -> plugin id -> latest release per filters, see `get_latest_release`
+
+        self._allow_deprecated = self._config.str_to_bool(self._config.get(
+            CONFIG_KEY_ALLOW_DEPRECATED, self._config.bool_to_str(False)
+            )) # not present in fresh config if QgsSettings are not used
+        self._allow_experimental = self._config.str_to_bool(self._config.get(
+            CONFIG_KEY_ALLOW_EXPERIMENTAL, self._config.bool_to_str(False)
+            ))
 
         self.rebuild()
 
@@ -107,6 +157,22 @@ class dtype_index_class:
     def len_plugins(self):
         return len(self._plugins)
 
+    @property
+    def config(self):
+        return self._config
+
+    @property
+    def events(self):
+        return self._events
+
+    @property
+    def watched(self):
+        return len(self._watchdogs) > 0
+
+    @property
+    def qgis_version(self):
+        return self._qgis_version
+
     @property
     def allow_deprecated(self):
         return self._allow_deprecated
@@ -114,8 +180,11 @@ class dtype_index_class:
     def allow_deprecated(self, value):
         if not isinstance(value, bool):
             raise QgistTypeError(tr('value is not bool'))
+        changed = value != self._allow_deprecated
         self._allow_deprecated = value
         self._config[CONFIG_KEY_ALLOW_DEPRECATED] = self._config.bool_to_str(value)
+        if changed:
+            self._emit(EVENT_FILTER_CHANGED, 'allow_deprecated', value)
 
     @property
     def allow_experimental(self):
@@ -124,21 +193,38 @@ class dtype_index_class:
     def allow_experimental(self, value):
         if not isinstance(value, bool):
             raise QgistTypeError(tr('value is not bool'))
+        changed = value != self._allow_experimental
         self._allow_experimental = value
         self._config[CONFIG_KEY_ALLOW_EXPERIMENTAL] = self._config.bool_to_str(value)
+        if changed:
+            self._emit(EVENT_FILTER_CHANGED, 'allow_experimental', value)
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # MANAGEMENT: INDEX
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
     def rebuild(self):
-        "Rebuild index of repos and plugins"
+        "Rebuild index of repos and plugins - subscribers receive one change set"
+
+        with self._events.batch():
+            self._rebuild()
+
+    def _rebuild(self):
+
+        load_stats = {plugin.id: plugin.load_stats for plugin in self._plugins.values()} # not saved yet
+
+        for repo in self._repos: # re-added repos and plugins are coalesced into updates
+            self._emit(EVENT_REPO_REMOVED, repo.id)
+        for plugin_id in self._plugins.keys():
+            self._emit(EVENT_PLUGIN_REMOVED, plugin_id)
 
         self._repos.clear()
         self._plugins.clear()
         # TODO what about self._plugin_modules?
 
+        self._recover_transactions() # before plugin folders are scanned
         self._rebuild_plugins()
+        self._restore_load_stats(load_stats)
         self._rebuild_repos()
 
         self._ensure_qgislegacypython_default_repo()
@@ -148,6 +234,9 @@ class dtype_index_class:
 
         self._match_releases_from_repos_to_plugins()
 
+        for plugin_id in self._plugins.keys():
+            self._emit(EVENT_PLUGIN_ADDED, plugin_id)
+
         # Get inventory of installed plugins and match with repos
         # Every local plugin folder (i.e. Python module folder) contains a reference to its repo id!
         # If NOT:
@@ -167,6 +256,17 @@ class dtype_index_class:
 
         # Go through repos and their releases - produce list of (avaialble) plugins
 
+    def _recover_transactions(self):
+        "Revert (un-)install transactions interrupted by a crash"
+
+        for repo_type in backends.keys():
+            try:
+                install_fld = self.get_repo_class(repo_type).get_install_path(self._config)
+            except QgistNotImplementedError: # backend does not install into folders
+                continue
+            if os.path.isdir(install_fld):
+                dtype_transaction_class.recover(install_fld)
+
     def _rebuild_plugins(self):
 
         for repo_type in backends.keys():
@@ -186,6 +286,28 @@ class dtype_index_class:
                     raise QgistPluginIdCollisionError(tr('Two or more plugins with identical ID'))
                 self._plugins.update(found_plugins)
 
+    def _restore_load_stats(self, load_stats):
+        "Load statistics from before rebuild or from config, plus QGIS' own times for plugins it loaded"
+
+        saved = self._config.get(CONFIG_KEY_LOAD_STATS, {})
+        if not isinstance(saved, dict):
+            saved = {}
+
+        try:
+            from qgis.utils import plugin_times
+        except ModuleNotFoundError: # headless
+            plugin_times = {}
+
+        for plugin_id, plugin in self._plugins.items():
+            records = load_stats[plugin_id] if plugin_id in load_stats.keys() else saved.get(plugin_id, [])
+            for record in (records if isinstance(records, list) else []):
+                plugin.add_load_stats(record)
+            if plugin_id in self._qgis_timed or parse_qgis_plugin_time(plugin_times.get(plugin_id, None)) is None:
+                continue
+            record = get_load_record('qgis')
+            record['total'] = parse_qgis_plugin_time(plugin_times[plugin_id]) # classFactory and initGui
+            self.add_load_stats(plugin_id, record)
+
     def _rebuild_repos(self):
 
         for repo_type in backends.keys():
@@ -221,26 +343,82 @@ class dtype_index_class:
             raise QgistRepoError(tr('There must be exactly one C++ repository.'))
 
     def _refresh_repos(self):
+        "Refresh all active repos, one failing repo does not stop others - returns errors by repo id"
 
         # TODO refresh option from config
 
-        for repo in self._repos:
-            repo.refresh()
+        errors = {}
 
-    def _match_releases_from_repos_to_plugins(self):
+        for repo in self._repos:
+            if not repo.active:
+                continue
+            try:
+                repo.refresh(qgis_version = self._qgis_version)
+            except QgistRepoError as e:
+                errors[repo.id] = e
+                continue
+            self._emit(EVENT_REPO_UPDATED, repo.id)
+
+        return errors
+
+    def _match_releases_from_repos_to_plugins(self, plugin_ids = None):
+        "All plugins or only plugins by id (set), e.g. after changes of plugin folders"
+
+        matched_ids = set(self._plugins.keys()) if plugin_ids is None else plugin_ids & self._plugins.keys()
+        releases_before = { # by identity, for finding changed plugins
+            plugin_id: [id(release) for release in self._plugins[plugin_id].available_releases]
+            for plugin_id in matched_ids
+            }
+        added_ids = set()
+
+        # Remove uninstalled releases from plugins first, then plugins with zero releases
+        for plugin_id in matched_ids:
+            self._plugins[plugin_id].clear_uninstalled_releases()
+        for plugin_id in [plugin_id for plugin_id in matched_ids if not self._plugins[plugin_id].installed]:
+            self._plugins.pop(plugin_id)
+
+        # Go through all repos (from high to low priority), find all available releases
+        for repo in self._repos:
+            if not repo.active:
+                continue
+            releases = (
+                repo.plugin_releases
+                if plugin_ids is None else
+                (release for plugin_id in sorted(plugin_ids) for release in repo.get_plugin_releases(plugin_id))
+                )
+            for release in releases:
+                if release.id not in self._plugins.keys(): # new (uninstalled) plugin
+                    self._plugins[release.id] = dtype_plugin_class.from_release(release, self._config)
+                    added_ids.add(release.id)
+                elif release not in self._plugins[release.id]:
+                    self._plugins[release.id].add_release(release)
+
+        with self._events.batch():
+            for plugin_id, releases in releases_before.items():
+                if plugin_id not in self._plugins.keys():
+                    self._emit(EVENT_PLUGIN_REMOVED, plugin_id)
+                elif releases != [id(release) for release in self._plugins[plugin_id].available_releases]:
+                    self._emit(EVENT_PLUGIN_UPDATED, plugin_id)
+            for plugin_id in sorted(added_ids):
+                self._emit(EVENT_PLUGIN_ADDED, plugin_id)
+
+    def _emit(self, kind, target, value = None):
+
+        if kind in (EVENT_PLUGIN_ADDED, EVENT_PLUGIN_REMOVED, EVENT_PLUGIN_UPDATED): # releases may have changed
+            for view in self._latest_releases.values():
+                view.pop(target, None)
+
+        self._events.emit(dtype_event_class(kind, target, value))
 
-        # TODO
-        # Go through all repos, find all available releases
-        # Add them to matching plugins
+    @staticmethod
+    def _get_qgis_version():
 
-        # Remove uninstalled releases from plugins first? (`clear_uninstalled_releases`)
-        # Remove plugins with zero releases
+        try:
+            from qgis.core import Qgis
+        except ModuleNotFoundError: # headless, version unknown unless specified
+            return None
 
-        for repo in self._repos:
-            for release in repo.plugin_releases:
-                pass
-                # if release in plugins: add to plugin
-                # if not: new (uninstalled) plugin
+        return dtype_version_class.from_qgisversion(Qgis.QGIS_VERSION, fix_plugin_compatibility = True)
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # MANAGEMENT: REPOSITORIES
@@ -255,6 +433,7 @@ class dtype_index_class:
             raise QgistValueError(tr('"repo" can not be added - its id is already in list'))
 
         self._repos.append(repo) # Add to list at the end, i.e. with lowest priority
+        self._emit(EVENT_REPO_ADDED, repo.id)
 
     @classmethod
     def create_repo(cls, *args, repo_type = None, method = None, **kwargs):
@@ -292,6 +471,7 @@ class dtype_index_class:
             return
 
         self._repos[index + direction], self._repos[index] = self._repos[index], self._repos[index + direction]
+        self._emit(EVENT_REPOS_REORDERED, None, tuple(repo.id for repo in self._repos))
 
     def get_repo(self, repo_id):
         "Get repository from index by id (if it is present)"
@@ -324,12 +504,54 @@ class dtype_index_class:
         repo = self.get_repo(repo_id)
         repo.remove()
         self._repos.remove(repo)
+        self._emit(EVENT_REPO_REMOVED, repo.id)
 
-    # def refresh_repos(self):
-    #     "Reload index of every repo"
-    #
-    #     for repo in self._repos:
-    #         repo.refresh()
+    def dump_repos(self):
+        "Releases of all remote repos by URL - one refresh can be shared across profiles / processes"
+
+        return {
+            repo.url: repo.dump_releases()
+            for repo in self._repos
+            if repo.repo_type == REPO_BACKEND_QGISLEGACYPYTHON
+            }
+
+    def load_repos(self, repos_dumped):
+        "Replace releases of repos with matching URLs (see `dump_repos`) and update plugins"
+
+        if not isinstance(repos_dumped, dict):
+            raise QgistTypeError(tr('"repos_dumped" must be a dict.'))
+
+        with self._events.batch():
+            for repo in self._repos:
+                if repo.repo_type != REPO_BACKEND_QGISLEGACYPYTHON or repo.url not in repos_dumped.keys():
+                    continue
+                repo.load_releases(repos_dumped[repo.url])
+                self._emit(EVENT_REPO_UPDATED, repo.id)
+            self._match_releases_from_repos_to_plugins()
+
+    def apply_fetched_repo(self, repo_id, fetched):
+        "Replace releases of repo by result of its `fetch`, e.g. run in another thread, and update its plugins"
+
+        repo = self.get_repo(repo_id)
+        plugin_ids = {release.id for release in repo.plugin_releases} # before and after, i.e. removed plugins too
+
+        with self._events.batch():
+            repo.apply_fetched(fetched)
+            self._emit(EVENT_REPO_UPDATED, repo.id)
+            plugin_ids.update(release.id for release in repo.plugin_releases)
+            self._match_releases_from_repos_to_plugins(plugin_ids)
+
+    def refresh_repos(self):
+        """
+        Reload index of every active repo from its remote source and update plugins
+        Returns dict of errors (`QgistRepoError`) by id of repos which could not be refreshed
+        """
+
+        with self._events.batch():
+            errors = self._refresh_repos()
+            self._match_releases_from_repos_to_plugins()
+
+        return errors
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # MANAGEMENT: PLUGINS
@@ -344,6 +566,7 @@ class dtype_index_class:
             raise QgistValueError(tr('"plugin" can not be added - it is already in dict'))
 
         self._plugins[plugin.id] = plugin
+        self._emit(EVENT_PLUGIN_ADDED, plugin.id)
 
     def get_plugin(self, plugin_id):
         "Get a plugin from index by id"
@@ -361,6 +584,34 @@ class dtype_index_class:
     #
     #     pass
 
+    def add_load_stats(self, plugin_id, record):
+        "Record load of plugin, e.g. by QGIS (see `loadstats.hook_qgis_loader`) - unknown plugins are ignored"
+
+        if plugin_id not in self._plugins.keys():
+            return
+
+        self._plugins[plugin_id].add_load_stats(record)
+        if record['loader'] == 'qgis':
+            self._qgis_timed.add(plugin_id)
+
+    def get_load_stats(self):
+        "Load records by plugin id, only plugins with records"
+
+        return {
+            plugin.id: plugin.load_stats
+            for plugin in self._plugins.values() if len(plugin.load_stats) > 0
+            }
+
+    def save_load_stats(self):
+        "Write load statistics to config - once in a while, not after every load"
+
+        saved = self._config.get(CONFIG_KEY_LOAD_STATS, {})
+        if not isinstance(saved, dict):
+            saved = {}
+
+        saved.update(self.get_load_stats()) # keeps records of plugins not in index, e.g. temporarily uninstalled
+        self._config[CONFIG_KEY_LOAD_STATS] = saved
+
     def get_all_installed_plugins(self):
         "Currently installed plugins"
 
@@ -370,3 +621,273 @@ class dtype_index_class:
         "Available plugins, compatible to QGIS version"
 
         return (plugin for plugin in self._plugins.values() if plugin.available)
+
+    def get_all_upgradable_plugins(self):
+        "Installed plugins with a newer release matching QGIS version and index filters"
+
+        return (
+            plugin for plugin in self.get_all_installed_plugins()
+            if self.is_upgradable(plugin.id)
+            )
+
+    def get_latest_release(self, plugin_id, qgis_version = None, allow_experimental = None, allow_deprecated = None):
+        """
+        Latest release of plugin matching QGIS version and filters (default: of index), None if there is none
+        Cached per plugin and QGIS version for all filter combinations at once, i.e. toggling filters
+        does not look at releases again. Entries of changed plugins are dropped (see `_emit`).
+        """
+
+        plugin = self.get_plugin(plugin_id)
+
+        if not isinstance(qgis_version, dtype_version_class) and qgis_version is not None:
+            raise QgistTypeError(tr('"qgis_version" must be a version or None.'))
+        if not isinstance(allow_experimental, bool) and allow_experimental is not None:
+            raise QgistTypeError(tr('"allow_experimental" must be a bool or None.'))
+        if not isinstance(allow_deprecated, bool) and allow_deprecated is not None:
+            raise QgistTypeError(tr('"allow_deprecated" must be a bool or None.'))
+
+        qgis_version = qgis_version if qgis_version is not None else self._qgis_version
+        allow_experimental = allow_experimental if allow_experimental is not None else self._allow_experimental
+        allow_deprecated = allow_deprecated if allow_deprecated is not None else self._allow_deprecated
+
+        view = self._latest_releases.setdefault(str(qgis_version), {})
+        if plugin_id not in view.keys():
+            view[plugin_id] = _get_latest_releases(plugin, qgis_version)
+
+        return view[plugin_id][(allow_experimental, allow_deprecated)]
+
+    def get_latest_releases(self, **kwargs):
+        "Latest release per plugin id (see `get_latest_release`), plugins without matching release are skipped"
+
+        latest = {plugin_id: self.get_latest_release(plugin_id, **kwargs) for plugin_id in self._plugins.keys()}
+
+        return {plugin_id: release for plugin_id, release in latest.items() if release is not None}
+
+    def get_current_release(self, plugin_id):
+        "Release describing plugin, e.g. in lists: installed, otherwise latest matching index filters, otherwise latest"
+
+        plugin = self.get_plugin(plugin_id)
+
+        if plugin.installed:
+            return plugin.installed_release
+
+        release = self.get_latest_release(plugin_id)
+        if release is not None:
+            return release
+
+        return plugin.get_latest_release()
+
+    def is_upgradable(self, plugin_id):
+        "Is plugin installed and is there a newer release matching QGIS version and index filters?"
+
+        plugin = self.get_plugin(plugin_id)
+
+        if not plugin.installed:
+            return False
+
+        latest_release = self.get_latest_release(plugin.id)
+        if latest_release is None:
+            return False
+
+        return latest_release.version > plugin.installed_release.version
+
+    def install_releases(self, releases, jobs = INSTALL_DOWNLOAD_JOBS, dry_run = False):
+        """
+        Install or upgrade/downgrade many plugins at once, one release per plugin (see `dtype_installer_class`)
+        Plugins are not (re-)loaded, activation is the caller's job. Returns errors by plugin id
+        """
+
+        if not isinstance(releases, list) and not isinstance(releases, tuple):
+            raise QgistTypeError(tr('"releases" must be a list or tuple.'))
+        if not all((isinstance(release, dtype_pluginrelease_base_class) for release in releases)):
+            raise QgistTypeError(tr('All releases must be plugin releases.'))
+
+        plugins = {release.id: self.get_plugin(release.id) for release in releases}
+
+        mirrors = {} # archives of repos with mirrors are downloaded from the fastest working one
+        for release in releases:
+            for repo in self._repos:
+                if repo.active and repo.mirrors is not None and release in repo:
+                    mirrors[release.id] = repo.mirrors
+                    break
+
+        paths, errors = dtype_installer_class(self._config, jobs = jobs).install(
+            releases, dry_run = dry_run, mirrors = mirrors,
+            )
+        if dry_run:
+            return errors
+
+        with self._events.batch():
+            for release in releases:
+                if release.id in paths.keys():
+                    plugins[release.id].set_installed(release, paths[release.id])
+                    self._emit(EVENT_PLUGIN_UPDATED, release.id)
+            self._match_releases_from_repos_to_plugins() # replaced releases may have hidden repo releases
+
+        return errors
+
+    def uninstall_plugins(self, plugin_ids, dry_run = False):
+        "Uninstall many plugins in one transaction. Returns errors by plugin id"
+
+        if not isinstance(plugin_ids, list) and not isinstance(plugin_ids, tuple):
+            raise QgistTypeError(tr('"plugin_ids" must be a list or tuple.'))
+
+        plugins = [self.get_plugin(plugin_id) for plugin_id in plugin_ids]
+        for plugin in plugins:
+            if not plugin.installed:
+                raise QgistValueError(tr('plugin is not installed') + f': {plugin.id:s}')
+            if plugin.protected or plugin.active:
+                raise QgistValueError(tr('plugin is protected or active') + f': {plugin.id:s}')
+
+        paths, errors = dtype_installer_class(self._config).uninstall(
+            [plugin.installed_release for plugin in plugins], dry_run = dry_run,
+            )
+        if dry_run:
+            return errors
+
+        with self._events.batch():
+            for plugin in plugins:
+                if plugin.id in paths.keys():
+                    plugin.set_uninstalled(paths[plugin.id])
+                    self._emit(EVENT_PLUGIN_UPDATED, plugin.id)
+            self._match_releases_from_repos_to_plugins() # drops plugins without releases
+
+        return errors
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# MANAGEMENT: PLUGIN FOLDERS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def update_plugin_flds(self, paths):
+        """
+        Update index after plugin folders were added, removed or changed by someone else
+        (e.g. deployment scripts or QGIS' own installer), instead of a full `rebuild`.
+        `paths` are plugin folders or anything inside them. Only affected plugins are touched.
+        Returns ids of affected plugins (set)
+        """
+
+        if not isinstance(paths, list) and not isinstance(paths, set) and not isinstance(paths, tuple):
+            raise QgistTypeError(tr('"paths" must be a list, set or tuple.'))
+        if not all((isinstance(path, str) for path in paths)):
+            raise QgistTypeError(tr('All paths must be str.'))
+
+        plugin_flds = {} # plugin folder -> (repo type, protected)
+        for plugin_path, repo_type, protected in self._get_plugin_paths():
+            for path in paths:
+                relpath = os.path.relpath(os.path.abspath(path), plugin_path)
+                if relpath == os.curdir or relpath.startswith(os.pardir) or relpath.startswith('.'):
+                    continue # outside of plugin path, plugin path itself or hidden (e.g. staging folder)
+                plugin_flds[os.path.join(plugin_path, relpath.split(os.sep)[0])] = (repo_type, protected)
+
+        plugin_ids = set()
+        with self._events.batch():
+            for plugin_fld, (repo_type, protected) in sorted(plugin_flds.items()):
+                plugin_id = self._update_plugin_fld(plugin_fld, repo_type, protected)
+                if plugin_id is not None:
+                    plugin_ids.add(plugin_id)
+            self._match_releases_from_repos_to_plugins(plugin_ids) # removed plugins fall back to repo releases
+
+        return plugin_ids
+
+    def watch(self, on_update = None, debounce = WATCHDOG_DEBOUNCE):
+        """
+        Watch plugin paths and keep index current through `update_plugin_flds`
+        `on_update(plugin_ids, error)` is called after each update. Requires a Qt event loop
+        """
+
+        if on_update is not None and not callable(on_update):
+            raise QgistTypeError(tr('"on_update" must be callable or None.'))
+        if len(self._watchdogs) > 0:
+            raise QgistValueError(tr('plugin folders are already watched'))
+
+        def changed(paths):
+            try:
+                plugin_ids, error = self.update_plugin_flds(paths), None
+            except (
+                QgistMetaKeyError, QgistMetaTxtError, QgistNotAPluginDirectoryError, QgistNotADirectoryError,
+                QgistPluginIdCollisionError, QgistTypeError, QgistValueError,
+                ) as e: # e.g. half-written metadata, keep watching
+                plugin_ids, error = set(), e
+            if on_update is not None and (len(plugin_ids) > 0 or error is not None):
+                on_update(plugin_ids, error)
+
+        for plugin_path in sorted({plugin_path for plugin_path, _, _ in self._get_plugin_paths()}):
+            if not os.path.isdir(plugin_path): # e.g. fresh profile without plugins
+                continue
+            watchdog = dtype_watchdog_class(plugin_path, patterns = WATCHDOG_PLUGIN_PATTERNS, depth = 1)
+            watchdog.start(changed, debounce = debounce)
+            self._watchdogs.append(watchdog)
+
+    def unwatch(self):
+
+        for watchdog in self._watchdogs:
+            watchdog.close()
+        self._watchdogs.clear()
+
+    def _update_plugin_fld(self, plugin_fld, repo_type, protected):
+        "Add, update or uninstall one plugin by its folder, returns plugin id or None if nothing changed"
+
+        plugin_id = os.path.basename(plugin_fld)
+        plugin = self._plugins.get(plugin_id, None)
+        installed_here = plugin is not None and plugin.installed and os.path.abspath(plugin.installed_release.path) == plugin_fld
+
+        if plugin is not None and plugin.installed and not installed_here:
+            if os.path.exists(plugin_fld):
+                raise QgistPluginIdCollisionError(tr('Two or more plugins with identical ID') + f': {plugin_id:s}')
+            return None # some other folder was removed
+
+        self.get_repo_class(repo_type) # loads backend
+        if not backends[repo_type].dtype_pluginrelease_class.is_python_plugin_dir(plugin_fld):
+            if not installed_here:
+                return None # not a plugin (yet), e.g. still being copied
+            plugin.set_uninstalled(plugin_fld)
+            self._emit(EVENT_PLUGIN_UPDATED, plugin_id)
+            return plugin_id
+
+        found_plugin = dtype_plugin_class.from_installed(
+            plugin_fld, self._config, repo_type, protected, self._plugin_modules.copy(),
+            )
+        if plugin is None:
+            self.add_plugin(found_plugin)
+        else:
+            plugin.set_installed(found_plugin.installed_release, plugin_fld) # keeps state, e.g. activation
+            plugin.protected = protected
+            self._emit(EVENT_PLUGIN_UPDATED, plugin_id)
+
+        return plugin_id
+
+    def _get_plugin_paths(self):
+        "Folders containing plugin folders, as (path, repo type, protected)"
+
+        plugin_paths = []
+
+        for repo_type in backends.keys():
+            for protected in (True, False):
+                try:
+                    found_paths = self.get_repo_class(repo_type).get_plugin_paths(self._config, protected)
+                except QgistNotImplementedError: # backend does not keep plugins in folders
+                    continue
+                plugin_paths.extend((os.path.abspath(path), repo_type, protected) for path in found_paths)
+
+        return plugin_paths
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _get_latest_releases(plugin, qgis_version):
+    "Latest compatible release by (allow_experimental, allow_deprecated), in one pass over releases, newest first"
+
+    latest = {(True, True): None, (True, False): None, (False, True): None, (False, False): None}
+
+    for release in plugin.get_releases(qgis_version = qgis_version):
+        experimental, deprecated = release.experimental, bool(release.meta['deprecated'].value)
+        for allow_experimental, allow_deprecated in latest.keys():
+            if latest[(allow_experimental, allow_deprecated)] is not None:
+                continue
+            if (allow_experimental or not experimental) and (allow_deprecated or not deprecated):
+                latest[(allow_experimental, allow_deprecated)] = release
+        if latest[(False, False)] is not None: # strictest filter, i.e. every other one has been matched
+            break
+
+    return latest
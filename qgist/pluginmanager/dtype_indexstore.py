@@ -0,0 +1,553 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_indexstore.py: SQLite index store data type
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import contextlib
+import itertools
+import json
+import os
+import sqlite3
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .backends import backends
+from .const import (
+    INDEXSTORE_CACHED_STATEMENTS,
+    INDEXSTORE_FN,
+    INDEXSTORE_SCHEMA_VERSION,
+    SEARCH_FIELDS,
+    )
+from .error import QgistIndexStoreError
+from .dtype_plugin import dtype_plugin_class
+from .dtype_repository_base import dtype_repository_base_class
+from .dtype_searchindex import get_terms
+from .dtype_settings import dtype_settings_class
+from .dtype_version import dtype_version_class
+
+from ..config import get_config_path
+from ..error import (
+    QgistNotImplementedError,
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_SEARCH_COLUMNS = tuple(SEARCH_FIELDS.keys()) # FTS5 columns, in order of bm25 weights
+
+_SCHEMA = (
+    """CREATE TABLE repos (
+        repo_id TEXT PRIMARY KEY,
+        repo_type TEXT NOT NULL,
+        name TEXT NOT NULL,
+        url TEXT,
+        active INTEGER NOT NULL,
+        priority INTEGER NOT NULL
+        )""",
+    """CREATE TABLE releases (
+        release_id INTEGER PRIMARY KEY,
+        repo_id TEXT NOT NULL REFERENCES repos (repo_id) ON DELETE CASCADE,
+        plugin_id TEXT NOT NULL,
+        version TEXT NOT NULL,
+        experimental INTEGER NOT NULL,
+        deprecated INTEGER NOT NULL,
+        qgis_min INTEGER,
+        qgis_max INTEGER,
+        qgis_exact INTEGER NOT NULL,
+        meta TEXT NOT NULL
+        )""",
+    'CREATE INDEX releases_plugin_version ON releases (plugin_id, version)',
+    'CREATE INDEX releases_qgis ON releases (qgis_min, qgis_max)',
+    'CREATE INDEX releases_repo ON releases (repo_id)',
+    )
+_SCHEMA_FTS5 = (
+    'CREATE VIRTUAL TABLE search USING fts5('
+    + ', '.join(_SEARCH_COLUMNS)
+    + ", tokenize='unicode61 remove_diacritics 2')"
+    )
+_SCHEMA_FALLBACK = 'CREATE TABLE search (rowid INTEGER PRIMARY KEY, text TEXT NOT NULL)' # no FTS5 in SQLite build
+
+_INSERT_REPO = 'INSERT INTO repos VALUES (?, ?, ?, ?, ?, ?)'
+_INSERT_RELEASE = 'INSERT INTO releases VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+_INSERT_SEARCH_FTS5 = (
+    'INSERT INTO search (rowid, ' + ', '.join(_SEARCH_COLUMNS) + ') VALUES (?'
+    + ', ?' * len(_SEARCH_COLUMNS) + ')'
+    )
+_INSERT_SEARCH_FALLBACK = 'INSERT INTO search VALUES (?, ?)'
+
+_SELECT_RELEASES = """
+    SELECT releases.plugin_id, repos.repo_type, releases.meta FROM releases
+    JOIN repos ON repos.repo_id = releases.repo_id
+    WHERE repos.active AND {where:s}
+    ORDER BY releases.plugin_id, repos.priority, releases.release_id
+    """
+_COMPATIBLE = '(NOT releases.qgis_exact OR ((releases.qgis_min IS NULL OR releases.qgis_min <= ?) AND (releases.qgis_max IS NULL OR releases.qgis_max >= ?)))'
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_indexstore_class:
+    """
+    Repositories and their releases in a local SQLite database, alternative to in-memory lists and config caches
+
+    One row per release with its meta data (as in config caches, see `as_config_decompressed`) plus
+    indexed columns for plugin id, version and QGIS minimum / maximum version, i.e. lookups and
+    compatibility filters run inside SQLite. Repos are written in bulk, one transaction per call,
+    through prepared (cached) statements. The database runs in WAL mode, i.e. readers (e.g. the
+    command line) do not block a writer (e.g. a refresh inside QGIS). Searches use FTS5 with BM25
+    weights from `SEARCH_FIELDS` if the SQLite build provides it, otherwise plain substring matches.
+    Plugins are read as views: `dtype_plugin_class` objects with uninstalled releases, built per
+    query and one plugin at a time. The database is a cache - a file with an unknown schema version
+    is recreated.
+
+    Mutable.
+    """
+
+    def __init__(self, path):
+
+        if not isinstance(path, str):
+            raise QgistTypeError(tr('"path" must be a str.'))
+
+        try:
+            self._connection = sqlite3.connect(
+                path, isolation_level = None, cached_statements = INDEXSTORE_CACHED_STATEMENTS,
+                ) # transactions are explicit, see `_transaction`
+            self._connection.execute('PRAGMA journal_mode = WAL')
+            self._connection.execute('PRAGMA synchronous = NORMAL') # WAL: durable at checkpoints, never corrupt
+            self._connection.execute('PRAGMA foreign_keys = ON')
+        except sqlite3.Error as e:
+            raise QgistIndexStoreError(tr('Opening index store failed') + f': {path:s} ({str(e):s})')
+
+        self._path = path
+        self._fts5 = None # available in SQLite build?
+
+        self._ensure_schema()
+
+    def __repr__(self):
+
+        return f'<indexstore ({id(self):x}) path="{self._path:s}" fts5={"yes" if self._fts5 else "no":s}>'
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def fts5(self):
+        return self._fts5
+
+    @property
+    def repo_ids(self):
+        "By priority, from high to low"
+        return tuple(row[0] for row in self._query('SELECT repo_id FROM repos ORDER BY priority'))
+
+    @property
+    def len_releases(self):
+        return self._query('SELECT count(*) FROM releases')[0][0]
+
+    @property
+    def len_plugins(self):
+        return self._query('SELECT count(DISTINCT plugin_id) FROM releases')[0][0]
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API: WRITE
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def store_repos(self, repos):
+        "Replace all repos and their releases, e.g. by `index.repos` (priority is order of repos)"
+
+        if not isinstance(repos, list) and not isinstance(repos, tuple):
+            raise QgistTypeError(tr('"repos" must be a list or tuple.'))
+        if not all((isinstance(repo, dtype_repository_base_class) for repo in repos)):
+            raise QgistTypeError(tr('All repos must be repositories.'))
+
+        with self._transaction():
+            for repo_id in self.repo_ids:
+                self._delete_repo(repo_id)
+            for priority, repo in enumerate(repos):
+                self._insert_repo(repo, priority)
+
+    def store_repo(self, repo, priority):
+        "Add or replace one repo and its releases, e.g. after a refresh"
+
+        if not isinstance(repo, dtype_repository_base_class):
+            raise QgistTypeError(tr('"repo" must be a repository.'))
+        if not isinstance(priority, int):
+            raise QgistTypeError(tr('"priority" must be an int.'))
+
+        with self._transaction():
+            self._delete_repo(repo.id)
+            self._insert_repo(repo, priority)
+
+    def remove_repo(self, repo_id):
+
+        if not isinstance(repo_id, str):
+            raise QgistTypeError(tr('"repo_id" must be a str.'))
+
+        with self._transaction():
+            self._delete_repo(repo_id)
+
+    def close(self):
+
+        self._connection.close()
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API: READ
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def get_plugin_ids(self, qgis_version = None):
+        "Ids of plugins with releases in active repos, optionally compatible to QGIS version, sorted"
+
+        select = 'SELECT DISTINCT releases.plugin_id FROM releases JOIN repos USING (repo_id) WHERE repos.active AND '
+
+        where, parameters = self._get_compatible(qgis_version)
+        if where == '1': # no filter or QGIS version without key
+            return sorted(
+                [row[0] for row in self._query(select + '1')]
+                if qgis_version is None else
+                [plugin.id for plugin in self.get_plugins(qgis_version = qgis_version)]
+                )
+
+        plugin_ids = {row[0] for row in self._query(select + 'releases.qgis_exact AND ' + where, parameters)}
+        inexact_ids = [ # releases with unusual QGIS versions are checked by `is_compatible`
+            row[0] for row in self._query(select + 'NOT releases.qgis_exact')
+            if row[0] not in plugin_ids
+            ]
+        plugin_ids.update(plugin.id for plugin in self.get_plugins(inexact_ids, qgis_version = qgis_version))
+
+        return sorted(plugin_ids)
+
+    def get_plugin(self, plugin_id, qgis_version = None, config = None):
+        "View of plugin by id, i.e. a plugin with uninstalled releases from active repos, None if there is none"
+
+        if not isinstance(plugin_id, str):
+            raise QgistTypeError(tr('"plugin_id" must be a str.'))
+
+        return next(self._get_plugins('releases.plugin_id = ?', (plugin_id,), qgis_version, config), None)
+
+    def get_plugins(self, plugin_ids = None, qgis_version = None, config = None):
+        "Views of plugins (see `get_plugin`), all or by ids, sorted by id - built one at a time while iterating"
+
+        if plugin_ids is None:
+            return self._get_plugins('1', (), qgis_version, config)
+
+        if not isinstance(plugin_ids, list) and not isinstance(plugin_ids, tuple):
+            raise QgistTypeError(tr('"plugin_ids" must be a list, a tuple or None.'))
+        if not all((isinstance(plugin_id, str) for plugin_id in plugin_ids)):
+            raise QgistTypeError(tr('All plugin ids must be str.'))
+
+        return (
+            plugin
+            for chunk in _get_chunks(sorted(set(plugin_ids))) # SQLite limits number of parameters
+            for plugin in self._get_plugins(
+                'releases.plugin_id IN (' + ', '.join('?' * len(chunk)) + ')', chunk, qgis_version, config,
+                )
+            )
+
+    def get_release(self, plugin_id, version):
+        "Release of plugin by version from highest priority repo, None if there is none"
+
+        if not isinstance(plugin_id, str):
+            raise QgistTypeError(tr('"plugin_id" must be a str.'))
+        if not isinstance(version, dtype_version_class):
+            raise QgistTypeError(tr('"version" must be a version.'))
+
+        rows = self._query(
+            _SELECT_RELEASES.format(where = 'releases.plugin_id = ? AND releases.version = ?') + ' LIMIT 1',
+            (plugin_id, version.original),
+            )
+        if len(rows) == 0:
+            return None
+
+        return self._get_release(*rows[0])
+
+    def search(self, query, limit = None):
+        "Plugin ids and scores, best first: all words of query must match (as prefixes)"
+
+        if not isinstance(query, str):
+            raise QgistTypeError(tr('"query" must be a str.'))
+        if not isinstance(limit, int) and limit is not None:
+            raise QgistTypeError(tr('"limit" must be an int or None.'))
+        if limit is not None and limit < 1:
+            raise QgistValueError(tr('"limit" must be at least 1.'))
+
+        terms = get_terms(query)
+        if len(terms) == 0:
+            return []
+
+        if self._fts5:
+            weights = ', '.join(f'{SEARCH_FIELDS[name]:f}' for name in _SEARCH_COLUMNS)
+            rows = self._query( # bm25 is not available inside of aggregates, i.e. best score per plugin below
+                f'SELECT releases.plugin_id, -bm25(search, {weights:s}) FROM search '
+                'JOIN releases ON releases.release_id = search.rowid '
+                'JOIN repos ON repos.repo_id = releases.repo_id '
+                'WHERE search MATCH ? AND repos.active',
+                (' '.join(f'"{term:s}"*' for term in terms),), # words only, i.e. nothing to escape
+                )
+        else:
+            rows = self._query(
+                'SELECT releases.plugin_id, 1.0 FROM search '
+                'JOIN releases ON releases.release_id = search.rowid '
+                'JOIN repos ON repos.repo_id = releases.repo_id '
+                'WHERE repos.active AND ' + ' AND '.join(['search.text LIKE ?'] * len(terms)),
+                tuple(f'%{term:s}%' for term in terms),
+                )
+
+        scores = {}
+        for plugin_id, score in rows:
+            if score > scores.get(plugin_id, float('-inf')):
+                scores[plugin_id] = score
+
+        return sorted(scores.items(), key = lambda item: (-item[1], item[0]))[:limit]
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER: WRITE
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _insert_repo(self, repo, priority):
+
+        try:
+            url = repo.url
+        except QgistNotImplementedError: # repo type without URL
+            url = None
+
+        self._connection.execute(_INSERT_REPO, (repo.id, repo.repo_type, repo.name, url, repo.active, priority))
+
+        rows = [_get_release_row(repo.id, release) for release in repo.plugin_releases]
+        self._connection.executemany(_INSERT_RELEASE, (row for row, _ in rows))
+
+        release_ids = self._query( # consecutive, inserted within this transaction
+            'SELECT release_id FROM releases WHERE repo_id = ? ORDER BY release_id', (repo.id,),
+            )
+        if self._fts5:
+            self._connection.executemany(_INSERT_SEARCH_FTS5, (
+                (release_id, *fields) for (release_id,), (_, fields) in zip(release_ids, rows)
+                ))
+        else:
+            self._connection.executemany(_INSERT_SEARCH_FALLBACK, (
+                (release_id, ' '.join(get_terms(' '.join(fields)))) for (release_id,), (_, fields) in zip(release_ids, rows)
+                ))
+
+    def _delete_repo(self, repo_id):
+
+        self._connection.execute(
+            'DELETE FROM search WHERE rowid IN (SELECT release_id FROM releases WHERE repo_id = ?)', (repo_id,),
+            )
+
+        self._connection.execute('DELETE FROM repos WHERE repo_id = ?', (repo_id,)) # releases cascade
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER: READ
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _get_plugins(self, where, parameters, qgis_version, config):
+
+        if not isinstance(config, dtype_settings_class) and config is not None:
+            raise QgistTypeError(tr('"config" must be a "dtype_settings_class" object or None.'))
+
+        compatible, compatible_parameters = self._get_compatible(qgis_version)
+
+        try:
+            cursor = self._connection.execute(
+                _SELECT_RELEASES.format(where = f'{where:s} AND {compatible:s}'),
+                (*parameters, *compatible_parameters),
+                )
+        except sqlite3.Error as e:
+            raise QgistIndexStoreError(tr('Querying index store failed') + f': {str(e):s}')
+
+        for plugin_id, rows in itertools.groupby(cursor, key = lambda row: row[0]):
+            releases = [self._get_release(*row) for row in rows]
+            if qgis_version is not None:
+                releases = [release for release in releases if release.is_compatible(qgis_version)]
+            if len(releases) == 0:
+                continue
+            plugin = dtype_plugin_class.from_release(releases[0], config)
+            for release in releases[1:]:
+                if release not in plugin: # identical release from repo of lower priority
+                    plugin.add_release(release)
+            yield plugin
+
+    @staticmethod
+    def _get_compatible(qgis_version):
+        "SQL condition: release may be compatible - inexact keys are checked by caller"
+
+        if qgis_version is None:
+            return '1', ()
+        if not isinstance(qgis_version, dtype_version_class):
+            raise QgistTypeError(tr('"qgis_version" must be a version or None.'))
+
+        key = _get_qgis_key(qgis_version)
+        if key is None:
+            return '1', ()
+
+        return _COMPATIBLE, (key, key)
+
+    @staticmethod
+    def _get_release(plugin_id, repo_type, meta):
+
+        if not backends[repo_type].module_loaded:
+            backends[repo_type].load_module()
+
+        return backends[repo_type].dtype_pluginrelease_class.from_config_decompressed(json.loads(meta))
+
+    def _query(self, sql, parameters = ()):
+
+        try:
+            return self._connection.execute(sql, parameters).fetchall()
+        except sqlite3.Error as e:
+            raise QgistIndexStoreError(tr('Querying index store failed') + f': {str(e):s}')
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        "One write transaction, rolled back on errors"
+
+        try:
+            self._connection.execute('BEGIN IMMEDIATE') # take write lock now, not on first write
+        except sqlite3.Error as e:
+            raise QgistIndexStoreError(tr('Starting transaction failed') + f': {str(e):s}')
+
+        try:
+            yield
+        except sqlite3.Error as e:
+            self._connection.execute('ROLLBACK')
+            raise QgistIndexStoreError(tr('Writing index store failed') + f': {str(e):s}')
+        except:
+            self._connection.execute('ROLLBACK')
+            raise
+
+        try:
+            self._connection.execute('COMMIT')
+        except sqlite3.Error as e:
+            raise QgistIndexStoreError(tr('Committing transaction failed') + f': {str(e):s}')
+
+    def _ensure_schema(self):
+        "Create tables, recreate them if schema is outdated"
+
+        try:
+            version = self._connection.execute('PRAGMA user_version').fetchone()[0]
+            tables = {row[0] for row in self._connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        except sqlite3.Error as e:
+            raise QgistIndexStoreError(tr('Reading index store failed') + f': {str(e):s}')
+
+        if version == INDEXSTORE_SCHEMA_VERSION and 'releases' in tables:
+            sql = self._connection.execute("SELECT sql FROM sqlite_master WHERE name = 'search'").fetchone()[0]
+            self._fts5 = 'fts5' in sql.lower()
+            return
+
+        with self._transaction():
+            for table in ('search', 'releases', 'repos'):
+                self._connection.execute(f'DROP TABLE IF EXISTS {table:s}')
+            for statement in _SCHEMA:
+                self._connection.execute(statement)
+            try:
+                self._connection.execute(_SCHEMA_FTS5)
+                self._fts5 = True
+            except sqlite3.OperationalError: # "no such module: fts5"
+                self._connection.execute(_SCHEMA_FALLBACK)
+                self._fts5 = False
+            self._connection.execute(f'PRAGMA user_version = {INDEXSTORE_SCHEMA_VERSION:d}')
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PRE-CONSTRUCTOR
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @classmethod
+    def from_config(cls, config):
+        "Database next to config file of profile"
+
+        if not isinstance(config, dtype_settings_class):
+            raise QgistTypeError(tr('"config" must be a "dtype_settings_class" object.'))
+
+        return cls(os.path.join(get_config_path(config.settings_dir), INDEXSTORE_FN))
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _get_release_row(repo_id, release):
+    "Row for releases table and values of search columns"
+
+    meta = release.meta
+
+    minimum = meta['qgisMinimumVersion'].value
+    maximum = meta['qgisMaximumVersion'].value
+    if minimum is not None and maximum is None: # QGIS default: compatible within major release of minimum version
+        maximum = dtype_version_class(minimum[0], '99', '99')
+    minimum_key = None if minimum is None else _get_qgis_key(minimum)
+    maximum_key = None if minimum is None else _get_qgis_key(maximum)
+    exact = minimum is None or (minimum_key is not None and maximum_key is not None)
+
+    return (
+        repo_id, release.id, release.version.original,
+        release.experimental, bool(meta['deprecated'].value),
+        minimum_key, maximum_key, exact,
+        json.dumps(meta.as_config_decompressed()),
+        ), _get_search_fields(meta)
+
+def _get_search_fields(meta):
+
+    return tuple(
+        ' '.join(meta[name].value) if name == 'tags' and meta[name].value_set else (
+            meta[name].value_string if meta[name].value_set else ''
+            )
+        for name in _SEARCH_COLUMNS
+        )
+
+def _get_qgis_key(version):
+    """
+    Integer key of QGIS version, ordered like versions: three elements, each empty or a plain number
+    below 999 (empty elements, e.g. from "3.4", come before all numbers) - None for anything else
+    """
+
+    if len(version) != 3:
+        return None
+
+    key = 0
+    for element in (version[index] for index in range(len(version))):
+        if len(element) == 0:
+            key = key * 1000
+            continue
+        if not element.isdigit() or (element[0] == '0' and element != '0') or int(element) >= 999:
+            return None
+        key = key * 1000 + int(element) + 1
+
+    return key
+
+def _get_chunks(items, size = 500):
+
+    return (tuple(items[offset:offset + size]) for offset in range(0, len(items), size))
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_installer.py: Installer data type
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from concurrent.futures import (
+    as_completed,
+    ThreadPoolExecutor,
+    )
+import os
+import shutil
+import zipfile
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .backends import backends
+from .const import (
+    ARCHIVE_CHUNK_SIZE,
+    INSTALL_DOWNLOAD_JOBS,
+    )
+from .dtype_archive_cache import dtype_archive_cache_class
+from .dtype_mirrors import dtype_mirrors_class
+from .dtype_pluginrelease_base import dtype_pluginrelease_base_class
+from .dtype_settings import dtype_settings_class
+from .dtype_transaction import dtype_transaction_class
+from .error import (
+    QgistDownloadError,
+    QgistInstallFailed,
+    )
+
+from ..error import (
+    QgistNotImplementedError,
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_installer_class:
+    """
+    Installs plugin releases into the plugin folder of a profile
+
+    Pipeline: Archives are downloaded concurrently (through the archive cache). Every completed
+    download is handed to one extraction worker, which streams zip members into a transaction.
+    Once all archives are extracted, the transaction swaps the plugin folders into place. Plugins
+    are never imported here, i.e. activation (`load`) remains the caller's job on the main thread.
+
+    Mutable.
+    """
+
+    def __init__(self, config, cache = None, jobs = INSTALL_DOWNLOAD_JOBS):
+
+        if not isinstance(config, dtype_settings_class):
+            raise QgistTypeError(tr('"config" must be a "dtype_settings_class" object.'))
+        if not isinstance(cache, dtype_archive_cache_class) and cache is not None:
+            raise QgistTypeError(tr('"cache" must be an archive cache or None.'))
+        if not isinstance(jobs, int):
+            raise QgistTypeError(tr('"jobs" must be an int.'))
+        if jobs < 1:
+            raise QgistValueError(tr('"jobs" must be at least 1.'))
+
+        self._config = config
+        self._cache = dtype_archive_cache_class.from_config(config) if cache is None else cache
+        self._jobs = jobs
+
+    def __repr__(self):
+
+        return f'<installer ({id(self):x}) jobs={self._jobs:d}>'
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def jobs(self):
+        return self._jobs
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def install(self, releases, dry_run = False, mirrors = None):
+        """
+        Installs (or replaces) one release per plugin, one failing release does not stop others
+        Archives are downloaded from mirrors (`dtype_mirrors_class`) by plugin id, if given
+        Changes per plugin folder are applied in one transaction (see `dtype_transaction_class`)
+        Dry runs only check releases and target folders, nothing is downloaded
+        Returns (target) plugin folders by plugin id and errors by plugin id
+        """
+
+        self._check_releases(releases)
+        if not isinstance(dry_run, bool):
+            raise QgistTypeError(tr('"dry_run" must be a bool.'))
+        if mirrors is None:
+            mirrors = {}
+        if not isinstance(mirrors, dict):
+            raise QgistTypeError(tr('"mirrors" must be a dict or None.'))
+        if not all((isinstance(item, dtype_mirrors_class) for item in mirrors.values())):
+            raise QgistTypeError(tr('All mirrors must be mirrors.'))
+
+        paths, errors = {}, {}
+
+        urls, install_flds = {}, {}
+        for release in releases:
+            try:
+                urls[release.id] = self._get_download_url(release)
+                install_flds[release.id] = self._get_install_fld(release)
+            except (QgistInstallFailed, QgistNotImplementedError, QgistTypeError, QgistValueError) as e:
+                errors[release.id] = e
+
+        if dry_run:
+            return {plugin_id: os.path.join(install_fld, plugin_id) for plugin_id, install_fld in install_flds.items()}, errors
+
+        transactions = {install_fld: dtype_transaction_class(install_fld) for install_fld in set(install_flds.values())}
+
+        with ThreadPoolExecutor(max_workers = self._jobs) as downloader, ThreadPoolExecutor(max_workers = 1) as extractor:
+
+            downloads = {
+                downloader.submit(
+                    self._cache.fetch, urls[release.id],
+                    mirrors = mirrors.get(release.id, None), version = release.version.original, # unchanged URL, new version: not served stale
+                    ): release
+                for release in releases if release.id in urls.keys() and release.id not in errors.keys()
+                }
+
+            extractions = {}
+            for future in as_completed(downloads): # extract in order of completion, not of request
+                release = downloads[future]
+                try:
+                    archive_path = future.result()
+                except (QgistDownloadError, QgistTypeError, QgistValueError) as e:
+                    errors[release.id] = e
+                    continue
+                except OSError as e: # cache, e.g. disk full - other releases go on
+                    errors[release.id] = self._get_error(release.id, e)
+                    continue
+                transaction = transactions[install_flds[release.id]]
+                extract_fld = transaction.get_extract_fld(release.id)
+                extractions[extractor.submit(self._extract, release, archive_path, extract_fld)] = (release, extract_fld)
+
+            for future in as_completed(extractions):
+                release, extract_fld = extractions[future]
+                try:
+                    future.result()
+                except (QgistInstallFailed, OSError) as e:
+                    errors[release.id] = self._get_error(release.id, e)
+                    continue
+                transactions[install_flds[release.id]].add_install(release.id, os.path.join(extract_fld, release.id))
+
+        self._commit_all(transactions, paths, errors)
+
+        return paths, errors
+
+    def uninstall(self, releases, dry_run = False):
+        """
+        Removes installed releases, changes per plugin folder in one transaction
+        Returns removed plugin folders by plugin id and errors by plugin id
+        """
+
+        self._check_releases(releases)
+        if not isinstance(dry_run, bool):
+            raise QgistTypeError(tr('"dry_run" must be a bool.'))
+
+        paths, errors, install_flds = {}, {}, {}
+
+        for release in releases:
+            try:
+                install_fld = self._get_install_fld(release)
+                if release.path is None or os.path.dirname(os.path.abspath(release.path)) != install_fld:
+                    raise QgistValueError(tr('Release is not installed in the user\'s plugin folder') + f': {release.id:s}')
+            except (QgistNotImplementedError, QgistTypeError, QgistValueError) as e:
+                errors[release.id] = e
+                continue
+            install_flds[release.id] = install_fld
+
+        if dry_run:
+            return {plugin_id: os.path.join(install_fld, plugin_id) for plugin_id, install_fld in install_flds.items()}, errors
+
+        transactions = {install_fld: dtype_transaction_class(install_fld) for install_fld in set(install_flds.values())}
+        for plugin_id, install_fld in install_flds.items():
+            transactions[install_fld].add_uninstall(plugin_id)
+
+        self._commit_all(transactions, paths, errors)
+
+        return paths, errors
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @staticmethod
+    def _commit_all(transactions, paths, errors):
+
+        for install_fld, transaction in transactions.items():
+            plugin_ids = list(transaction.plugin_ids)
+            if len(plugin_ids) == 0:
+                transaction.abort()
+                continue
+            try:
+                transaction.commit()
+            except QgistInstallFailed as e: # all or nothing
+                errors.update({plugin_id: e for plugin_id in plugin_ids})
+                continue
+            paths.update({plugin_id: os.path.join(install_fld, plugin_id) for plugin_id in plugin_ids})
+
+    def _get_download_url(self, release):
+
+        field = release.meta['download_url']
+        if not field.value_set:
+            raise QgistInstallFailed(tr('Release can not be downloaded, it has no URL') + f': {release.id:s}')
+
+        return field.value
+
+    def _get_install_fld(self, release):
+
+        if not backends[release.repo_type].module_loaded:
+            backends[release.repo_type].load_module()
+
+        return os.path.abspath(backends[release.repo_type].dtype_repository_class.get_install_path(self._config))
+
+    @staticmethod
+    def _get_error(plugin_id, exception):
+
+        if isinstance(exception, QgistInstallFailed):
+            return exception
+
+        return QgistInstallFailed(tr('Installing plugin failed') + f': {plugin_id:s} ({str(exception):s})')
+
+    @staticmethod
+    def _check_releases(releases):
+
+        if not isinstance(releases, list) and not isinstance(releases, tuple):
+            raise QgistTypeError(tr('"releases" must be a list or tuple.'))
+        if not all((isinstance(release, dtype_pluginrelease_base_class) for release in releases)):
+            raise QgistTypeError(tr('All releases must be plugin releases.'))
+        if len({release.id for release in releases}) != len(releases):
+            raise QgistValueError(tr('There must not be more than one release per plugin.'))
+
+    @staticmethod
+    def _extract(release, archive_path, extract_fld):
+        "Worker: stream zip members into extraction folder, member by member and chunk by chunk"
+
+        try:
+            with zipfile.ZipFile(archive_path, 'r') as archive:
+                for member in archive.infolist():
+                    target_path = _get_member_path(extract_fld, member.filename)
+                    if member.is_dir():
+                        os.makedirs(target_path, exist_ok = True)
+                        continue
+                    os.makedirs(os.path.dirname(target_path), exist_ok = True)
+                    with archive.open(member, 'r') as src, open(target_path, 'wb') as dst:
+                        shutil.copyfileobj(src, dst, ARCHIVE_CHUNK_SIZE)
+        except zipfile.BadZipFile as e:
+            raise QgistInstallFailed(tr('Plugin archive is broken') + f': {release.id:s} ({str(e):s})')
+
+        if not release.is_python_plugin_dir(os.path.join(extract_fld, release.id)):
+            raise QgistInstallFailed(tr('Plugin archive does not contain a plugin folder named like the plugin') + f': {release.id:s}')
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _get_member_path(staging_fld, member_name):
+    "Target path of zip member - refuses absolute paths and paths leaving the staging folder"
+
+    target_path = os.path.abspath(os.path.join(staging_fld, member_name))
+
+    if os.path.commonpath((staging_fld, target_path)) != os.path.abspath(staging_fld):
+        raise QgistInstallFailed(tr('Plugin archive contains unsafe path') + f': {member_name:s}')
+
+    return target_path
@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_loader.py: Plugin activation data type
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import collections
+import os
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .const import (
+    CONFIG_KEY_ACTIVATION_CRITICAL,
+    CONFIG_KEY_ACTIVATION_DEFER,
+    CONFIG_KEY_ACTIVATION_LAZY,
+    CONFIG_KEY_ACTIVATION_PLUGINS,
+    )
+from .dtype_resolver import dtype_resolver_class
+from .error import (
+    QgistPluginLoadError,
+    QgistPluginManager_ALL_Errors,
+    )
+
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_loader_class:
+    """
+    Activates installed plugins at QGIS startup
+
+    Plugins are activated in dependency order (`plugin_dependencies`), dependencies first. Critical
+    plugins (configured, providing processing algorithms or server functions, and everything they
+    depend on) are activated right away. All others are deferred (if configured) until the main
+    window is interactive and are then activated one per event loop tick. Lazy plugins (opt-in)
+    are represented by placeholder menu and toolbar entries and are activated on first use.
+
+    Mutable.
+    """
+
+    def __init__(self, index):
+
+        from .dtype_index import dtype_index_class # circular: index -> plugin <- loader
+
+        if not isinstance(index, dtype_index_class):
+            raise QgistTypeError(tr('"index" must be an index.'))
+
+        self._index = index
+        self._resolver = dtype_resolver_class.from_index(index)
+
+        self._queue = collections.deque() # plugin ids of deferred plugins, in activation order
+        self._lazy = [] # plugin ids of lazy plugins, not activated until first use
+        self._placeholders = {} # by plugin id: (menu name, QAction)
+        self._errors = {} # by plugin id
+
+    def __repr__(self):
+
+        return f'<loader ({id(self):x}) deferred={len(self._queue):d} errors={len(self._errors):d}>'
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def defer(self):
+        return self._index.config.str_to_bool(self._index.config.get(
+            CONFIG_KEY_ACTIVATION_DEFER, self._index.config.bool_to_str(True)
+            ))
+
+    @property
+    def deferred_ids(self):
+        return (plugin_id for plugin_id in self._queue)
+
+    @property
+    def errors(self):
+        return self._errors.copy()
+
+    @property
+    def lazy_ids(self):
+        return (plugin_id for plugin_id in self._lazy)
+
+    @property
+    def plugin_ids(self):
+        "Installed plugins which are activated by the manager (instead of QGIS)"
+        return [
+            plugin_id for plugin_id in self._get_config_list(CONFIG_KEY_ACTIVATION_PLUGINS)
+            if plugin_id in self._installed_ids
+            ]
+
+    @property
+    def _installed_ids(self):
+        return {plugin.id for plugin in self._index.get_all_installed_plugins()}
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def activate_critical(self):
+        """
+        Call before the main window is shown (i.e. from `initGui`)
+        Activates critical plugins, queues all others - activates all plugins if deferring is off
+        Lazy plugins are left alone unless a plugin which is not lazy depends on them
+        Returns errors of this activation by plugin id
+        """
+
+        plugin_ids = self.plugin_ids
+        lazy = set(self._get_config_list(CONFIG_KEY_ACTIVATION_LAZY)) - self.get_critical(plugin_ids)
+
+        order = self.get_order([plugin_id for plugin_id in plugin_ids if plugin_id not in lazy])
+        critical = self.get_critical(order) if self.defer else set(order)
+        self._lazy = [plugin_id for plugin_id in plugin_ids if plugin_id in lazy and plugin_id not in order]
+
+        self._queue.clear()
+        errors = {}
+        for plugin_id in order:
+            if plugin_id in critical:
+                self._activate(plugin_id, errors)
+            else:
+                self._queue.append(plugin_id)
+
+        return errors
+
+    def activate_deferred(self, finished = None):
+        """
+        Call once the main window is interactive: activates queued plugins, one per event loop tick
+        Calls `finished` (if given) with errors of the queued plugins by plugin id once the queue is empty
+        """
+
+        if not callable(finished) and finished is not None:
+            raise QgistTypeError(tr('"finished" must be callable or None.'))
+
+        from PyQt5.QtCore import QTimer
+
+        errors = {}
+
+        def activate_next():
+            if len(self._queue) > 0:
+                self._activate(self._queue.popleft(), errors)
+            if len(self._queue) > 0:
+                QTimer.singleShot(0, activate_next) # pending (user) events are processed in between
+            elif finished is not None:
+                finished(errors)
+
+        QTimer.singleShot(0, activate_next)
+
+    def add_placeholders(self, activated = None):
+        """
+        Placeholder menu and toolbar entries for lazy plugins (name and icon from plugin meta data)
+        Triggering one activates the plugin (and its dependencies) and removes the placeholder
+        Calls `activated` (if given) with errors of every activation by plugin id
+        """
+
+        if not callable(activated) and activated is not None:
+            raise QgistTypeError(tr('"activated" must be callable or None.'))
+
+        from PyQt5.QtGui import QIcon
+        from PyQt5.QtWidgets import QAction
+        from qgis.utils import iface
+
+        for plugin_id in self._lazy:
+            if plugin_id in self._placeholders.keys():
+                continue
+            release = self._index.get_plugin(plugin_id).installed_release
+            name = release.meta['name'].value if release.meta['name'].value_set else plugin_id
+            icon_path = os.path.join(release.path, release.meta['icon'].value) if release.meta['icon'].value_set else None
+            action = QAction(
+                QIcon(icon_path) if icon_path is not None and os.path.isfile(icon_path) else QIcon(),
+                name, iface.mainWindow(),
+                )
+            action.setToolTip(tr('Activate plugin') + f': {name:s}')
+            action.triggered.connect(
+                lambda checked = False, plugin_id = plugin_id: self._activate_lazy(plugin_id, activated)
+                )
+            iface.addPluginToMenu(name, action)
+            iface.addToolBarIcon(action)
+            self._placeholders[plugin_id] = (name, action)
+
+    def remove_placeholders(self):
+
+        for plugin_id in list(self._placeholders.keys()):
+            self._remove_placeholder(plugin_id)
+
+    def activate_lazy(self, plugin_id):
+        "Activates lazy plugin and its dependencies (if not active yet). Returns errors of this activation by plugin id"
+
+        if plugin_id not in self._lazy:
+            raise QgistValueError(tr('plugin is not activated lazily') + f': {plugin_id:s}')
+
+        errors = {}
+        for dependency_id in self.get_order([plugin_id]):
+            self._activate(dependency_id, errors)
+        self._lazy.remove(plugin_id)
+
+        return errors
+
+    def get_order(self, plugin_ids):
+        """
+        Activation order of plugins and their dependencies, dependencies first
+        Only dependencies which are activated by the manager (see `plugin_ids`) are included - others are
+        left to QGIS, i.e. are never activated twice. Critical plugins first where dependencies allow,
+        otherwise by id. Cycles are broken by id
+        """
+
+        self._check_plugin_ids(plugin_ids)
+
+        dependencies = self._get_dependencies(plugin_ids)
+        critical = self.get_critical(list(dependencies.keys()))
+
+        dependents = {plugin_id: set() for plugin_id in dependencies.keys()}
+        for plugin_id, dependency_ids in dependencies.items():
+            for dependency_id in dependency_ids:
+                dependents[dependency_id].add(plugin_id)
+
+        def key(plugin_id):
+            return (plugin_id not in critical, plugin_id)
+
+        missing = {plugin_id: len(dependency_ids) for plugin_id, dependency_ids in dependencies.items()}
+        order = []
+
+        while len(order) < len(dependencies):
+            ready = sorted((plugin_id for plugin_id, count in missing.items() if count == 0), key = key)
+            if len(ready) == 0: # cycle
+                ready = sorted(missing.keys(), key = key)[:1]
+            for plugin_id in ready:
+                missing.pop(plugin_id)
+                order.append(plugin_id)
+                for dependent_id in dependents[plugin_id]:
+                    if dependent_id in missing.keys():
+                        missing[dependent_id] -= 1
+
+        return order
+
+    def get_critical(self, plugin_ids):
+        "Critical plugins among plugins: configured, processing providers, server plugins - and their dependencies"
+
+        self._check_plugin_ids(plugin_ids)
+
+        configured = set(self._get_config_list(CONFIG_KEY_ACTIVATION_CRITICAL))
+        dependencies = self._get_dependencies(plugin_ids)
+
+        stack = [
+            plugin_id for plugin_id in plugin_ids
+            if any((
+                plugin_id in configured,
+                self._index.get_plugin(plugin_id).installed_release.has_processingprovider,
+                self._index.get_plugin(plugin_id).installed_release.has_serverfuncs,
+                ))
+            ]
+        critical = set()
+
+        while len(stack) > 0:
+            plugin_id = stack.pop()
+            if plugin_id in critical:
+                continue
+            critical.add(plugin_id)
+            stack.extend(dependencies[plugin_id])
+
+        return critical
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _activate_lazy(self, plugin_id, activated):
+
+        self._remove_placeholder(plugin_id) # before plugin adds its own entries
+        errors = self.activate_lazy(plugin_id)
+
+        if activated is not None:
+            activated(errors)
+
+    def _remove_placeholder(self, plugin_id):
+
+        from qgis.utils import iface
+
+        name, action = self._placeholders.pop(plugin_id)
+        iface.removeToolBarIcon(action)
+        iface.removePluginMenu(name, action)
+        action.deleteLater()
+
+    def _activate(self, plugin_id, errors):
+        "Activates plugin, a new error is added to errors (and kept in `errors` property)"
+
+        plugin = self._index.get_plugin(plugin_id)
+        if plugin.active or plugin_id in self._errors.keys(): # e.g. also enabled in QGIS, or already reported
+            return
+
+        dependency_ids = self._resolver.get_dependency_ids(plugin.installed_release)
+        enabled_ids = set(self.plugin_ids)
+
+        failed = [dependency_id for dependency_id in dependency_ids if dependency_id in self._errors.keys()]
+        inactive = [
+            dependency_id for dependency_id in dependency_ids
+            if dependency_id not in enabled_ids and not self._index.get_plugin(dependency_id).active
+            ]
+
+        if len(failed) > 0:
+            error = QgistPluginLoadError(
+                tr('Plugin not activated, dependencies failed') + f': {plugin_id:s} ({", ".join(failed):s})'
+                )
+        elif len(inactive) > 0:
+            error = QgistPluginLoadError(
+                tr('Plugin not activated, dependencies are neither active nor activated by the plugin manager') +
+                f': {plugin_id:s} ({", ".join(inactive):s})'
+                )
+        else:
+            try:
+                plugin.load()
+                return
+            except QgistPluginManager_ALL_Errors as e:
+                error = e
+
+        self._errors[plugin_id] = error
+        errors[plugin_id] = error
+
+    def _get_dependencies(self, plugin_ids):
+        "Dependencies activated by the manager by plugin id, for plugins and (recursively) their dependencies"
+
+        enabled_ids = set(self.plugin_ids)
+        dependencies = {}
+        stack = list(plugin_ids)
+
+        while len(stack) > 0:
+            plugin_id = stack.pop()
+            if plugin_id in dependencies.keys():
+                continue
+            dependencies[plugin_id] = {
+                dependency_id
+                for dependency_id in self._resolver.get_dependency_ids(self._index.get_plugin(plugin_id).installed_release)
+                if dependency_id in enabled_ids and dependency_id != plugin_id
+                }
+            stack.extend(dependencies[plugin_id])
+
+        return dependencies
+
+    def _get_config_list(self, name):
+
+        value = self._index.config.get(name, [])
+        if isinstance(value, str): # QgsSettings turn one-item lists into str
+            value = [value]
+        if not isinstance(value, list) or not all((isinstance(item, str) for item in value)):
+            raise QgistValueError(tr('configuration value must be a list of plugin ids') + f': {name:s}')
+
+        return value
+
+    def _check_plugin_ids(self, plugin_ids):
+
+        if not isinstance(plugin_ids, list) and not isinstance(plugin_ids, tuple):
+            raise QgistTypeError(tr('"plugin_ids" must be a list or tuple.'))
+        installed_ids = self._installed_ids
+        for plugin_id in plugin_ids:
+            if plugin_id not in installed_ids:
+                raise QgistValueError(tr('plugin is not installed') + f': {plugin_id:s}')
@@ -35,7 +35,10 @@ from collections import OrderedDict
 # IMPORT (Internal)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-from .metadata_spec import METADATA_FIELDS_SPEC
+from .metadata_spec import (
+    METADATA_FIELDS_SPEC,
+    METADATA_XML_FIELDS,
+    )
 from .dtype_metadata_field import dtype_metadata_field_class
 from .error import (
     QgistMetaKeyError,
@@ -66,8 +69,12 @@ class dtype_metadata_class:
             field['name']: dtype_metadata_field_class(**field) for field in METADATA_FIELDS_SPEC
             }
 
+        names = {name.lower(): name for name in self._fields.keys()} # metadata.txt keys are lower case (configparser)
+
         for key in fields.keys():
-            if key not in self._fields.keys():
+            if key not in self._fields.keys() and key.lower() in names.keys():
+                self._fields[names[key.lower()]].value_string = fields[key]
+            elif key not in self._fields.keys():
                 self._fields[key] = dtype_metadata_field_class.from_unknown(key, fields[key])
             else:
                 self._fields[key].value_string = fields[key]
@@ -96,6 +103,15 @@ class dtype_metadata_class:
 
         return (key for key in self._fields.keys())
 
+    def as_config_decompressed(self):
+        "For available releases cache in config, counterpart to `from_config_decompressed`"
+
+        return {
+            key: field.value_string
+            for key, field in self._fields.items()
+            if field.value_set
+            }
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # PRE-CONSTRUCTOR
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -125,6 +141,12 @@ class dtype_metadata_class:
         if not all(((isinstance(value, str) or value is None) for value in xml_dict.values())):
             raise QgistTypeError(tr('All values in xml_dict must be str or None'))
 
+        xml_dict = {
+            METADATA_XML_FIELDS.get(key, key): value
+            for key, value in xml_dict.items()
+            if value is not None # empty XML tags
+            }
+
         for key in ('name', 'plugin_id'):
             xml_dict[key] = xml_dict.pop(f'@{key:s}')
 
@@ -139,7 +161,7 @@ class dtype_metadata_class:
                 raise QgistValueError(tr('Unusual value for "file_name", does not end on ".zip"'))
             if xml_dict['version'] not in xml_dict['file_name']:
                 raise QgistValueError(tr('Version is not part of "file_name"'))
-            xml_dict['id'] = xml_dict['file_name'][:-1*(len('.zip') + len(xml_dict['version']) + len('..'))]
+            xml_dict['id'] = xml_dict['file_name'][:-1*(len('.zip') + len(xml_dict['version']) + len('.'))]
 
         return cls(**xml_dict)
 
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_mirrors.py: Repository mirrors data type
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from concurrent.futures import ThreadPoolExecutor
+import statistics
+import threading
+import time
+import urllib.parse
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .const import (
+    MIRROR_EWMA_WEIGHT,
+    MIRROR_MIN_SIZE,
+    MIRROR_PROBE_TIMEOUT,
+    MIRROR_RETRY_AFTER,
+    MIRROR_SCORE_SIZE,
+    REPO_FETCH_TIMEOUT,
+    )
+from .error import QgistRepoError
+
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_mirrors_class:
+    """
+    URLs of one repository index (primary first), with measured latency and throughput per mirror
+
+    Mirrors are tried fastest first: by moving averages of latency (time to response headers) and
+    throughput, as estimated time for `MIRROR_SCORE_SIZE` bytes. Mirrors never used before come
+    first, i.e. they are measured. Mirrors which failed recently come last, i.e. they are still
+    a last resort. Other resources of the repository, e.g. plugin archives, are found on every
+    mirror below the folder of its index, i.e. mirrors are copies of the primary's folder.
+
+    Mutable, thread-safe.
+    """
+
+    def __init__(self, urls):
+
+        if not isinstance(urls, list) and not isinstance(urls, tuple):
+            raise QgistTypeError(tr('"urls" must be a list or tuple.'))
+        if len(urls) == 0:
+            raise QgistValueError(tr('"urls" must not be empty.'))
+        for url in urls:
+            if not isinstance(url, str):
+                raise QgistTypeError(tr('Every URL must be a str.'))
+            if not url.lower().startswith('http://') and not url.lower().startswith('https://'):
+                raise QgistValueError(tr('Every URL must start with "http://" or "https://".') + f' {url:s}')
+        if len(set(urls)) != len(urls):
+            raise QgistValueError(tr('URLs must be unique.'))
+
+        self._urls = tuple(urls)
+        self._stats = {url: _get_stats() for url in self._urls}
+        self._lock = threading.Lock() # downloads of archives record from worker threads
+
+    def __repr__(self):
+
+        return f'<mirrors ({id(self):x}) primary="{self._urls[0]:s}" mirrors={len(self._urls):d}>'
+
+    def __len__(self):
+
+        return len(self._urls)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def urls(self):
+        "As configured, primary first"
+        return self._urls
+
+    @property
+    def stats(self):
+        "Latency (seconds), throughput (bytes per second), consecutive failures and Unix time of last failure by URL"
+        with self._lock:
+            return {url: stats.copy() for url, stats in self._stats.items()}
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def get_candidates(self, url = None):
+        """
+        (mirror, URL) pairs in order of trial: the index or, with url, the same resource on every mirror
+        URLs outside of the primary's folder are not mirrored, i.e. there is only one pair.
+        """
+
+        if not isinstance(url, str) and url is not None:
+            raise QgistTypeError(tr('"url" must be a str or None.'))
+
+        now = time.time()
+        with self._lock:
+            throughputs = [
+                stats['throughput'] for stats in self._stats.values() if stats['throughput'] is not None
+                ]
+            throughput = statistics.median(throughputs) if len(throughputs) > 0 else None # for probed-only mirrors
+            mirrors = sorted(self._urls, key = lambda mirror: (
+                _is_failing(self._stats[mirror], now),
+                _get_score(self._stats[mirror], throughput),
+                self._urls.index(mirror),
+                ))
+
+        if url is None:
+            return [(mirror, mirror) for mirror in mirrors]
+
+        primary_fld = _get_fld(self._urls[0])
+        if not url.startswith(primary_fld):
+            return [(self._urls[0], url)]
+
+        return [(mirror, _get_fld(mirror) + url[len(primary_fld):]) for mirror in mirrors]
+
+    def record_success(self, mirror, latency, size = 0, duration = 0.0):
+        "Response headers after latency (seconds), body of size (bytes) in duration (seconds)"
+
+        self._check_mirror(mirror)
+        if not isinstance(latency, float) or not isinstance(duration, float):
+            raise QgistTypeError(tr('"latency" and "duration" must be float.'))
+        if not isinstance(size, int):
+            raise QgistTypeError(tr('"size" must be an int.'))
+
+        with self._lock:
+            stats = self._stats[mirror]
+            stats['latency'] = _get_average(stats['latency'], latency)
+            if size >= MIRROR_MIN_SIZE and duration > 0.0:
+                stats['throughput'] = _get_average(stats['throughput'], size / duration)
+            stats['failures'] = 0
+
+    def record_failure(self, mirror):
+
+        self._check_mirror(mirror)
+
+        with self._lock:
+            self._stats[mirror]['failures'] += 1
+            self._stats[mirror]['failed'] = time.time()
+
+    def probe(self, unmeasured_only = True):
+        "Measure latency of mirrors (concurrently, HEAD requests), by default only of mirrors never used before"
+
+        if not isinstance(unmeasured_only, bool):
+            raise QgistTypeError(tr('"unmeasured_only" must be a bool.'))
+
+        with self._lock:
+            mirrors = [
+                mirror for mirror in self._urls
+                if not unmeasured_only or (self._stats[mirror]['latency'] is None and self._stats[mirror]['failures'] == 0)
+                ]
+        if len(mirrors) == 0:
+            return
+
+        with ThreadPoolExecutor(max_workers = len(mirrors)) as executor:
+            for _ in executor.map(self._probe, mirrors):
+                pass
+
+    def get_content(self, params = None, parse = None):
+        """
+        Body of index from fastest working mirror, fails over to next mirror on any error
+        With `parse(content)`, its result is returned and a `QgistRepoError` raised by it is a failure too
+        """
+
+        if not isinstance(params, dict) and params is not None:
+            raise QgistTypeError(tr('"params" must be a dict or None.'))
+        if not callable(parse) and parse is not None:
+            raise QgistTypeError(tr('"parse" must be callable or None.'))
+
+        import requests # only required when talking to remote sources
+
+        messages = []
+
+        for mirror, url in self.get_candidates():
+            try:
+                start = time.perf_counter()
+                with requests.get(url, params = params, stream = True, timeout = REPO_FETCH_TIMEOUT) as response:
+                    response.raise_for_status()
+                    latency = time.perf_counter() - start
+                    content = response.content # transfers breaking off raise as well, i.e. next mirror
+                    duration = time.perf_counter() - start - latency
+                result = content if parse is None else parse(content)
+            except (requests.RequestException, QgistRepoError) as e:
+                self.record_failure(mirror)
+                messages.append(f'{url:s} ({str(e):s})')
+                continue
+            self.record_success(mirror, latency, len(content), duration)
+            return result
+
+        raise QgistRepoError(tr('Fetching repository index failed') + ': ' + '; '.join(messages))
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _probe(self, mirror):
+
+        import requests # only required when talking to remote sources
+
+        try:
+            start = time.perf_counter()
+            with requests.head(mirror, allow_redirects = True, timeout = MIRROR_PROBE_TIMEOUT) as response:
+                response.raise_for_status()
+                latency = time.perf_counter() - start
+        except requests.RequestException:
+            self.record_failure(mirror)
+            return
+
+        self.record_success(mirror, latency)
+
+    def _check_mirror(self, mirror):
+
+        if not isinstance(mirror, str):
+            raise QgistTypeError(tr('"mirror" must be a str.'))
+        if mirror not in self._stats.keys():
+            raise QgistValueError(tr('"mirror" is unknown.') + f' {mirror:s}')
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _get_stats():
+
+    return {'latency': None, 'throughput': None, 'failures': 0, 'failed': None}
+
+def _get_average(average, value):
+    "Exponentially weighted moving average"
+
+    if average is None:
+        return value
+
+    return MIRROR_EWMA_WEIGHT * value + (1.0 - MIRROR_EWMA_WEIGHT) * average
+
+def _get_score(stats, throughput):
+    """
+    Estimated seconds for `MIRROR_SCORE_SIZE` bytes, 0.0 if never measured
+    Mirrors without measured throughput assume throughput (median of the others), latency only if None.
+    """
+
+    if stats['latency'] is None:
+        return 0.0
+    if stats['throughput'] is not None:
+        throughput = stats['throughput']
+    if throughput is None: # no mirror measured, scores compare latency only
+        return stats['latency']
+
+    return stats['latency'] + MIRROR_SCORE_SIZE / throughput
+
+def _is_failing(stats, now):
+
+    return stats['failures'] > 0 and now - stats['failed'] < MIRROR_RETRY_AFTER
+
+def _get_fld(url):
+    "URL of folder, i.e. up to and including the last slash of the path"
+
+    parts = urllib.parse.urlsplit(url)
+
+    return f'{parts.scheme:s}://{parts.netloc:s}{parts.path.rsplit("/", 1)[0]:s}/'
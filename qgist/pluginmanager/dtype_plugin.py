@@ -28,7 +28,10 @@ specific language governing rights and limitations under the License.
 # IMPORT (Python Standard Library)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+import importlib
 import os
+import sys
+import time
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # IMPORT (Python Standard Library)
@@ -41,9 +44,26 @@ from typing import Generator, Iterator
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 from .backends import backends
-from .error import QgistNotAPluginDirectoryError
+from .const import LOAD_STATS_HISTORY
+from .error import (
+    QgistInstallFailed,
+    QgistNotAPluginDirectoryError,
+    QgistPluginLoadError,
+    QgistPluginManager_ALL_Errors,
+    )
+from .dtype_footprint import dtype_footprint_class
+from .dtype_installer import dtype_installer_class
 from .dtype_pluginrelease_base import dtype_pluginrelease_base_class
 from .dtype_settings import dtype_settings_class
+from .dtype_version import dtype_version_class
+from .dtype_watchdog import dtype_watchdog_class
+from .loadstats import (
+    check_load_record,
+    get_load_record,
+    get_memory_delta,
+    get_peak_memory,
+    get_unhooked,
+    )
 
 from ..error import (
     QgistNotImplementedError,
@@ -67,7 +87,7 @@ class dtype_plugin_class:
 
     def __init__(self,
         plugin_id, installed, installed_release, available_releases, protected, active, deprecated,
-        module = None,
+        module = None, config = None,
         ):
 
         if not isinstance(plugin_id, str):
@@ -91,6 +111,8 @@ class dtype_plugin_class:
             raise QgistTypeError(tr('"active" must be a bool.'))
         if not isinstance(deprecated, bool):
             raise QgistTypeError(tr('"deprecated" must be a bool.'))
+        if not isinstance(config, dtype_settings_class) and config is not None:
+            raise QgistTypeError(tr('"config" must be a "dtype_settings_class" object or None.'))
 
         # TODO check/inspect "module"?
 
@@ -98,14 +120,20 @@ class dtype_plugin_class:
         self._installed = installed
         self._installed_release = installed_release
         self._available_releases = available_releases # list of dtype_pluginrelease. Source available (online), matching QGIS version requirement
+        self._release_keys = {release.key for release in available_releases} # membership, see `__contains__`
         self._protected = protected
         self._active = active
         self._deprecated = deprecated
         self._module = module
+        self._config = config # required for (un-)installing
+        self._uninstalled_path = None # plugin folder removed by last uninstall
+        self._load_stats = [] # rolling history of load records, oldest first (see `loadstats`)
+        self._footprint = None # what the plugin added to the application, recorded by `load`
+        self._unload_report = None # report of last `unload`, e.g. leaked modules
 
         # TODO Implement in derived class!
         self._available = None # bool. Always static? Source available (online), matching QGIS version requirement
-        self._watchdog = None # bool
+        self._watchdog = None # dtype_watchdog_class while plugin folder is watched for hot reloads
 
     def __repr__(self):
 
@@ -124,10 +152,7 @@ class dtype_plugin_class:
         if not isinstance(test_release, dtype_pluginrelease_base_class):
             raise QgistTypeError(tr('"release" must be a release'))
 
-        return any((
-            release == test_release
-            for release in self._available_releases
-            ))
+        return test_release.key in self._release_keys
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # PROPERTIES
@@ -188,6 +213,20 @@ class dtype_plugin_class:
     def available(self):
         return self._available
 
+    @property
+    def watched(self):
+        return self._watchdog is not None
+
+    @property
+    def unload_report(self):
+        "Removed modules, Qt objects and processing providers, and leaks (referrer types by name) of last unload"
+        return self._unload_report
+
+    @property
+    def load_stats(self):
+        "Load records (times in seconds, peak memory delta in bytes), oldest first"
+        return [record.copy() for record in self._load_stats]
+
     @property
     def installed_release(self):
         if not self._installed:
@@ -250,11 +289,13 @@ class dtype_plugin_class:
             raise QgistValueError(tr('"release" is already part of this plugin'))
 
         self._available_releases.append(release)
+        self._release_keys.add(release.key)
 
     def clear_uninstalled_releases(self):
         "Remove all uninstalled releases"
 
         self._available_releases.clear()
+        self._release_keys.clear()
 
         if not self._installed:
             return
@@ -263,50 +304,214 @@ class dtype_plugin_class:
             raise QgistValueError(tr('internal error: plugin is installed but has no release'))
 
         self._available_releases.append(self._installed_release)
+        self._release_keys.add(self._installed_release.key)
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # INSTALL / UNINSTALL
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-    def install(self):
+    def install(self, version = None, dry_run = False):
         """
         Allows dry runs
+        Installs latest release unless version is specified
         Sets installed to True!
+        Returns (target) release
         """
-        raise QgistNotImplementedError()
+
+        if self._installed:
+            raise QgistValueError(tr('plugin is already installed'))
+
+        if version is None:
+            release = self.get_latest_release()
+            if release is None:
+                raise QgistValueError(tr('There is no release of this plugin'))
+        else:
+            release = self.get_release(version)
+
+        self._install_release(release, dry_run)
+
+        return release
 
     def validate_install(self):
         """
         Post-install or post-update/-downgrade checks of files and folders
         """
-        raise QgistNotImplementedError()
 
-    def uninstall(self):
+        if not self._installed or self._installed_release.path is None:
+            return False
+        if not self._installed_release.is_python_plugin_dir(self._installed_release.path):
+            return False
+
+        try:
+            release_on_disk = type(self._installed_release).from_installed(self._installed_release.path, self._config)
+        except QgistPluginManager_ALL_Errors:
+            return False
+
+        return release_on_disk.version == self._installed_release.version
+
+    def uninstall(self, dry_run = False):
         """
         Allows dry runs
         Sets installed to False!
+        Returns (target) plugin folder
         """
-        raise QgistNotImplementedError()
+
+        if not self._installed:
+            raise QgistValueError(tr('plugin is not installed'))
+        if self._protected:
+            raise QgistValueError(tr('plugin is protected'))
+        if self._active:
+            raise QgistValueError(tr('plugin is active, it must be unloaded first'))
+        self._check_config()
+
+        paths, errors = dtype_installer_class(self._config).uninstall([self._installed_release], dry_run = dry_run)
+        if self._id in errors.keys():
+            raise errors[self._id]
+
+        if not dry_run:
+            self.set_uninstalled(paths[self._id])
+            if not self.validate_uninstall():
+                raise QgistInstallFailed(tr('Plugin folder is still present after uninstall') + f': {self._id:s}')
+
+        return paths[self._id]
 
     def validate_uninstall(self):
         """
         Post-uninstall checks of files and folders
         """
-        raise QgistNotImplementedError()
 
-    def upgrade(self, version):
+        if self._installed:
+            return False
+
+        return self._uninstalled_path is None or not os.path.lexists(self._uninstalled_path)
+
+    def upgrade(self, version, dry_run = False):
         """
         Allows dry runs
         Also allows (intentional) downgrades
+        Returns (target) release
         """
-        raise QgistNotImplementedError()
 
-    def get_versions(self):
+        if not self._installed:
+            raise QgistValueError(tr('plugin is not installed'))
+
+        release = self.get_release(version)
+        self._install_release(release, dry_run)
+
+        return release
+
+    def set_installed(self, release, path):
+        "Update state after folder of release was installed at path (e.g. by `dtype_installer_class`)"
+
+        if not isinstance(release, dtype_pluginrelease_base_class):
+            raise QgistTypeError(tr('"release" must be a release'))
+        if release.id != self._id:
+            raise QgistValueError(tr('"release" does not belong to this plugin'))
+        self._check_config()
+
+        installed_release = type(release).from_installed(path, self._config)
+
+        self._drop_installed_release()
+        if installed_release not in self:
+            self._available_releases.append(installed_release)
+            self._release_keys.add(installed_release.key)
+
+        self._installed = True
+        self._installed_release = installed_release
+        self._uninstalled_path = None
+
+    def set_uninstalled(self, path):
+        "Update state after plugin folder was removed from path (e.g. by `dtype_installer_class`)"
+
+        if not isinstance(path, str):
+            raise QgistTypeError(tr('"path" must be a str.'))
+
+        self._drop_installed_release()
+
+        self._installed = False
+        self._installed_release = None
+        self._uninstalled_path = path
+
+    def _drop_installed_release(self):
+
+        if self._installed_release is None:
+            return
+
+        self._available_releases = [
+            available_release for available_release in self._available_releases
+            if available_release is not self._installed_release
+            ]
+        self._release_keys = {release.key for release in self._available_releases} # equal releases may remain
+
+    def _install_release(self, release, dry_run):
+
+        self._check_config()
+
+        paths, errors = dtype_installer_class(self._config).install([release], dry_run = dry_run)
+        if release.id in errors.keys():
+            raise errors[release.id]
+
+        if dry_run:
+            return
+
+        self.set_installed(release, paths[release.id])
+        if not self.validate_install():
+            raise QgistInstallFailed(tr('Installed plugin folder does not match release') + f': {release.id:s}')
+
+    def _check_config(self):
+
+        if self._config is None:
+            raise QgistValueError(tr('plugin has no configuration, i.e. it can not be (un-)installed'))
+
+    def get_versions(self, **kwargs):
         """
         Get versions of plugin
         Filter versions compatible to QGIS version
         """
-        raise QgistNotImplementedError()
+
+        return (release.version for release in self.get_releases(**kwargs))
+
+    def get_releases(self, qgis_version = None, allow_experimental = True, allow_deprecated = True):
+        """
+        Get available releases of plugin, from new to old
+        Filter releases compatible to QGIS version (if specified), experimental and deprecated releases
+        """
+
+        if not isinstance(qgis_version, dtype_version_class) and qgis_version is not None:
+            raise QgistTypeError(tr('"qgis_version" must be a version or None.'))
+        if not isinstance(allow_experimental, bool):
+            raise QgistTypeError(tr('"allow_experimental" must be a bool.'))
+        if not isinstance(allow_deprecated, bool):
+            raise QgistTypeError(tr('"allow_deprecated" must be a bool.'))
+
+        releases = [
+            release for release in self._available_releases
+            if all((
+                qgis_version is None or release.is_compatible(qgis_version),
+                allow_experimental or not release.experimental,
+                allow_deprecated or not release.meta['deprecated'].value,
+                ))
+            ]
+        releases.sort(key = lambda release: release.version, reverse = True)
+
+        return (release for release in releases)
+
+    def get_latest_release(self, **kwargs):
+        "Latest available release (see `get_releases`), None if there is none"
+
+        return next(self.get_releases(**kwargs), None)
+
+    def get_release(self, version):
+        "Available release by version"
+
+        if not isinstance(version, dtype_version_class):
+            raise QgistTypeError(tr('"version" must be a version.'))
+
+        for release in self._available_releases:
+            if release.version == version:
+                return release
+
+        raise QgistValueError(tr('There is no release of this plugin with this version') + f': {str(version):s}')
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # LOADING / UNLOADING
@@ -315,16 +520,86 @@ class dtype_plugin_class:
     def load(self):
         """
         Loads, i.e. imports plugin (that is actually a Python module), and calls plugin's `initGui`
+        Phases like `qgis.utils.startPlugin`: import, `classFactory`, `initGui` - QGIS' own
+        "plugin enabled" setting is not touched, i.e. QGIS does not load the plugin on its next start
         Sets active to True!
         """
-        raise QgistNotImplementedError()
+
+        if self._active:
+            raise QgistValueError(tr('plugin is already active'))
+        if not self._installed:
+            raise QgistValueError(tr('plugin is not installed'))
+
+        from qgis import utils
+
+        self._ensure_import_path()
+
+        record = get_load_record('qgist')
+        peak_before = get_peak_memory()
+        start = time.perf_counter()
+
+        footprint = dtype_footprint_class(self._id, self._installed_release.path)
+        footprint.begin()
+
+        if not get_unhooked(utils.loadPlugin)(self._id): # QGIS reports import errors in its message log
+            footprint.end(None)
+            footprint.release() # partially imported modules
+            raise QgistPluginLoadError(tr('Importing plugin failed') + f': {self._id:s}')
+        record['import'] = time.perf_counter() - start
+
+        instance = None
+        try:
+            phase_start = time.perf_counter()
+            instance = sys.modules[self._id].classFactory(utils.iface)
+            record['class_factory'] = time.perf_counter() - phase_start
+            phase_start = time.perf_counter()
+            instance.initGui()
+            record['init_gui'] = time.perf_counter() - phase_start
+        except Exception as e: # arbitrary plugin code
+            footprint.end(None)
+            instance = None
+            footprint.release()
+            raise QgistPluginLoadError(tr('Starting plugin failed') + f': {self._id:s} ({str(e):s})')
+
+        record['total'] = time.perf_counter() - start
+        record['peak_memory_delta'] = get_memory_delta(peak_before)
+        footprint.end(instance)
+
+        utils.plugins[self._id] = instance
+        utils.active_plugins.append(self._id)
+
+        self._module = instance
+        self._footprint = footprint
+        self._active = True
+        self.add_load_stats(record)
 
     def unload(self):
         """
         Triggers plugin's `unload` method and attempts to "unimport" it.
+        Everything recorded in the plugin's footprint at load time is removed, i.e. modules, Qt
+        objects and processing providers. Leaks are reported in `unload_report`.
         Sets active to False!
         """
-        raise QgistNotImplementedError()
+
+        if not self._active:
+            raise QgistValueError(tr('plugin is not active'))
+
+        from qgis import utils
+
+        start = time.perf_counter()
+
+        instance = utils.plugins.get(self._id, self._module)
+        try:
+            if instance is not None:
+                instance.unload()
+        except Exception as e: # arbitrary plugin code
+            raise QgistPluginLoadError(tr('Unloading plugin failed') + f': {self._id:s} ({str(e):s})')
+
+        del instance # no references left for leak check
+        self._unload_report = self._deactivate()
+
+        if len(self._load_stats) > 0 and self._load_stats[-1]['unload'] is None:
+            self._load_stats[-1]['unload'] = time.perf_counter() - start
 
     def reload(self):
         """
@@ -333,6 +608,150 @@ class dtype_plugin_class:
         self.unload()
         self.load()
 
+    def reload_modules(self, paths):
+        """
+        Hot reload: reloads the plugin's modules which were loaded from changed files, plus every
+        module of the plugin referring to them, dependencies first - then re-runs `initGui`
+        Returns names of reloaded modules (empty if paths do not belong to imported modules)
+        """
+
+        if not isinstance(paths, list) and not isinstance(paths, set) and not isinstance(paths, tuple):
+            raise QgistTypeError(tr('"paths" must be a list, set or tuple.'))
+        if not self._active:
+            raise QgistValueError(tr('plugin is not active'))
+
+        from qgis import utils
+
+        names = self._get_reload_order({os.path.abspath(path) for path in paths})
+        if len(names) == 0:
+            return names
+
+        instance = utils.plugins.get(self._id, self._module)
+        try:
+            if instance is not None:
+                instance.unload()
+            instance = None
+            for name in names:
+                importlib.reload(sys.modules[name])
+            instance = sys.modules[self._id].classFactory(utils.iface)
+            instance.initGui()
+        except Exception as e: # arbitrary plugin code, e.g. syntax errors while editing
+            instance = None
+            self._unload_report = self._deactivate() # next `load` imports from scratch
+            raise QgistPluginLoadError(tr('Reloading plugin failed, it was unloaded') + f': {self._id:s} ({str(e):s})')
+
+        utils.plugins[self._id] = instance
+        self._module = instance
+
+        return names
+
+    def watch(self, on_reload = None):
+        """
+        Development mode: hot reloads changed modules of active plugin (see `reload_modules`)
+        `on_reload(plugin_id, module names, error or None)` is called after every attempt,
+        errors are raised (into the Qt event loop) if it is not given
+        """
+
+        if not callable(on_reload) and on_reload is not None:
+            raise QgistTypeError(tr('"on_reload" must be callable or None.'))
+        if self._watchdog is not None:
+            raise QgistValueError(tr('plugin is already watched'))
+        if not self._installed:
+            raise QgistValueError(tr('plugin is not installed'))
+
+        def changed(paths):
+            if not self._active:
+                return
+            try:
+                names, error = self.reload_modules(paths), None
+            except QgistPluginManager_ALL_Errors as e:
+                names, error = [], e
+            if on_reload is None and error is not None:
+                raise error
+            if on_reload is not None:
+                on_reload(self._id, names, error)
+
+        self._watchdog = dtype_watchdog_class(self._installed_release.path)
+        self._watchdog.start(changed)
+
+    def unwatch(self):
+
+        if self._watchdog is None:
+            return
+
+        self._watchdog.close()
+        self._watchdog = None
+
+    def add_load_stats(self, record):
+        "Append load record (see `loadstats.get_load_record`) to rolling history"
+
+        check_load_record(record)
+
+        self._load_stats.append(record)
+        del self._load_stats[:-LOAD_STATS_HISTORY]
+
+    def _deactivate(self):
+        "Drop plugin from QGIS' registry and remove its footprint - after plugin's own `unload`"
+
+        from qgis import utils
+
+        utils.plugins.pop(self._id, None)
+        if self._id in utils.active_plugins:
+            utils.active_plugins.remove(self._id)
+        self._module = None
+        self._active = False
+
+        footprint = self._footprint if self._footprint is not None else dtype_footprint_class( # e.g. loaded by QGIS
+            self._id, self._installed_release.path if self._installed else None,
+            )
+        self._footprint = None
+
+        return footprint.release()
+
+    def _get_reload_order(self, paths):
+        "Names of modules to reload, dependencies first - modules refer to others by globals"
+
+        footprint = dtype_footprint_class(self._id, self._installed_release.path)
+        modules = {name: sys.modules[name] for name in footprint.get_own_module_names()}
+        names_by_module = {id(module): name for name, module in modules.items()}
+
+        dependencies = {
+            name: {
+                names_by_module.get(id(value), None) if type(value) is type(sys) else getattr(value, '__module__', None)
+                for value in list(vars(module).values())
+                } & modules.keys() - {name}
+            for name, module in modules.items()
+            }
+
+        stale = {
+            name for name, module in modules.items()
+            if isinstance(getattr(module, '__file__', None), str) and os.path.abspath(module.__file__) in paths
+            }
+        queue = list(stale)
+        while len(queue) > 0: # modules referring to stale modules are stale as well
+            name = queue.pop()
+            for dependent_name, dependency_names in dependencies.items():
+                if name in dependency_names and dependent_name not in stale:
+                    stale.add(dependent_name)
+                    queue.append(dependent_name)
+
+        order = []
+        while len(order) < len(stale):
+            ready = sorted(
+                name for name in stale - set(order)
+                if len(dependencies[name] & stale - set(order)) == 0
+                ) or sorted(stale - set(order))[:1] # cycle
+            order.extend(ready)
+
+        return order
+
+    def _ensure_import_path(self):
+        "Plugin folder must be importable, e.g. plugins from system-wide folders"
+
+        install_fld = os.path.dirname(os.path.abspath(self.installed_release.path))
+        if install_fld not in sys.path:
+            sys.path.append(install_fld)
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # VOTING
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -347,6 +766,24 @@ class dtype_plugin_class:
 # PRE-CONSTRUCTOR
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+    @classmethod
+    def from_release(cls, release, config = None):
+        "From available release, i.e. a plugin which is not installed"
+
+        if not isinstance(release, dtype_pluginrelease_base_class):
+            raise QgistTypeError(tr('"release" must be a release'))
+
+        return cls(
+            plugin_id = release.id,
+            installed = False,
+            installed_release = None,
+            available_releases = (release,),
+            protected = False,
+            active = False,
+            deprecated = release.meta['deprecated'].value,
+            config = config,
+            )
+
     @classmethod
     def from_installed(cls, path, config, repo_type, protected, plugin_modules):
 
@@ -382,4 +819,5 @@ class dtype_plugin_class:
             active = installed_release.id in plugin_modules.keys(),
             deprecated = installed_release.meta['deprecated'].value,
             module = plugin_modules.get(installed_release.id, None),
+            config = config,
             )
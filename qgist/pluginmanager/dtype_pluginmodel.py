@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_pluginmodel.py: Qt item model over plugin index
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import os
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (External Dependencies)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+# GUI only: unlike the data model, this module requires PyQt at import time (the model subclasses Qt)
+from PyQt5.QtCore import (
+    QAbstractListModel,
+    QModelIndex,
+    Qt,
+    )
+from PyQt5.QtGui import QIcon
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .const import (
+    EVENT_FILTER_CHANGED,
+    PLUGINMODEL_PAGE_SIZE,
+    PLUGINMODEL_ROLES,
+    PLUGINMODEL_SORT_KEYS,
+    )
+from .dtype_index import dtype_index_class
+
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_pluginmodel_class(QAbstractListModel):
+    """
+    List model of plugins in index, e.g. for the `vwPlugins` list view
+
+    Rows are materialized page by page as the view scrolls (`canFetchMore` / `fetchMore`).
+    Display data is read from plugin meta data only when a view asks for it and cached per plugin.
+    Sorting and filtering work on keys precomputed once per plugin, i.e. no proxy model and no
+    walking through plugin objects on every change. Index events (see `dtype_index_class.events`)
+    invalidate the keys and display data of affected plugins only.
+
+    Mutable.
+    """
+
+    def __init__(self, index, page_size = PLUGINMODEL_PAGE_SIZE, parent = None):
+
+        if not isinstance(index, dtype_index_class):
+            raise QgistTypeError(tr('"index" must be a "dtype_index_class" object.'))
+        if not isinstance(page_size, int):
+            raise QgistTypeError(tr('"page_size" must be an int.'))
+        if page_size < 1:
+            raise QgistValueError(tr('"page_size" must be at least 1.'))
+
+        super().__init__(parent)
+
+        self._index = index
+        self._page_size = page_size
+
+        self._keys = {} # by plugin id: precomputed sort and filter keys
+        self._display = {} # by plugin id: display data, resolved on demand
+        self._roles = {Qt.UserRole + offset: name for offset, name in enumerate(PLUGINMODEL_ROLES)}
+
+        self._sort_key = 'name'
+        self._descending = False
+        self._filter = ((), False, False) # search terms, installed only, upgradable only
+
+        self._ids = self._get_ids() # filtered and sorted, all rows
+        self._loaded = 0 # rows materialized so far
+
+        self._index.events.subscribe(self._index_changed)
+
+    def __repr__(self):
+
+        return f'<pluginmodel ({id(self):x}) rows={len(self._ids):d} loaded={self._loaded:d}>'
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def plugin_ids(self):
+        "All matching plugin ids in order, including rows which are not materialized yet"
+        return (plugin_id for plugin_id in self._ids)
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# QT API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def rowCount(self, parent = QModelIndex()):
+
+        return 0 if parent.isValid() else self._loaded
+
+    def canFetchMore(self, parent):
+
+        return not parent.isValid() and self._loaded < len(self._ids)
+
+    def fetchMore(self, parent):
+
+        if parent.isValid():
+            return
+
+        count = min(self._page_size, len(self._ids) - self._loaded)
+        if count <= 0:
+            return
+
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role = Qt.DisplayRole):
+
+        if not index.isValid() or index.row() >= self._loaded:
+            return None
+
+        plugin_id = self._ids[index.row()]
+
+        if role in self._roles.keys():
+            return self._get_display(plugin_id)[self._roles[role]]
+        if role == Qt.DisplayRole:
+            return self._get_display(plugin_id)['name']
+        if role == Qt.ToolTipRole:
+            return self._get_display(plugin_id)['description']
+        if role == Qt.DecorationRole:
+            return self._get_icon(plugin_id)
+
+        return None
+
+    def roleNames(self):
+
+        roles = super().roleNames()
+        roles.update({role: name.encode('utf-8') for role, name in self._roles.items()})
+
+        return roles
+
+    def sort(self, column, order = Qt.AscendingOrder):
+        "Qt's sort interface, sorts by name - see `set_sort` for other keys"
+
+        self.set_sort('name', descending = order == Qt.DescendingOrder)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def set_sort(self, key, descending = False):
+
+        if not isinstance(key, str):
+            raise QgistTypeError(tr('"key" must be a str.'))
+        if key not in PLUGINMODEL_SORT_KEYS:
+            raise QgistValueError(tr('"key" is unknown.') + f' {key:s}')
+        if not isinstance(descending, bool):
+            raise QgistTypeError(tr('"descending" must be a bool.'))
+
+        self._sort_key = key
+        self._descending = descending
+        self._update_rows(set())
+
+    def set_filter(self, text = '', installed = False, upgradable = False):
+        "Show plugins containing all words of text (id, name, tags, author), optionally only (upgradable) installed ones"
+
+        if not isinstance(text, str):
+            raise QgistTypeError(tr('"text" must be a str.'))
+        if not isinstance(installed, bool) or not isinstance(upgradable, bool):
+            raise QgistTypeError(tr('"installed" and "upgradable" must be bool.'))
+
+        self._filter = (tuple(text.casefold().split()), installed, upgradable)
+        self._update_rows(set())
+
+    def get_plugin_id(self, index):
+        "Plugin id of row, None for invalid indices"
+
+        if not index.isValid() or index.row() >= self._loaded:
+            return None
+
+        return self._ids[index.row()]
+
+    def close(self):
+        "Stop following index changes"
+
+        self._index.events.unsubscribe(self._index_changed)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _index_changed(self, events):
+
+        if any((event.kind == EVENT_FILTER_CHANGED for event in events)): # displayed releases may change
+            self._keys.clear()
+            self._display.clear()
+            self._update_rows(None)
+            return
+
+        plugin_ids = {event.target for event in events if event.kind.startswith('plugin_')}
+        if len(plugin_ids) == 0:
+            return
+
+        for plugin_id in plugin_ids:
+            self._keys.pop(plugin_id, None)
+            self._display.pop(plugin_id, None)
+        self._update_rows(plugin_ids)
+
+    def _update_rows(self, plugin_ids):
+        "Re-apply filter and sort. Only rows of plugin ids are refreshed if order did not change, None for all"
+
+        ids = self._get_ids()
+
+        if ids != self._ids:
+            self.beginResetModel()
+            self._ids = ids
+            self._loaded = min(self._loaded, len(ids)) # views fetch more if required
+            self.endResetModel()
+            return
+
+        if self._loaded == 0:
+            return
+        if plugin_ids is None:
+            self.dataChanged.emit(self.index(0), self.index(self._loaded - 1))
+            return
+
+        for row, plugin_id in enumerate(self._ids[:self._loaded]):
+            if plugin_id in plugin_ids:
+                self.dataChanged.emit(self.index(row), self.index(row))
+
+    def _get_ids(self):
+
+        terms, installed, upgradable = self._filter
+
+        ids = []
+        for plugin in self._index.plugins:
+            key = self._get_key(plugin.id)
+            if installed and not key['installed']:
+                continue
+            if upgradable and not key['upgradable']:
+                continue
+            if not all((term in key['search'] for term in terms)):
+                continue
+            ids.append(plugin.id)
+
+        ids.sort(key = lambda plugin_id: (self._get_sort_value(plugin_id), plugin_id), reverse = self._descending)
+
+        return ids
+
+    def _get_key(self, plugin_id):
+
+        if plugin_id in self._keys.keys():
+            return self._keys[plugin_id]
+
+        plugin = self._index.get_plugin(plugin_id)
+        release = self._index.get_current_release(plugin_id)
+
+        fields = [plugin_id]
+        if release is not None:
+            for name in ('name', 'author'):
+                if release.meta[name].value_set:
+                    fields.append(release.meta[name].value)
+            if release.meta['tags'].value_set:
+                fields.extend(release.meta['tags'].value)
+
+        self._keys[plugin_id] = {
+            'name': self._get_name(plugin_id, release).casefold(),
+            'id': plugin_id.casefold(),
+            'installed': plugin.installed,
+            'upgradable': self._index.is_upgradable(plugin_id),
+            'search': ' '.join(fields).casefold(),
+            }
+
+        return self._keys[plugin_id]
+
+    def _get_sort_value(self, plugin_id):
+
+        value = self._keys[plugin_id][self._sort_key]
+        if self._sort_key in ('installed', 'upgradable'): # installed / upgradable first
+            return not value
+
+        return value
+
+    def _get_display(self, plugin_id):
+
+        if plugin_id in self._display.keys():
+            return self._display[plugin_id]
+
+        plugin = self._index.get_plugin(plugin_id)
+        release = self._index.get_current_release(plugin_id)
+
+        self._display[plugin_id] = {
+            'plugin_id': plugin_id,
+            'name': self._get_name(plugin_id, release),
+            'description': (
+                release.meta['description'].value
+                if release is not None and release.meta['description'].value_set else ''
+                ),
+            'version': str(release.version) if release is not None else '',
+            'installed': plugin.installed,
+            'upgradable': self._index.is_upgradable(plugin_id),
+            'icon': None, # QIcon, loaded on first request
+            }
+
+        return self._display[plugin_id]
+
+    def _get_icon(self, plugin_id):
+        "Icons of installed plugins only, others would have to be downloaded"
+
+        display = self._get_display(plugin_id)
+        if display['icon'] is not None:
+            return display['icon']
+
+        plugin = self._index.get_plugin(plugin_id)
+        release = plugin.installed_release if plugin.installed else None
+        icon_path = (
+            os.path.join(release.path, release.meta['icon'].value)
+            if release is not None and release.meta['icon'].value_set else None
+            )
+        display['icon'] = QIcon(icon_path) if icon_path is not None and os.path.isfile(icon_path) else QIcon()
+
+        return display['icon']
+
+    @staticmethod
+    def _get_name(plugin_id, release):
+
+        if release is None or not release.meta['name'].value_set:
+            return plugin_id
+
+        return release.meta['name'].value
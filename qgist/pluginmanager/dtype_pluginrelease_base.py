@@ -92,6 +92,9 @@ class dtype_pluginrelease_base_class:
         self._experimental = experimental
         self._meta = meta
         self._path = path # None if not locally installed
+        self._key = ( # identity, see `key`
+            plugin_id, self._repo_type, version, experimental, has_processingprovider, has_serverfuncs,
+            )
 
     def __repr__(self):
 
@@ -107,18 +110,27 @@ class dtype_pluginrelease_base_class:
 
     def __eq__(self, other):
 
-        return all((
-            self.version == other.version,
-            self.experimental == other.experimental,
-            self.has_processingprovider == other.has_processingprovider,
-            self.has_serverfuncs == other.has_serverfuncs,
-            self.repo_type == other.repo_type,
-            ))
+        if not isinstance(other, dtype_pluginrelease_base_class):
+            return NotImplemented
+
+        return self._key == other.key
+
+    def __hash__(self):
+
+        return hash(self._key)
 
     @property
     def id(self):
         return self._id
 
+    @property
+    def key(self):
+        """
+        Identity: plugin id, backend (repo type), version and flags - meta data and path are not part of it
+        Equal releases from repos of one backend are interchangeable, i.e. the repo of highest priority provides it.
+        """
+        return self._key
+
     @property
     def has_processingprovider(self):
         return self._has_processingprovider
@@ -147,6 +159,22 @@ class dtype_pluginrelease_base_class:
     def repo_type(self):
         return self._repo_type
 
+    def is_compatible(self, qgis_version):
+        "Is release compatible with a given QGIS version (see `dtype_version_class.from_qgisversion`)?"
+
+        if not isinstance(qgis_version, dtype_version_class):
+            raise QgistTypeError(tr('"qgis_version" must be a version.'))
+
+        minimum = self._meta['qgisMinimumVersion'].value
+        maximum = self._meta['qgisMaximumVersion'].value
+
+        if minimum is None:
+            return True
+        if maximum is None: # QGIS default: compatible within major release of minimum version
+            maximum = dtype_version_class(minimum[0], '99', '99')
+
+        return minimum <= qgis_version <= maximum
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # HELPER
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -174,6 +202,12 @@ class dtype_pluginrelease_base_class:
         if not meta['deprecated'].value_set:
             meta['deprecated'].value = meta['deprecated'].default_value
 
+        if not meta['hasProcessingProvider'].value_set:
+            meta['hasProcessingProvider'].value = meta['hasProcessingProvider'].default_value
+
+        if not meta['server'].value_set:
+            meta['server'].value = meta['server'].default_value
+
     @classmethod
     def fix_meta_by_inspecting_plugindir(cls, meta, path):
         "Attempts to guess missing meta data fields by looking at plugin source code"
@@ -229,6 +263,24 @@ class dtype_pluginrelease_base_class:
 
         # `config_decompressed` is checked in `dtype_metadata_class.from_config_decompressed`
         meta = dtype_metadata_class.from_config_decompressed(config_decompressed)
+        cls.fix_meta_by_setting_defaults(meta)
+
+        return cls(
+            plugin_id = meta['id'].value,
+            version = meta['version'].value,
+            has_processingprovider = meta['hasProcessingProvider'].value,
+            has_serverfuncs = meta['server'].value,
+            experimental = meta['experimental'].value,
+            meta = meta,
+            )
+
+    @classmethod
+    def from_xmldict(cls, xml_dict):
+        "From one plugin entry in a repository's XML index (from xmltodict)"
+
+        # `xml_dict` is checked in `dtype_metadata_class.from_xmldict`
+        meta = dtype_metadata_class.from_xmldict(xml_dict)
+        cls.fix_meta_by_setting_defaults(meta)
 
         return cls(
             plugin_id = meta['id'].value,
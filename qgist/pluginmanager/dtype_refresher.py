@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_refresher.py: Background repository refresh data type
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from concurrent.futures import ThreadPoolExecutor
+import random
+import time
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .const import (
+    REFRESH_BACKOFF_MAX,
+    REFRESH_BACKOFF_MIN,
+    REFRESH_JITTER,
+    REFRESH_JOBS,
+    REFRESH_STARTUP_SPREAD,
+    REFRESH_TICK,
+    )
+from .dtype_index import dtype_index_class
+
+from ..error import (
+    QgistNotImplementedError,
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_refresher_class:
+    """
+    Refreshes active repos in the background, each one by its `refresh_interval`
+
+    Repos are fetched in worker threads (see `dtype_repository_base_class.fetch`), results are
+    applied to the index on the thread calling `poll`, i.e. the Qt event loop (see `start`).
+    Due times are spread by random jitter, repos overdue at start within `REFRESH_STARTUP_SPREAD`,
+    i.e. many clients do not hit one server at once. Failures are retried with exponential backoff.
+    While `is_busy()` is true, e.g. while the map canvas renders, nothing is started or applied.
+    Repos which can not be refreshed (e.g. C++ plugins) are skipped.
+
+    Mutable.
+    """
+
+    def __init__(self, index, is_busy = None, on_refresh = None):
+
+        if not isinstance(index, dtype_index_class):
+            raise QgistTypeError(tr('"index" must be a "dtype_index_class" object.'))
+        if not callable(is_busy) and is_busy is not None:
+            raise QgistTypeError(tr('"is_busy" must be callable or None.'))
+        if not callable(on_refresh) and on_refresh is not None:
+            raise QgistTypeError(tr('"on_refresh" must be callable or None.'))
+
+        self._index = index
+        self._is_busy = is_busy
+        self._on_refresh = on_refresh # `on_refresh(repo_id, error)`, error is None on success
+
+        self._due = {} # repo id -> Unix time of next refresh
+        self._intervals = {} # repo id -> interval the due time is based on, for changes in config
+        self._failures = {} # repo id -> consecutive failures
+        self._pending = {} # repo id -> future of fetch
+        self._skipped = set() # repo ids of repos without remote source
+        self._started = None # Unix time of first poll, for spreading overdue repos
+
+        self._executor = None
+        self._timer = None
+
+    def __repr__(self):
+
+        return (
+            f'<refresher ({id(self):x}) scheduled={len(self._due):d} pending={len(self._pending):d} '
+            f'running={"yes" if self._timer is not None else "no":s}>'
+            )
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def due(self):
+        "Unix time of next refresh by repo id"
+        return self._due.copy()
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def poll(self):
+        "Apply finished fetches, update schedule and start fetches of due repos - returns ids of refreshed repos"
+
+        if self._is_busy is not None and self._is_busy():
+            return []
+
+        now = time.time()
+        if self._started is None:
+            self._started = now
+
+        refreshed = self._apply_finished(now)
+        self._update_schedule(now)
+
+        for repo_id, due in self._due.items():
+            if due > now or repo_id in self._pending.keys():
+                continue
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers = REFRESH_JOBS)
+            self._pending[repo_id] = self._executor.submit(
+                self._index.get_repo(repo_id).fetch, qgis_version = self._index.qgis_version,
+                )
+
+        return refreshed
+
+    def start(self, tick = REFRESH_TICK):
+        "Poll from Qt event loop every `tick` milliseconds"
+
+        if not isinstance(tick, int):
+            raise QgistTypeError(tr('"tick" must be an int.'))
+        if tick < 1:
+            raise QgistValueError(tr('"tick" must be at least 1.'))
+        if self._timer is not None:
+            raise QgistValueError(tr('refresher is already running'))
+
+        from PyQt5.QtCore import QTimer
+
+        self._timer = QTimer()
+        self._timer.timeout.connect(self.poll)
+        self._timer.start(tick)
+
+    def stop(self):
+
+        if self._timer is None:
+            return
+
+        self._timer.stop()
+        self._timer.deleteLater()
+        self._timer = None
+
+    def close(self):
+        "Stop, running fetches are finished in the background but not applied"
+
+        self.stop()
+
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+        if self._executor is not None:
+            self._executor.shutdown(wait = False)
+            self._executor = None
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _apply_finished(self, now):
+
+        refreshed = []
+        repo_ids = {repo.id for repo in self._index.repos}
+
+        for repo_id, future in list(self._pending.items()):
+            if not future.done():
+                continue
+            self._pending.pop(repo_id)
+            if repo_id not in repo_ids: # removed meanwhile
+                continue
+            try:
+                self._index.apply_fetched_repo(repo_id, future.result())
+            except QgistNotImplementedError:
+                self._skipped.add(repo_id)
+                self._due.pop(repo_id, None)
+                continue
+            except Exception as e: # any failure of a fetch is retried, e.g. no network, broken index, missing requests
+                self._failures[repo_id] = self._failures.get(repo_id, 0) + 1
+                backoff = min(REFRESH_BACKOFF_MIN * 2 ** (self._failures[repo_id] - 1), REFRESH_BACKOFF_MAX)
+                self._due[repo_id] = now + _get_jittered(backoff)
+                self._notify(repo_id, e)
+                continue
+            self._failures.pop(repo_id, None)
+            if self._intervals.get(repo_id, 0) > 0:
+                self._due[repo_id] = now + _get_jittered(self._intervals[repo_id])
+            else: # disabled meanwhile
+                self._due.pop(repo_id, None)
+            refreshed.append(repo_id)
+            self._notify(repo_id, None)
+
+        return refreshed
+
+    def _update_schedule(self, now):
+        "Follow repos added, removed, (de-)activated or with changed intervals"
+
+        repos = {
+            repo.id: repo for repo in self._index.repos
+            if repo.active and repo.id not in self._skipped
+            }
+
+        for repo_id in self._due.keys() - repos.keys():
+            self._due.pop(repo_id)
+            self._intervals.pop(repo_id, None)
+            self._failures.pop(repo_id, None)
+
+        for repo_id, repo in repos.items():
+            interval = repo.refresh_interval
+            if repo_id in self._due.keys() and interval == self._intervals.get(repo_id, None):
+                continue
+            self._intervals[repo_id] = interval
+            if interval == 0:
+                self._due.pop(repo_id, None)
+                continue
+            last_refresh = repo.last_refresh
+            due = now if last_refresh is None else last_refresh + _get_jittered(interval)
+            if due <= now: # overdue, e.g. at start: spread within startup window
+                due = max(now, self._started + random.uniform(0, REFRESH_STARTUP_SPREAD))
+            self._due[repo_id] = due
+
+    def _notify(self, repo_id, error):
+
+        if self._on_refresh is not None:
+            self._on_refresh(repo_id, error)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _get_jittered(seconds):
+
+    return seconds * random.uniform(1.0 - REFRESH_JITTER, 1.0 + REFRESH_JITTER)
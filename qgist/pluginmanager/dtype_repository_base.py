@@ -28,13 +28,19 @@ specific language governing rights and limitations under the License.
 # IMPORT (Python Standard Library)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+import math
 from typing import Generator, Iterator
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # IMPORT (Internal)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-from .const import CONFIG_GROUP_MANAGER_REPOS
+from .const import (
+    CONFIG_GROUP_MANAGER_REPOS,
+    CONFIG_KEY_REFRESH_INTERVAL,
+    CONFIG_KEY_REFRESH_LAST,
+    REFRESH_INTERVAL,
+    )
 from .backends import backends
 from .dtype_pluginrelease_base import dtype_pluginrelease_base_class
 from .dtype_settings import (
@@ -95,6 +101,8 @@ class dtype_repository_base_class:
         self._active = active
         self._protected = protected
         self._plugin_releases = plugin_releases
+        self._releases_by_id = ({}, None) # lookup by plugin id, built for one list of releases
+        self._release_keys = (frozenset(), None) # membership by release key, built for one list of releases
 
         self._config_group = config_group
 
@@ -118,10 +126,12 @@ class dtype_repository_base_class:
         if not isinstance(test_release, dtype_pluginrelease_base_class):
             raise QgistTypeError(tr('"release" must be a release'))
 
-        return any((
-            release == test_release
-            for release in self._plugin_releases
-            ))
+        release_keys, plugin_releases = self._release_keys
+        if plugin_releases is not self._plugin_releases: # replaced by refresh or load
+            release_keys = frozenset(release.key for release in self._plugin_releases)
+            self._release_keys = (release_keys, self._plugin_releases)
+
+        return test_release.key in release_keys
 
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # PROPERTIES
@@ -154,10 +164,47 @@ class dtype_repository_base_class:
     def plugin_releases(self):
         return (release for release in self._plugin_releases)
 
+    @property
+    def mirrors(self):
+        "URLs of remote source with measured speed (see `dtype_mirrors_class`), None if there is no remote source"
+        return None
+
+    @property
+    def refresh_interval(self):
+        "Seconds between background refreshes (see `dtype_refresher_class`), 0 for never"
+        return int(_get_number(self._config_group.get(CONFIG_KEY_REFRESH_INTERVAL, None), REFRESH_INTERVAL))
+    @refresh_interval.setter
+    def refresh_interval(self, value):
+        if not isinstance(value, int):
+            raise QgistTypeError(tr('New value of "refresh_interval" must be an int.'))
+        if value < 0:
+            raise QgistValueError(tr('New value of "refresh_interval" must not be negative.'))
+        self._config_group[CONFIG_KEY_REFRESH_INTERVAL] = str(value) # QgsSettings keep str
+
+    @property
+    def last_refresh(self):
+        "Unix time of last refresh, None if never refreshed"
+        return _get_number(self._config_group.get(CONFIG_KEY_REFRESH_LAST, None), None)
+
     @property
     def repo_type(self):
         return self._repo_type
 
+    def get_plugin_releases(self, plugin_id):
+        "Releases of one plugin, without going through all releases of repo (after first call)"
+
+        if not isinstance(plugin_id, str):
+            raise QgistTypeError(tr('"plugin_id" must be a str.'))
+
+        releases_by_id, plugin_releases = self._releases_by_id
+        if plugin_releases is not self._plugin_releases: # replaced by refresh or load
+            releases_by_id = {}
+            for release in self._plugin_releases:
+                releases_by_id.setdefault(release.id, []).append(release)
+            self._releases_by_id = (releases_by_id, self._plugin_releases)
+
+        return (release for release in releases_by_id.get(plugin_id, []))
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # PROPERTIES: STUBS FOR SPECIALS
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -170,16 +217,36 @@ class dtype_repository_base_class:
 # MANAGEMENT
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
-    def refresh(self):
+    def refresh(self, qgis_version = None):
         "Refresh index, i.e. reload metadata from remote source"
 
         raise QgistNotImplementedError()
 
+    def fetch(self, qgis_version = None):
+        "First half of `refresh`: get releases from remote source, repo is not changed (i.e. may run in other threads)"
+
+        raise QgistNotImplementedError()
+
+    def apply_fetched(self, fetched):
+        "Second half of `refresh`: replace releases by result of `fetch` and update cache in config"
+
+        raise QgistNotImplementedError()
+
     def remove(self):
         "Run cleanup actions e.g. in config before repo is removed"
 
         raise QgistNotImplementedError()
 
+    def dump_releases(self):
+        "Releases as str, e.g. for sharing them with other processes"
+
+        raise QgistNotImplementedError()
+
+    def load_releases(self, releases_dumped):
+        "Replace releases by str from `dump_releases`"
+
+        raise QgistNotImplementedError()
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # HELPER STATIC & CLASS METHODS
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -201,6 +268,16 @@ class dtype_repository_base_class:
     def find_plugins(cls, config, protected, plugin_modules):
         raise QgistNotImplementedError()
 
+    @classmethod
+    def get_plugin_paths(cls, config, protected):
+        "Folders containing plugin folders of this repo type, e.g. for watching them"
+        raise QgistNotImplementedError()
+
+    @classmethod
+    def get_install_path(cls, config):
+        "Folder into which releases of this repo type are installed"
+        raise QgistNotImplementedError()
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # PRE-CONSTRUCTOR
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -220,3 +297,19 @@ class dtype_repository_base_class:
     @classmethod
     def from_config(cls, config):
         raise QgistNotImplementedError()
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _get_number(value, default):
+    "Numbers in config may be str (QgsSettings), broken values fall back to default"
+
+    if value is None or isinstance(value, bool):
+        return default
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return default
+
+    return number if math.isfinite(number) and number >= 0 else default
@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_resolver.py: Dependency resolver data type
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import re
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .dtype_plugin import dtype_plugin_class
+from .dtype_pluginrelease_base import dtype_pluginrelease_base_class
+from .dtype_version import dtype_version_class
+from .error import QgistDependencyError
+
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_REQUIREMENT_REGEX = re.compile(r'^\s*([^<>=!\s](?:[^<>=!]*[^<>=!\s])?)\s*(?:(==|!=|>=|<=|>|<)\s*(\S+))?\s*$')
+
+_OPERATORS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '>=': lambda a, b: a >= b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '<': lambda a, b: a < b,
+    }
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_resolver_class:
+    """
+    Resolves PIP-style plugin requirements (`plugin_dependencies`) into one release per plugin
+
+    Search: depth-first, most constrained plugin first, newest release first (installed release
+    first if preferred). Dead ends return the set of plugins which caused them (conflict set):
+    choices outside of a conflict set are skipped entirely (backjumping) and every conflict is
+    memorized as a combination of releases which never works (nogood). Nogoods only hold for the
+    root requirements they were learned under, i.e. they are forgotten by every `resolve`.
+
+    Installed plugins keep their requirements: the `plugin_dependencies` of installed releases are
+    root requirements as well, unless their plugin is requested, i.e. replaced. Unknown plugins
+    required by installed releases are ignored, they can not be fixed by any plan.
+
+    Repository priority is already reflected by the plugins' releases: if two repositories offer
+    the same release, the index only keeps the one of the repository with higher priority.
+
+    Mutable.
+    """
+
+    def __init__(self, plugins,
+        qgis_version = None, allow_experimental = False, allow_deprecated = False, prefer_installed = True,
+        ):
+
+        if not isinstance(plugins, dict):
+            raise QgistTypeError(tr('"plugins" must be a dict.'))
+        if not all((isinstance(plugin, dtype_plugin_class) for plugin in plugins.values())):
+            raise QgistTypeError(tr('All plugins must be plugins.'))
+        if not isinstance(qgis_version, dtype_version_class) and qgis_version is not None:
+            raise QgistTypeError(tr('"qgis_version" must be a version or None.'))
+        if not isinstance(allow_experimental, bool):
+            raise QgistTypeError(tr('"allow_experimental" must be a bool.'))
+        if not isinstance(allow_deprecated, bool):
+            raise QgistTypeError(tr('"allow_deprecated" must be a bool.'))
+        if not isinstance(prefer_installed, bool):
+            raise QgistTypeError(tr('"prefer_installed" must be a bool.'))
+
+        self._plugins = plugins
+        self._qgis_version = qgis_version
+        self._allow_experimental = allow_experimental
+        self._allow_deprecated = allow_deprecated
+        self._prefer_installed = prefer_installed
+
+        self._names = None # lower case plugin names to plugin ids, built on demand
+        self._candidates = {} # memo: plugin id -> releases in order of preference
+        self._matching = {} # memo: (plugin id, requirement strs) -> matching candidates
+        self._requirements = {} # memo: id(release) -> requirements of release
+        self._nogoods = {} # (plugin id, version str) -> list of frozensets of (plugin id, version str), per resolve
+        self._failures = {} # plugin id -> reason, for reporting unsatisfiable requirements
+
+    def __repr__(self):
+
+        return f'<resolver ({id(self):x}) plugins={len(self._plugins):d}>'
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def resolve(self, requirements):
+        """
+        Requirements are PIP-style str, e.g. `foo`, `foo==1.2` or `bar>=0.3` (ids or plugin names)
+        Returns dict of releases by plugin id (requested plugins and all of their dependencies,
+        also dependencies of installed plugins which are not requested)
+        Raises QgistDependencyError with all reasons if requirements can not be satisfied
+        """
+
+        if not isinstance(requirements, list) and not isinstance(requirements, tuple):
+            raise QgistTypeError(tr('"requirements" must be a list or tuple.'))
+        if not all((isinstance(requirement, str) for requirement in requirements)):
+            raise QgistTypeError(tr('All requirements must be str.'))
+
+        self._failures.clear()
+        self._nogoods.clear() # learned under other root requirements, may prune valid solutions
+
+        constraints = {}
+        for requirement_str in requirements:
+            requirement = self._parse_requirement(requirement_str)
+            if requirement is None:
+                raise QgistDependencyError(tr('Unknown plugin') + f': {requirement_str:s}')
+            constraints.setdefault(requirement[0], []).append((requirement, None))
+        for requirement, parent_id in self._get_installed_requirements(set(constraints.keys())):
+            constraints.setdefault(requirement[0], []).append((requirement, parent_id))
+
+        solution, _ = self._search({}, constraints, frozenset(constraints.keys()))
+
+        if solution is None:
+            raise QgistDependencyError(tr('Requirements can not be satisfied') + ':\n' + '\n'.join(
+                f'- {plugin_id:s}: {reason:s}' for plugin_id, reason in sorted(self._failures.items())
+                ))
+
+        return solution
+
+    def get_plan(self, requirements):
+        "Resolves requirements and splits solution into releases to install, to upgrade/downgrade and to keep"
+
+        plan = {'install': {}, 'upgrade': {}, 'keep': {}}
+
+        for plugin_id, release in self.resolve(requirements).items():
+            plugin = self._plugins[plugin_id]
+            if not plugin.installed:
+                plan['install'][plugin_id] = release
+            elif plugin.installed_release.version != release.version:
+                plan['upgrade'][plugin_id] = release
+            else:
+                plan['keep'][plugin_id] = release
+
+        return plan
+
+    def get_dependency_ids(self, release):
+        "Ids of known plugins the release depends on (`plugin_dependencies`), unknown plugins are ignored"
+
+        if not isinstance(release, dtype_pluginrelease_base_class):
+            raise QgistTypeError(tr('"release" must be a release'))
+
+        return [
+            requirement[0] for requirement in self._get_requirements(release)
+            if requirement[0] is not None
+            ]
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER: SEARCH
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _search(self, assigned, constraints, pending):
+        "Returns (solution, None) or (None, conflict set)"
+
+        if len(pending) == 0:
+            return dict(assigned), None
+
+        plugin_id = min(pending, key = lambda pending_id: (
+            len(self._get_matching(pending_id, constraints[pending_id])), pending_id,
+            ))
+        candidates = self._get_matching(plugin_id, constraints[plugin_id])
+        parents = {parent_id for _, parent_id in constraints[plugin_id] if parent_id is not None}
+
+        if len(candidates) == 0:
+            self._failures[plugin_id] = self._explain(plugin_id, constraints[plugin_id])
+            return None, parents | {plugin_id}
+
+        conflict_union = set(parents)
+
+        for release in candidates:
+
+            key = (plugin_id, release.version.original)
+            conflict = self._check_nogoods(key, assigned)
+
+            if conflict is None:
+                next_constraints = {dep_id: list(items) for dep_id, items in constraints.items()}
+                next_pending = set(pending) - {plugin_id}
+                next_assigned = {**assigned, plugin_id: release}
+                conflict = self._add_requirements(release, next_assigned, next_constraints, next_pending)
+
+            if conflict is None:
+                solution, conflict = self._search(next_assigned, next_constraints, frozenset(next_pending))
+                if solution is not None:
+                    return solution, None
+                self._add_nogood(conflict, next_assigned)
+
+            if plugin_id not in conflict: # other releases of this plugin can not fix this: backjump
+                return None, conflict
+            conflict_union |= conflict - {plugin_id}
+
+        return None, conflict_union
+
+    def _add_requirements(self, release, assigned, constraints, pending):
+        "Adds requirements of release, returns conflict set if they clash with assigned releases"
+
+        for requirement in self._get_requirements(release):
+            if requirement[0] is None: # unknown plugin
+                self._failures[release.id] = tr('requires unknown plugin') + f' "{requirement[3]:s}" ({release.version.original:s})'
+                return {release.id}
+            dep_id = requirement[0]
+            constraints.setdefault(dep_id, []).append((requirement, release.id))
+            if dep_id in assigned.keys():
+                if not self._satisfies(assigned[dep_id], requirement):
+                    self._failures[dep_id] = self._explain(dep_id, constraints[dep_id])
+                    return {release.id, dep_id} | {parent_id for _, parent_id in constraints[dep_id] if parent_id is not None}
+            else:
+                pending.add(dep_id)
+
+        return None
+
+    def _check_nogoods(self, key, assigned):
+
+        for nogood in self._nogoods.get(key, tuple()):
+            if all((
+                plugin_id in assigned.keys() and assigned[plugin_id].version.original == version_str
+                for plugin_id, version_str in nogood if plugin_id != key[0]
+                )):
+                return {plugin_id for plugin_id, _ in nogood}
+
+        return None
+
+    def _add_nogood(self, conflict, assigned):
+
+        # Unassigned members of a conflict failed because of constraints from assigned members
+        nogood = frozenset(
+            (plugin_id, assigned[plugin_id].version.original)
+            for plugin_id in conflict if plugin_id in assigned.keys()
+            )
+        if len(nogood) == 0:
+            return
+
+        for key in nogood:
+            self._nogoods.setdefault(key, []).append(nogood)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER: CANDIDATES & REQUIREMENTS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _get_installed_requirements(self, requested_ids):
+        "(requirement, plugin id) of installed plugins which are not requested, i.e. not replaced"
+
+        return [
+            (requirement, plugin_id)
+            for plugin_id, plugin in sorted(self._plugins.items())
+            if plugin.installed and plugin_id not in requested_ids
+            for requirement in self._get_requirements(plugin.installed_release)
+            if requirement[0] is not None
+            ]
+
+    def _get_candidates(self, plugin_id):
+
+        if plugin_id in self._candidates.keys():
+            return self._candidates[plugin_id]
+
+        plugin = self._plugins[plugin_id]
+        candidates = list(plugin.get_releases(
+            qgis_version = self._qgis_version,
+            allow_experimental = self._allow_experimental,
+            allow_deprecated = self._allow_deprecated,
+            ))
+
+        if self._prefer_installed and plugin.installed:
+            installed = [release for release in candidates if release.version == plugin.installed_release.version]
+            candidates = installed + [release for release in candidates if release.version != plugin.installed_release.version]
+
+        self._candidates[plugin_id] = candidates
+
+        return candidates
+
+    def _get_matching(self, plugin_id, constraints):
+
+        key = (plugin_id, frozenset((requirement[3] for requirement, _ in constraints)))
+        if key in self._matching.keys():
+            return self._matching[key]
+
+        matching = [
+            release for release in self._get_candidates(plugin_id)
+            if all((self._satisfies(release, requirement) for requirement, _ in constraints))
+            ]
+        self._matching[key] = matching
+
+        return matching
+
+    def _get_requirements(self, release):
+
+        key = id(release)
+        if key in self._requirements.keys():
+            return self._requirements[key]
+
+        field = release.meta['plugin_dependencies']
+        requirements = []
+        if field.value_set:
+            for requirement_str in field.value:
+                if len(requirement_str.strip()) == 0:
+                    continue
+                requirement = self._parse_requirement(requirement_str)
+                requirements.append((None, None, None, requirement_str.strip()) if requirement is None else requirement)
+
+        self._requirements[key] = requirements
+
+        return requirements
+
+    def _parse_requirement(self, requirement_str):
+        "Returns (plugin id, operator, version, original str), None if plugin is unknown"
+
+        match = _REQUIREMENT_REGEX.match(requirement_str)
+        if match is None:
+            raise QgistValueError(tr('Requirement can not be parsed') + f': "{requirement_str:s}"')
+        name, operator, version_str = match.groups()
+
+        plugin_id = self._get_plugin_id(name)
+        if plugin_id is None:
+            return None
+
+        return (
+            plugin_id,
+            operator,
+            dtype_version_class.from_pluginversion(version_str) if operator is not None else None,
+            requirement_str.strip(),
+            )
+
+    def _get_plugin_id(self, name):
+        "Requirements may use plugin ids or (like QGIS) human readable plugin names"
+
+        if name in self._plugins.keys():
+            return name
+
+        if self._names is None:
+            self._names = {}
+            for plugin_id, plugin in self._plugins.items():
+                for release in plugin.available_releases:
+                    if release.meta['name'].value_set:
+                        self._names.setdefault(release.meta['name'].value.strip().lower(), plugin_id)
+
+        return self._names.get(name.strip().lower(), None)
+
+    @staticmethod
+    def _satisfies(release, requirement):
+
+        _, operator, version, _ = requirement
+        if operator is None:
+            return True
+
+        return _OPERATORS[operator](release.version, version)
+
+    def _explain(self, plugin_id, constraints):
+
+        available = ', '.join(release.version.original for release in self._get_candidates(plugin_id)) or tr('none')
+        required = '; '.join(
+            requirement[3] + (f' ({tr("required by"):s} {parent_id:s})' if parent_id is not None else f' ({tr("requested"):s})')
+            for requirement, parent_id in constraints
+            )
+
+        return f'{tr("no release matches"):s} {required:s} - {tr("available"):s}: {available:s}'
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PRE-CONSTRUCTOR
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @classmethod
+    def from_index(cls, index, **kwargs):
+        "Plugins, QGIS version and filters from index"
+
+        return cls(
+            {plugin.id: plugin for plugin in index.plugins},
+            qgis_version = index.qgis_version,
+            allow_experimental = index.allow_experimental,
+            allow_deprecated = index.allow_deprecated,
+            **kwargs,
+            )
@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_searchindex.py: Full-text search index data type
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import bisect
+import heapq
+import math
+import re
+import unicodedata
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .const import (
+    EVENT_PLUGIN_REMOVED,
+    SEARCH_BM25_B,
+    SEARCH_BM25_K1,
+    SEARCH_FIELDS,
+    SEARCH_PREFIX_MAX_TERMS,
+    SEARCH_PREFIX_MIN_LENGTH,
+    SEARCH_PREFIX_WEIGHT,
+    SEARCH_TYPO_MIN_LENGTH,
+    SEARCH_TYPO_WEIGHT,
+    )
+from .dtype_index import dtype_index_class
+
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_WORD = re.compile(r'[^\W_]+') # letters and digits, i.e. `my_plugin` is two words
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_searchindex_class:
+    """
+    Inverted index over meta data of all releases of all plugins in index, ranked by BM25
+
+    One document per plugin. Field matches are weighted (see `SEARCH_FIELDS`). Words are case-folded
+    and stripped of accents, i.e. "Géo" finds "geo". Every word of a query must match, either exactly,
+    as a prefix or (for longer words) with one typo. Typos are found through a deletion neighbourhood
+    index, i.e. without comparing against the whole vocabulary. The search index follows index
+    change sets (see `dtype_index_class.events`) and only re-indexes affected plugins.
+
+    Mutable.
+    """
+
+    def __init__(self, index):
+
+        if not isinstance(index, dtype_index_class):
+            raise QgistTypeError(tr('"index" must be a "dtype_index_class" object.'))
+
+        self._index = index
+
+        self._postings = {} # term -> {plugin id: weighted term frequency}
+        self._docs = {} # plugin id -> {term: weighted term frequency}
+        self._lengths = {} # plugin id -> weighted document length
+        self._total_length = 0.0
+        self._terms = [] # sorted vocabulary, for prefix queries
+        self._deletes = {} # term with one character deleted (or term itself) -> terms, for typos
+
+        self.rebuild()
+        self._index.events.subscribe(self._index_changed)
+
+    def __repr__(self):
+
+        return f'<searchindex ({id(self):x}) plugins={len(self._docs):d} terms={len(self._terms):d}>'
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def len_plugins(self):
+        return len(self._docs)
+
+    @property
+    def len_terms(self):
+        return len(self._terms)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def search(self, query, limit = None):
+        "Ranked plugin ids matching all words of query, as list of (plugin id, score), best first"
+
+        if not isinstance(query, str):
+            raise QgistTypeError(tr('"query" must be a str.'))
+        if not isinstance(limit, int) and limit is not None:
+            raise QgistTypeError(tr('"limit" must be an int or None.'))
+        if isinstance(limit, int) and limit < 1:
+            raise QgistValueError(tr('"limit" must be at least 1.'))
+
+        scores = None
+
+        for query_term in dict.fromkeys(get_terms(query)): # unique, in order
+            term_scores = self._get_scores(query_term)
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    plugin_id: scores[plugin_id] + score
+                    for plugin_id, score in term_scores.items() if plugin_id in scores.keys()
+                    }
+            if len(scores) == 0:
+                break
+
+        if scores is None: # no words in query
+            return []
+
+        key = lambda item: (-item[1], item[0])
+        if limit is not None:
+            return heapq.nsmallest(limit, scores.items(), key = key)
+
+        return sorted(scores.items(), key = key)
+
+    def rebuild(self):
+        "Index all plugins of index from scratch"
+
+        self._postings.clear()
+        self._docs.clear()
+        self._lengths.clear()
+        self._total_length = 0.0
+        self._deletes.clear()
+
+        for plugin in self._index.plugins:
+            self._add_plugin(plugin.id)
+
+        self._terms = sorted(self._postings.keys())
+        for term in self._terms:
+            self._add_deletes(term)
+
+    def close(self):
+        "Stop following index changes"
+
+        self._index.events.unsubscribe(self._index_changed)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER: INDEXING
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _index_changed(self, events):
+
+        plugin_events = [event for event in events if event.kind.startswith('plugin_')]
+        if len(plugin_events) == 0:
+            return
+        if len(plugin_events) > len(self._docs) // 2: # e.g. index rebuild, cheaper from scratch
+            self.rebuild()
+            return
+
+        for event in plugin_events:
+            removed_terms, new_terms = self._remove_plugin(event.target), set()
+            if event.kind != EVENT_PLUGIN_REMOVED:
+                new_terms = self._add_plugin(event.target)
+            self._update_terms(new_terms, removed_terms) # terms in both stay in vocabulary
+
+    def _add_plugin(self, plugin_id):
+        "Returns terms new to vocabulary"
+
+        doc = {}
+        for name, weight in SEARCH_FIELDS.items():
+            for value in self._get_values(plugin_id, name):
+                for term in get_terms(value):
+                    doc[term] = doc.get(term, 0.0) + weight
+
+        new_terms = set()
+        for term, frequency in doc.items():
+            if term not in self._postings.keys():
+                self._postings[term] = {}
+                new_terms.add(term)
+            self._postings[term][plugin_id] = frequency
+
+        self._docs[plugin_id] = doc
+        self._lengths[plugin_id] = sum(doc.values())
+        self._total_length += self._lengths[plugin_id]
+
+        return new_terms
+
+    def _remove_plugin(self, plugin_id):
+        "Returns terms removed from vocabulary"
+
+        if plugin_id not in self._docs.keys():
+            return set()
+
+        removed_terms = set()
+        for term in self._docs.pop(plugin_id).keys():
+            self._postings[term].pop(plugin_id)
+            if len(self._postings[term]) == 0:
+                self._postings.pop(term)
+                removed_terms.add(term)
+
+        self._total_length -= self._lengths.pop(plugin_id)
+
+        return removed_terms
+
+    def _update_terms(self, new_terms, removed_terms):
+
+        for term in new_terms - removed_terms:
+            bisect.insort(self._terms, term)
+            self._add_deletes(term)
+
+        for term in removed_terms - new_terms:
+            position = bisect.bisect_left(self._terms, term)
+            if position < len(self._terms) and self._terms[position] == term:
+                self._terms.pop(position)
+            for variant in _get_deletes(term):
+                variants = self._deletes.get(variant, None)
+                if variants is None:
+                    continue
+                variants.discard(term)
+                if len(variants) == 0:
+                    self._deletes.pop(variant)
+
+    def _add_deletes(self, term):
+
+        if len(term) < SEARCH_TYPO_MIN_LENGTH - 1: # shorter query terms do not tolerate typos
+            return
+
+        for variant in _get_deletes(term):
+            self._deletes.setdefault(variant, set()).add(term)
+
+    def _get_values(self, plugin_id, name):
+        "Distinct values of meta data field over all releases of plugin"
+
+        values = set()
+
+        for release in self._index.get_plugin(plugin_id).available_releases:
+            field = release.meta[name]
+            if field.value_set:
+                values.add(field.value_string)
+
+        return values
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER: QUERIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _get_scores(self, query_term):
+        "Best BM25 score per plugin over all expansions of one query term"
+
+        if len(self._docs) == 0:
+            return {}
+
+        average_length = self._total_length / len(self._docs)
+        scores = {}
+
+        for term, weight in self._expand(query_term).items():
+            postings = self._postings[term]
+            idf = math.log(1.0 + (len(self._docs) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for plugin_id, frequency in postings.items():
+                norm = SEARCH_BM25_K1 * (1.0 - SEARCH_BM25_B + SEARCH_BM25_B * self._lengths[plugin_id] / average_length)
+                score = weight * idf * frequency * (SEARCH_BM25_K1 + 1.0) / (frequency + norm)
+                if score > scores.get(plugin_id, 0.0):
+                    scores[plugin_id] = score
+
+        return scores
+
+    def _expand(self, query_term):
+        "Index terms matching query term, with weights: exact, prefix, one typo"
+
+        expansions = {}
+
+        if len(query_term) >= SEARCH_TYPO_MIN_LENGTH:
+            for variant in _get_deletes(query_term):
+                for term in self._deletes.get(variant, ()):
+                    if _is_one_edit(query_term, term):
+                        expansions[term] = SEARCH_TYPO_WEIGHT
+
+        if len(query_term) >= SEARCH_PREFIX_MIN_LENGTH:
+            start = bisect.bisect_left(self._terms, query_term)
+            end = bisect.bisect_left(self._terms, query_term + '\U0010ffff')
+            for term in heapq.nsmallest(SEARCH_PREFIX_MAX_TERMS, self._terms[start:end], key = len):
+                expansions[term] = SEARCH_PREFIX_WEIGHT
+
+        if query_term in self._postings.keys():
+            expansions[query_term] = 1.0
+
+        return expansions
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def get_terms(text):
+    "Words of text: case-folded, without accents (e.g. 'Géo' -> 'geo')"
+
+    if not isinstance(text, str):
+        raise QgistTypeError(tr('"text" must be a str.'))
+
+    text = ''.join(
+        character for character in unicodedata.normalize('NFKD', text)
+        if not unicodedata.combining(character)
+        )
+
+    return _WORD.findall(text.casefold())
+
+def _get_deletes(term):
+    "Term itself and all variants with one character deleted"
+
+    return {term, *(term[:position] + term[position + 1:] for position in range(len(term)))}
+
+def _is_one_edit(a, b):
+    "Are a and b at most one insertion, deletion, replacement or swap of neighbours apart?"
+
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+
+    if len(a) == len(b):
+        diffs = [position for position in range(len(a)) if a[position] != b[position]]
+        if len(diffs) == 1:
+            return True
+        return (
+            len(diffs) == 2 and diffs[1] == diffs[0] + 1
+            and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]]
+            )
+
+    if len(a) > len(b):
+        a, b = b, a
+    position = 0
+    while position < len(a) and a[position] == b[position]:
+        position += 1
+
+    return a[position:] == b[position + 1:]
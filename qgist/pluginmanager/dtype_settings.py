@@ -30,14 +30,9 @@ specific language governing rights and limitations under the License.
 
 import base64
 import json
+import os
 import zlib
 
-# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-# IMPORT (External Dependencies)
-# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-
-from PyQt5.QtCore import QDate
-
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # IMPORT (Internal)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -64,15 +59,20 @@ class dtype_settings_class:
     Mutable.
     """
 
-    def __init__(self, config, try_qgis_settings = True):
+    def __init__(self, config, try_qgis_settings = True, settings_dir = None):
 
         if not isinstance(config, config_class):
             raise QgistTypeError(tr('config must be an instance of config_class'))
         if not isinstance(try_qgis_settings, bool):
             raise QgistTypeError(tr('try_qgis_settings must be a bool'))
+        if not isinstance(settings_dir, str) and settings_dir is not None:
+            raise QgistTypeError(tr('settings_dir must be a str or None'))
+        if isinstance(settings_dir, str) and not os.path.isdir(settings_dir):
+            raise QgistValueError(tr('settings_dir must be a directory'))
 
         self._config = config
         self._settings = None
+        self._settings_dir = settings_dir # QGIS profile folder, None if taken from QGIS
 
         if not try_qgis_settings:
             return
@@ -109,7 +109,8 @@ class dtype_settings_class:
 
         self._config[name] = value # does internal validity and type checks on value etc
 
-        self._settings.setValue(name, value)
+        if self._settings is not None:
+            self._settings.setValue(name, value)
 
     def get(self, name, default):
         "dict get"
@@ -135,6 +136,17 @@ class dtype_settings_class:
 
         return dtype_settings_group_class(self, root)
 
+    @property
+    def settings_dir(self):
+        "QGIS settings folder, i.e. root of the current QGIS profile"
+
+        if self._settings_dir is not None:
+            return self._settings_dir
+
+        from qgis.core import QgsApplication
+
+        return QgsApplication.qgisSettingsDirPath()
+
     def keys(self):
         "dict keys generator"
 
@@ -158,6 +170,8 @@ class dtype_settings_class:
         if config_class.check_value(data): # valid Python/JSON data type
             return data
 
+        from PyQt5.QtCore import QDate # only QgsSettings produces Qt types, i.e. Qt is present
+
         if isinstance(data, QDate):
             return data.toPyDate().isoformat() # returns date-time iso string
 
@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_transaction.py: Install transaction data type
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import glob
+import json
+import os
+import shutil
+import tempfile
+import time
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .const import (
+    INSTALL_JOURNAL_FN,
+    INSTALL_LOCK_FN,
+    INSTALL_LOCK_TIMEOUT,
+    INSTALL_STAGING_FLD,
+    )
+from .error import QgistInstallFailed
+
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_transaction_class:
+    """
+    Crash-safe transaction of plugin folder changes (install, replace, remove) in one plugin folder
+
+    - New plugin folders are staged in the transaction folder (same file system as plugin folder).
+    - Previous plugin folders are snapshotted as hard-link trees (no byte copies).
+    - The journal is written and fsynced once, then plugin folders are swapped by renaming.
+    - Removing the journal commits the transaction.
+    - Rollback, also after a crash (see `recover`), renames snapshots back into place.
+    - An exclusive lock file per plugin folder is held for the whole transaction, i.e. transactions
+      of other processes wait and `recover` never touches transactions of live processes.
+
+    Mutable.
+    """
+
+    def __init__(self, install_fld):
+
+        if not isinstance(install_fld, str):
+            raise QgistTypeError(tr('"install_fld" must be a str.'))
+
+        self._install_fld = os.path.abspath(install_fld)
+        staging_root_fld = os.path.join(self._install_fld, INSTALL_STAGING_FLD)
+        os.makedirs(staging_root_fld, exist_ok = True)
+
+        self._lock = _acquire_lock(staging_root_fld, INSTALL_LOCK_TIMEOUT)
+        if self._lock is None:
+            raise QgistInstallFailed(tr('Plugin folder is locked by another process') + f': {self._install_fld:s}')
+        try:
+            self._fld = tempfile.mkdtemp(prefix = 'transaction-', dir = staging_root_fld)
+        except OSError:
+            _release_lock(self._lock)
+            raise
+
+        self._operations = {} # by plugin id, in order of adding
+        self._state = 'open' # open -> committed | rolled back | aborted
+
+    def __repr__(self):
+
+        return f'<transaction ({id(self):x}) state={self._state:s} operations={len(self._operations):d}>'
+
+    def __len__(self):
+
+        return len(self._operations)
+
+    def __contains__(self, plugin_id):
+
+        return plugin_id in self._operations.keys()
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def install_fld(self):
+        return self._install_fld
+
+    @property
+    def plugin_ids(self):
+        return (plugin_id for plugin_id in self._operations.keys())
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def _journal_path(self):
+        return os.path.join(self._fld, INSTALL_JOURNAL_FN)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def get_extract_fld(self, plugin_id):
+        "Empty folder inside transaction for extracting a new release of plugin"
+
+        self._check_open()
+        self._check_plugin_id(plugin_id)
+
+        return tempfile.mkdtemp(prefix = f'extract-{plugin_id:s}-', dir = self._fld)
+
+    def add_install(self, plugin_id, new_fld):
+        "Install or replace plugin folder by staged folder (inside transaction folder)"
+
+        self._check_open()
+        self._check_plugin_id(plugin_id)
+        if not isinstance(new_fld, str):
+            raise QgistTypeError(tr('"new_fld" must be a str.'))
+        if os.path.commonpath((self._fld, os.path.abspath(new_fld))) != self._fld:
+            raise QgistValueError(tr('"new_fld" must be staged inside the transaction.'))
+
+        self._operations[plugin_id] = self._get_operation(plugin_id, os.path.abspath(new_fld))
+
+    def add_uninstall(self, plugin_id):
+        "Remove plugin folder"
+
+        self._check_open()
+        self._check_plugin_id(plugin_id)
+        if not os.path.lexists(os.path.join(self._install_fld, plugin_id)):
+            raise QgistValueError(tr('plugin folder does not exist') + f': {plugin_id:s}')
+
+        self._operations[plugin_id] = self._get_operation(plugin_id, None)
+
+    def commit(self):
+        "Snapshot, journal (one fsync), swap - rolls back and raises QgistInstallFailed on failure"
+
+        self._check_open()
+
+        try:
+            for operation in self._operations.values():
+                if os.path.lexists(operation['target']):
+                    _snapshot(operation['target'], operation['snapshot'])
+            self._write_journal()
+        except OSError as e:
+            self.abort()
+            raise QgistInstallFailed(tr('Preparing transaction failed') + f': {str(e):s}')
+
+        try:
+            for operation in self._operations.values():
+                if os.path.lexists(operation['target']):
+                    os.rename(operation['target'], operation['trash'])
+                if operation['new'] is not None:
+                    os.rename(operation['new'], operation['target'])
+        except OSError as e:
+            self._revert()
+            raise QgistInstallFailed(tr('Transaction failed and was rolled back') + f': {str(e):s}')
+
+        os.unlink(self._journal_path) # commit point
+        self._state = 'committed'
+        self._cleanup()
+
+    def abort(self):
+        "Drop transaction before anything was touched"
+
+        self._check_open()
+
+        self._state = 'aborted'
+        self._cleanup()
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _revert(self):
+        "Restore all plugin folders from snapshots, at most two renames each"
+
+        _rollback(self._operations.values())
+        os.unlink(self._journal_path) # journal exists, otherwise nothing would have been touched
+        self._state = 'rolled back'
+        self._cleanup()
+
+    def _get_operation(self, plugin_id, new_fld):
+
+        return {
+            'plugin_id': plugin_id,
+            'target': os.path.join(self._install_fld, plugin_id),
+            'new': new_fld,
+            'snapshot': os.path.join(self._fld, f'snapshot-{plugin_id:s}'),
+            'trash': os.path.join(self._fld, f'trash-{plugin_id:s}'), # previous folder after commit
+            'discard': os.path.join(self._fld, f'discard-{plugin_id:s}'), # new folder after rollback
+            }
+
+    def _write_journal(self):
+
+        with open(self._journal_path, 'w', encoding = 'utf-8') as f:
+            f.write(json.dumps(list(self._operations.values())))
+            f.flush()
+            os.fsync(f.fileno()) # the only fsync of the transaction
+
+    def _cleanup(self):
+
+        shutil.rmtree(self._fld, ignore_errors = True)
+        _release_lock(self._lock) # also released if the process dies, i.e. `recover` may take over
+        self._lock = None
+
+    def _check_open(self):
+
+        if self._state != 'open':
+            raise QgistValueError(tr('transaction is not open') + f': {self._state:s}')
+
+    def _check_plugin_id(self, plugin_id):
+
+        if not isinstance(plugin_id, str):
+            raise QgistTypeError(tr('"plugin_id" must be a str.'))
+        if len(plugin_id) == 0 or os.path.basename(plugin_id) != plugin_id or plugin_id.startswith('.'):
+            raise QgistValueError(tr('"plugin_id" is not a valid folder name.'))
+        if plugin_id in self._operations.keys():
+            raise QgistValueError(tr('transaction already contains an operation on this plugin') + f': {plugin_id:s}')
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS-LEVEL API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @staticmethod
+    def recover(install_fld):
+        """
+        Revert interrupted transactions in plugin folder, i.e. after a crash - before plugins are scanned
+        Transactions are left alone while their plugin folder is locked, i.e. while their process is alive
+        Returns number of reverted transactions
+        """
+
+        if not isinstance(install_fld, str):
+            raise QgistTypeError(tr('"install_fld" must be a str.'))
+
+        staging_root_fld = os.path.join(install_fld, INSTALL_STAGING_FLD)
+        if not os.path.isdir(staging_root_fld):
+            return 0
+
+        try:
+            lock = _acquire_lock(staging_root_fld, 0)
+        except OSError: # e.g. plugin folder of other user, nothing this process could revert anyway
+            return 0
+        if lock is None: # transaction in progress
+            return 0
+
+        try:
+            return _recover(staging_root_fld)
+        finally:
+            _release_lock(lock)
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _recover(staging_root_fld):
+    "Revert transactions in staging folder - requires lock"
+
+    reverted = 0
+
+    for fld in glob.glob(os.path.join(staging_root_fld, 'transaction-*')):
+        journal_path = os.path.join(fld, INSTALL_JOURNAL_FN)
+        if os.path.isfile(journal_path):
+            try:
+                with open(journal_path, 'r', encoding = 'utf-8') as f:
+                    operations = json.loads(f.read())
+            except ValueError: # torn journal: crash before fsync completed, nothing was touched
+                operations = []
+            _rollback(operations)
+            os.unlink(journal_path)
+            reverted += 1
+        shutil.rmtree(fld, ignore_errors = True) # also leftovers of transactions without journal
+
+    return reverted
+
+def _rollback(operations):
+    "Idempotent, works from any intermediate state of a commit - at most two renames per operation"
+
+    for operation in reversed(list(operations)):
+        if all((
+            operation['new'] is not None,
+            os.path.lexists(operation['target']),
+            not os.path.lexists(operation['new']), # new folder was moved into place ...
+            not os.path.lexists(operation['discard']), # ... and was not discarded yet
+            )):
+            os.rename(operation['target'], operation['discard'])
+        if not os.path.lexists(operation['target']) and os.path.lexists(operation['snapshot']):
+            os.rename(operation['snapshot'], operation['target'])
+
+def _snapshot(src, dst):
+    "Hard-link tree of src at dst, falls back to copies where links are not supported"
+
+    if os.path.islink(src): # e.g. plugin under development
+        os.symlink(os.readlink(src), dst)
+        return
+
+    for root, flds, fns in os.walk(src):
+        dst_root = os.path.join(dst, os.path.relpath(root, src))
+        os.makedirs(dst_root, exist_ok = True)
+        shutil.copystat(root, dst_root)
+        for fn in fns:
+            try:
+                os.link(os.path.join(root, fn), os.path.join(dst_root, fn), follow_symlinks = False)
+            except OSError:
+                shutil.copy2(os.path.join(root, fn), os.path.join(dst_root, fn), follow_symlinks = False)
+
+def _acquire_lock(staging_root_fld, timeout):
+    "Exclusive lock on lock file (released by the OS if the process dies), None if not acquired within timeout"
+
+    fd = os.open(os.path.join(staging_root_fld, INSTALL_LOCK_FN), os.O_RDWR | os.O_CREAT, 0o644)
+    deadline = time.monotonic() + timeout
+
+    while True:
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fd
+        except OSError: # held by other process or other transaction
+            if time.monotonic() >= deadline:
+                os.close(fd)
+                return None
+            time.sleep(0.1)
+
+def _release_lock(fd):
+
+    if fd is None:
+        return
+
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
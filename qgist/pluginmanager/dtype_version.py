@@ -104,6 +104,10 @@ class dtype_version_class:
             (a == b) for a, b in zip(self._elements, other._elements)
             ))
 
+    def __hash__(self):
+
+        return hash(self._elements) # equal versions have equal elements
+
     def __ne__(self, other):
 
         return not self.__eq__(other)
@@ -270,7 +274,10 @@ class dtype_version_class:
         if not isinstance(fix_plugin_compatibility, bool):
             raise QgistTypeError(tr('fix_plugin_compatibility must be of type bool'))
 
-        x, y, z = re.findall(r'^(\d*).(\d*).(\d*)', qgis_version_str)[0]
+        # Missing minor and patch numbers are zero, like QGIS does it, i.e. "3.10" is 3.10.0
+        x, y, z = re.match(r'^(\d*)(?:\.(\d*))?(?:\.(\d*))?', qgis_version_str.strip()).groups(default = '')
+        y = y if len(y) > 0 else '0'
+        z = z if len(z) > 0 else '0'
 
         # Return current QGIS version number as X.Y.Z for testing plugin compatibility.
         # If Y = 99, bump up to (X+1.0.0), so e.g. 2.99 becomes 3.0.0
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/dtype_watchdog.py: Folder watchdog data type
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import struct
+import sys
+import time
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .const import (
+    WATCHDOG_INTERVAL,
+    WATCHDOG_PATTERNS,
+    )
+
+from ..error import (
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_IN_MODIFY = 0x00000002
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_CLOSE_WRITE = 0x00000008
+_IN_ISDIR = 0x40000000
+_IN_CLOEXEC = 0o2000000
+_IN_NONBLOCK = 0o4000
+
+_IN_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_IN_EVENT = struct.Struct('iIII') # wd, mask, cookie, len - followed by name
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CLASS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+class dtype_watchdog_class:
+    """
+    Watches a folder tree for changed files (matching patterns) and added or removed folders
+
+    Uses inotify on Linux (no scanning, one non-blocking read per poll) and falls back to comparing
+    modification times and sizes elsewhere. `poll` returns changed paths since its last call, `start`
+    polls from the Qt event loop and hands (debounced) changes to a callback. `depth` limits how
+    many folder levels below `path` are watched, None for all.
+
+    Mutable.
+    """
+
+    def __init__(self, path, patterns = WATCHDOG_PATTERNS, depth = None, use_inotify = True):
+
+        if not isinstance(path, str):
+            raise QgistTypeError(tr('"path" must be a str.'))
+        if not os.path.isdir(path):
+            raise QgistValueError(tr('"path" must be a folder.'))
+        if not isinstance(patterns, tuple) or not all((isinstance(pattern, str) for pattern in patterns)):
+            raise QgistTypeError(tr('"patterns" must be a tuple of str.'))
+        if not isinstance(depth, int) and depth is not None:
+            raise QgistTypeError(tr('"depth" must be an int or None.'))
+        if isinstance(depth, int) and depth < 0:
+            raise QgistValueError(tr('"depth" must not be negative.'))
+        if not isinstance(use_inotify, bool):
+            raise QgistTypeError(tr('"use_inotify" must be a bool.'))
+
+        self._path = os.path.abspath(path)
+        self._patterns = patterns
+        self._depth = depth
+        self._timer = None
+
+        self._fd = None # inotify
+        self._wds = {} # inotify: watch descriptor -> folder
+        self._snapshot = None # polling: file -> (mtime, size)
+
+        if use_inotify and sys.platform.startswith('linux'):
+            self._init_inotify()
+        if self._fd is None:
+            self._snapshot = self._get_snapshot()
+
+    def __repr__(self):
+
+        return f'<watchdog ({id(self):x}) path="{self._path:s}" backend={self.backend:s}>'
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# PROPERTIES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    @property
+    def backend(self):
+        return 'inotify' if self._fd is not None else 'polling'
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def running(self):
+        return self._timer is not None
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# API
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def poll(self):
+        "Changed, created or removed files and folders since last poll (set of absolute paths), does not block"
+
+        if self._fd is not None:
+            return self._poll_inotify()
+
+        snapshot = self._get_snapshot()
+        changed = (snapshot.keys() ^ self._snapshot.keys()) | {
+            path for path in snapshot.keys() & self._snapshot.keys()
+            if snapshot[path] != self._snapshot[path]
+            }
+        self._snapshot = snapshot
+
+        return changed
+
+    def start(self, callback, interval = WATCHDOG_INTERVAL, debounce = 0):
+        """
+        Poll from Qt event loop every `interval` milliseconds, `callback(paths)` is called on changes
+        With `debounce` (milliseconds), changes are collected until nothing changed for that long
+        """
+
+        if not callable(callback):
+            raise QgistTypeError(tr('"callback" must be callable.'))
+        if not isinstance(interval, int) or not isinstance(debounce, int):
+            raise QgistTypeError(tr('"interval" and "debounce" must be int.'))
+        if interval < 1 or debounce < 0:
+            raise QgistValueError(tr('"interval" must be at least 1, "debounce" must not be negative.'))
+        if self._timer is not None:
+            raise QgistValueError(tr('watchdog is already running'))
+
+        from PyQt5.QtCore import QTimer
+
+        pending = set()
+        last_change = [0.0]
+
+        def timeout():
+            changed = self.poll()
+            if len(changed) > 0:
+                pending.update(changed)
+                last_change[0] = time.monotonic()
+            if len(pending) == 0 or (time.monotonic() - last_change[0]) * 1000 < debounce:
+                return
+            paths = pending.copy()
+            pending.clear()
+            callback(paths)
+
+        self._timer = QTimer()
+        self._timer.timeout.connect(timeout)
+        self._timer.start(interval)
+
+    def stop(self):
+
+        if self._timer is None:
+            return
+
+        self._timer.stop()
+        self._timer.deleteLater()
+        self._timer = None
+
+    def close(self):
+        "Stop and release inotify file descriptor"
+
+        self.stop()
+
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            self._wds.clear()
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# HELPER
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+    def _init_inotify(self):
+
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno = True)
+            fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        except (OSError, AttributeError): # no libc or no inotify
+            return
+        if fd < 0:
+            return
+
+        self._libc = libc
+        self._fd = fd
+
+        for fld in self._get_flds(self._path):
+            self._add_watch(fld)
+
+    def _add_watch(self, fld):
+
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(fld), _IN_MASK)
+        if wd >= 0: # folder may be gone already
+            self._wds[wd] = fld
+
+    def _poll_inotify(self):
+
+        changed = set()
+
+        while True:
+            try:
+                buffer = os.read(self._fd, 2 ** 16)
+            except BlockingIOError: # nothing (more) to read
+                break
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, length = _IN_EVENT.unpack_from(buffer, offset)
+                name = os.fsdecode(buffer[offset + _IN_EVENT.size:offset + _IN_EVENT.size + length].rstrip(b'\0'))
+                offset += _IN_EVENT.size + length
+                if wd not in self._wds.keys():
+                    continue
+                path = os.path.join(self._wds[wd], name)
+                if mask & _IN_ISDIR:
+                    if _is_ignored_fld(name) or not self._is_within_depth(path):
+                        continue
+                    changed.add(path)
+                    if mask & (_IN_CREATE | _IN_MOVED_TO):
+                        for fld in self._get_flds(path):
+                            self._add_watch(fld)
+                        changed.update(self._get_snapshot(path).keys()) # files created before watch was added
+                    continue
+                if self._is_matching(name):
+                    changed.add(path)
+
+        return changed
+
+    def _get_snapshot(self, path = None):
+
+        snapshot = {}
+
+        for fld in self._get_flds(self._path if path is None else path):
+            if fld != self._path:
+                snapshot[fld] = None # folders only count as added or removed
+            try:
+                entries = list(os.scandir(fld))
+            except OSError: # removed in the meantime
+                continue
+            for entry in entries:
+                if not entry.is_file() or not self._is_matching(entry.name):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+
+        return snapshot
+
+    def _get_flds(self, path):
+
+        for root, flds, _ in os.walk(path):
+            if not self._is_within_depth(root):
+                flds.clear()
+                continue
+            flds[:] = [fld for fld in flds if not _is_ignored_fld(fld)]
+            yield root
+
+    def _is_within_depth(self, fld):
+
+        if self._depth is None:
+            return True
+
+        relpath = os.path.relpath(fld, self._path)
+
+        return relpath == os.curdir or len(relpath.split(os.sep)) <= self._depth
+
+    def _is_matching(self, name):
+
+        return any((fnmatch.fnmatch(name, pattern) for pattern in self._patterns))
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def _is_ignored_fld(name):
+
+    return name.startswith('.') or name == '__pycache__'
@@ -34,6 +34,15 @@ class QgistRepoError(Exception):
 class QgistInstallFailed(Exception):
     pass
 
+class QgistDownloadError(Exception):
+    pass
+
+class QgistDependencyError(Exception):
+    pass
+
+class QgistPluginLoadError(Exception):
+    pass
+
 class QgistNotADirectoryError(NotADirectoryError):
     pass
 
@@ -51,3 +60,12 @@ class QgistMetaTxtError(Exception):
 
 class QgistPluginIdCollisionError(Exception):
     pass
+
+class QgistIndexStoreError(Exception):
+    pass
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ALL EXCEPTIONS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+QgistPluginManager_ALL_Errors = tuple([v for k, v in globals().items() if k.startswith('Qgist')])
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/loadstats.py: Plugin load timing and memory statistics
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import datetime
+import functools
+import statistics
+import sys
+import time
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .const import LOAD_STATS_TIMES
+
+from ..error import QgistTypeError
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES: RECORDS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def get_load_record(loader):
+    """
+    Empty record of one plugin load, JSON-serializable
+    loader is "qgist" (all phases timed) or "qgis" (loaded by QGIS, import and total time at best)
+    """
+
+    if not isinstance(loader, str):
+        raise QgistTypeError(tr('"loader" must be a str.'))
+
+    record = {name: None for name in LOAD_STATS_TIMES}
+    record.update({
+        'loader': loader,
+        'started': datetime.datetime.now().isoformat(timespec = 'seconds'),
+        'peak_memory_delta': None, # bytes
+        })
+
+    return record
+
+def check_load_record(record):
+
+    if not isinstance(record, dict):
+        raise QgistTypeError(tr('load record must be a dict.'))
+    if not all((isinstance(record.get(name, None), (int, float, type(None))) for name in LOAD_STATS_TIMES)):
+        raise QgistTypeError(tr('times in load record must be numbers or None.'))
+
+def get_peak_memory():
+    "Peak resident memory of process in bytes, None if unknown (e.g. Windows) - one cheap syscall"
+
+    try:
+        import resource
+    except ModuleNotFoundError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return peak if sys.platform == 'darwin' else peak * 1024 # kilobytes on Linux & BSD
+
+def get_memory_delta(peak_before):
+
+    if peak_before is None:
+        return None
+
+    return get_peak_memory() - peak_before
+
+def get_summary(records):
+    "Medians over history of load records, loads and last load time"
+
+    summary = {'loads': len(records)}
+
+    for name in (*LOAD_STATS_TIMES, 'peak_memory_delta'):
+        values = [record[name] for record in records if record.get(name, None) is not None]
+        summary[name] = statistics.median(values) if len(values) > 0 else None
+
+    summary['last'] = records[-1]['started'] if len(records) > 0 else None
+
+    return summary
+
+def parse_qgis_plugin_time(value):
+    "`qgis.utils.plugin_times` holds str like `0.123456s`, None if it can not be parsed"
+
+    if not isinstance(value, str) or not value.endswith('s'):
+        return None
+
+    try:
+        return float(value[:-1])
+    except ValueError:
+        return None
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES: QGIS HOOKS
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def hook_qgis_loader(callback):
+    """
+    Times plugins which QGIS loads itself (`qgis.utils.loadPlugin` and `startPlugin`) from now on
+    `callback(plugin_id, record)` is called after every successful start. Undo with `unhook_qgis_loader`
+    """
+
+    if not callable(callback):
+        raise QgistTypeError(tr('"callback" must be callable.'))
+
+    from qgis import utils
+
+    unhook_qgis_loader()
+
+    records = {} # by plugin id, between import and start
+
+    @functools.wraps(utils.loadPlugin)
+    def loadPlugin(packageName):
+        record = get_load_record('qgis')
+        peak_before = get_peak_memory()
+        start = time.perf_counter()
+        result = loadPlugin.__wrapped__(packageName)
+        record['import'] = time.perf_counter() - start
+        record['peak_memory_delta'] = get_memory_delta(peak_before)
+        records[packageName] = record
+        return result
+
+    @functools.wraps(utils.startPlugin)
+    def startPlugin(packageName):
+        record = records.pop(packageName, None) or get_load_record('qgis')
+        peak_before = get_peak_memory()
+        start = time.perf_counter()
+        result = startPlugin.__wrapped__(packageName)
+        if result:
+            record['total'] = (record['import'] or 0.0) + time.perf_counter() - start
+            delta = get_memory_delta(peak_before)
+            if delta is not None:
+                record['peak_memory_delta'] = (record['peak_memory_delta'] or 0) + delta
+            callback(packageName, record)
+        return result
+
+    utils.loadPlugin = loadPlugin
+    utils.startPlugin = startPlugin
+
+def unhook_qgis_loader():
+
+    from qgis import utils
+
+    for name in ('loadPlugin', 'startPlugin'):
+        setattr(utils, name, get_unhooked(getattr(utils, name)))
+
+def get_unhooked(func):
+    "Original `qgis.utils` function, i.e. plugin manager does not time its own loads twice"
+
+    return getattr(func, '__wrapped__', func)
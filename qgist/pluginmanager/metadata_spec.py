@@ -191,11 +191,11 @@ METADATA_FIELDS_SPEC = (
     #     'dtype': str,
     #     'name': 'zip_repository',
     # }, # TODO
-    # {
-    #     'comment': 'url for downloading the plugin',
-    #     'dtype': str,
-    #     'name': 'download_url',
-    # },
+    {
+        'comment': 'url for downloading the plugin',
+        'dtype': str,
+        'name': 'download_url',
+    },
     # {
     #     'comment': 'the zip file name to be unzipped after downloaded',
     #     'dtype': str,
@@ -259,5 +259,12 @@ METADATA_FIELDS_SPEC = (
         'importer': dtype_settings_class.str_to_bool,
         'exporter': dtype_settings_class.bool_to_str,
         'name': 'server',
+        'default_value': False,
     },
 )
+
+METADATA_XML_FIELDS = { # plugins.xml field names which differ from metadata.txt field names
+    'author_name': 'author',
+    'qgis_minimum_version': 'qgisMinimumVersion',
+    'qgis_maximum_version': 'qgisMaximumVersion',
+}
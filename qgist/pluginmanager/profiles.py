@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/profiles.py: Headless operations on (many) QGIS profiles
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Python Standard Library)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import os
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .const import CONFIG_FN
+from .dtype_index import dtype_index_class
+from .dtype_settings import dtype_settings_class
+from .dtype_version import dtype_version_class
+from .error import QgistPluginManager_ALL_Errors
+
+from ..config import (
+    config_class,
+    get_config_path,
+    )
+from ..error import (
+    Qgist_ALL_Errors,
+    QgistTypeError,
+    QgistValueError,
+    )
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# CONST
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_ERRORS = (*Qgist_ALL_Errors, *QgistPluginManager_ALL_Errors)
+_SYNC_ERRORS = (*_ERRORS, OSError) # per profile, e.g. folders of other users or failing transactions
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES: SINGLE PROFILE
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def get_profile_index(profile_fld, qgis_version_str = None):
+    "Index of QGIS profile without QGIS settings, i.e. only from QGIST configuration"
+
+    if not isinstance(profile_fld, str):
+        raise QgistTypeError(tr('"profile_fld" must be a str.'))
+    if not os.path.isdir(profile_fld):
+        raise QgistValueError(tr('"profile_fld" must be a directory.'))
+    if not isinstance(qgis_version_str, str) and qgis_version_str is not None:
+        raise QgistTypeError(tr('"qgis_version_str" must be a str or None.'))
+
+    profile_fld = os.path.abspath(profile_fld)
+
+    config = dtype_settings_class(
+        config_class(os.path.join(get_config_path(profile_fld), CONFIG_FN)),
+        try_qgis_settings = False,
+        settings_dir = profile_fld,
+        )
+
+    return dtype_index_class(
+        config = config,
+        qgis_version = (
+            dtype_version_class.from_qgisversion(qgis_version_str, fix_plugin_compatibility = True)
+            if qgis_version_str is not None else None
+            ),
+        )
+
+def get_profile_diff(index, desired):
+    """
+    Compares installed plugins against a desired plugin set, i.e. a dict of plugin id and version str.
+    A version of None stands for latest release (respecting QGIS version and index filters).
+    Returns dict of target releases by plugin id (missing and outdated), unknown plugins (extra) and errors
+    """
+
+    if not isinstance(index, dtype_index_class):
+        raise QgistTypeError(tr('"index" must be an index.'))
+    if not isinstance(desired, dict):
+        raise QgistTypeError(tr('"desired" must be a dict.'))
+    if not all((isinstance(plugin_id, str) for plugin_id in desired.keys())):
+        raise QgistTypeError(tr('All plugin ids in "desired" must be str.'))
+    if not all(((isinstance(version, str) or version is None) for version in desired.values())):
+        raise QgistTypeError(tr('All versions in "desired" must be str or None.'))
+
+    missing, outdated, errors = {}, {}, {}
+
+    for plugin_id, version_str in desired.items():
+        try:
+            plugin = index.get_plugin(plugin_id)
+            target_release = (
+                index.get_latest_release(plugin_id)
+                if version_str is None else
+                plugin.get_release(dtype_version_class.from_pluginversion(version_str))
+                )
+        except _ERRORS as e:
+            errors[plugin_id] = _error_to_str(e)
+            continue
+        if target_release is None:
+            errors[plugin_id] = tr('No matching release')
+            continue
+        if not plugin.installed:
+            missing[plugin_id] = target_release
+        elif plugin.installed_release.version != target_release.version: # pinned versions may be downgrades
+            outdated[plugin_id] = target_release
+
+    extra = [
+        plugin.id for plugin in index.get_all_installed_plugins()
+        if plugin.id not in desired.keys() and not plugin.protected
+        ]
+
+    return {
+        'missing': missing,
+        'outdated': outdated,
+        'extra': sorted(extra),
+        'errors': errors,
+        }
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES: MANY PROFILES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def find_profiles(patterns):
+    "Expands glob patterns (e.g. `/home/*/.local/share/QGIS/QGIS3/profiles/*`) to profile folders"
+
+    if not isinstance(patterns, list) and not isinstance(patterns, tuple):
+        raise QgistTypeError(tr('"patterns" must be a list or tuple.'))
+    if not all((isinstance(pattern, str) for pattern in patterns)):
+        raise QgistTypeError(tr('All patterns must be str.'))
+
+    return sorted({
+        os.path.abspath(path)
+        for pattern in patterns
+        for path in glob.glob(os.path.expanduser(pattern))
+        if os.path.isdir(path)
+        })
+
+def sync_profiles(profile_flds, desired, repos_dumped, qgis_version_str = None, apply = False, jobs = 1):
+    """
+    Diffs many profiles against a desired plugin set and optionally applies installs and upgrades.
+    Profiles are processed in a pool of `jobs` processes. Repositories are not fetched per profile:
+    releases of repos with matching URLs are taken from `repos_dumped` (`dtype_index_class.dump_repos`).
+    Returns one result dict per profile, in order of `profile_flds`
+    """
+
+    if not isinstance(profile_flds, list):
+        raise QgistTypeError(tr('"profile_flds" must be a list.'))
+    if not isinstance(repos_dumped, dict):
+        raise QgistTypeError(tr('"repos_dumped" must be a dict.'))
+    if not isinstance(apply, bool):
+        raise QgistTypeError(tr('"apply" must be a bool.'))
+    if not isinstance(jobs, int):
+        raise QgistTypeError(tr('"jobs" must be an int.'))
+    if jobs < 1:
+        raise QgistValueError(tr('"jobs" must be at least 1.'))
+
+    tasks = [
+        (profile_fld, desired, repos_dumped, qgis_version_str, apply)
+        for profile_fld in profile_flds
+        ]
+
+    if jobs == 1 or len(tasks) < 2: # no pool overhead, easier to debug
+        return [_sync_profile(*task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers = jobs) as executor:
+        return list(executor.map(_sync_profile, *zip(*tasks)))
+
+def _sync_profile(profile_fld, desired, repos_dumped, qgis_version_str, apply):
+    "Worker: one profile - must not raise, errors are part of the result"
+
+    result = {
+        'profile': profile_fld,
+        'missing': [],
+        'outdated': [],
+        'extra': [],
+        'targets': {},
+        'applied': [],
+        'errors': {},
+        }
+
+    try:
+        index = get_profile_index(profile_fld, qgis_version_str)
+        index.load_repos(repos_dumped)
+        diff = get_profile_diff(index, desired)
+    except _SYNC_ERRORS as e:
+        result['errors'][''] = _error_to_str(e)
+        return result
+
+    result['missing'] = sorted(diff['missing'].keys())
+    result['outdated'] = sorted(diff['outdated'].keys())
+    result['extra'] = diff['extra']
+    result['errors'].update(diff['errors'])
+    result['targets'] = {
+        plugin_id: release.version.original
+        for plugin_id, release in (*diff['missing'].items(), *diff['outdated'].items())
+        }
+
+    if not apply:
+        return result
+
+    try:
+        errors = index.install_releases([*diff['missing'].values(), *diff['outdated'].values()])
+    except _SYNC_ERRORS as e:
+        result['errors'][''] = _error_to_str(e)
+        return result
+
+    result['errors'].update({plugin_id: _error_to_str(e) for plugin_id, e in errors.items()})
+    result['applied'] = sorted(result['targets'].keys() - errors.keys())
+
+    return result
+
+def _error_to_str(exception):
+
+    if isinstance(exception, OSError): # first argument is errno
+        return str(exception)
+
+    return str(exception.args[0]) if len(exception.args) > 0 else type(exception).__name__
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+"""
+
+QGIST PLUGIN MANAGER
+QGIS Plugin for Managing QGIS Plugins
+https://github.com/qgist/pluginmanager
+
+    qgist/pluginmanager/snapshots.py: Snapshots of repo releases and changes between them
+
+    Copyright (C) 2017-2020 QGIST project <info@qgist.org>
+
+<LICENSE_BLOCK>
+The contents of this file are subject to the GNU General Public License
+Version 2 ("GPL" or "License"). You may not use this file except in
+compliance with the License. You may obtain a copy of the License at
+https://www.gnu.org/licenses/old-licenses/gpl-2.0.txt
+https://github.com/qgist/pluginmanager/blob/master/LICENSE
+
+Software distributed under the License is distributed on an "AS IS" basis,
+WITHOUT WARRANTY OF ANY KIND, either express or implied. See the License for the
+specific language governing rights and limitations under the License.
+</LICENSE_BLOCK>
+
+"""
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# IMPORT (Internal)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+from .const import (
+    CHANGE_KINDS,
+    CHANGE_NEW_PLUGIN,
+    CHANGE_NEW_VERSION,
+    CHANGE_REMOVED_PLUGIN,
+    CHANGE_REMOVED_RELEASE,
+    )
+from .dtype_index import dtype_index_class
+
+from ..error import QgistTypeError
+from ..util import tr
+
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# ROUTINES
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+def get_snapshot(index):
+    """
+    Releases of every repo as frozenset of (plugin id, version str) by repo id, e.g. before a refresh
+    Releases are not referenced, i.e. a snapshot stays valid (and small) while repos are refreshed.
+    """
+
+    if not isinstance(index, dtype_index_class):
+        raise QgistTypeError(tr('"index" must be a "dtype_index_class" object.'))
+
+    return {
+        repo.id: frozenset((release.id, release.version.original) for release in repo.plugin_releases)
+        for repo in index.repos
+        }
+
+def get_changes(before, after):
+    """
+    Changes between two snapshots (see `get_snapshot`), JSON-serializable, one row per release
+    Set differences by (plugin id, version str) per repo, i.e. releases are never compared pairwise.
+    Rows are sorted by repo id, plugin id, kind of change (see `CHANGE_KINDS`) and version.
+    """
+
+    _check_snapshot(before, 'before')
+    _check_snapshot(after, 'after')
+
+    changes = []
+
+    for repo_id in before.keys() | after.keys():
+        releases_before = before.get(repo_id, frozenset())
+        releases_after = after.get(repo_id, frozenset())
+        if releases_before == releases_after:
+            continue
+        added, removed = releases_after - releases_before, releases_before - releases_after
+        ids_before = {plugin_id for plugin_id, _ in releases_before}
+        ids_after = {plugin_id for plugin_id, _ in releases_after}
+        changes.extend(
+            (repo_id, plugin_id, CHANGE_NEW_VERSION if plugin_id in ids_before else CHANGE_NEW_PLUGIN, version)
+            for plugin_id, version in added
+            )
+        changes.extend(
+            (repo_id, plugin_id, CHANGE_REMOVED_RELEASE if plugin_id in ids_after else CHANGE_REMOVED_PLUGIN, version)
+            for plugin_id, version in removed
+            )
+
+    kind_order = {kind: position for position, kind in enumerate(CHANGE_KINDS)}
+    changes.sort(key = lambda change: (change[0], change[1].lower(), kind_order[change[2]], change[3]))
+
+    return [
+        {'repo': repo_id, 'change': kind, 'id': plugin_id, 'version': version}
+        for repo_id, plugin_id, kind, version in changes
+        ]
+
+def _check_snapshot(snapshot, name):
+
+    if not isinstance(snapshot, dict):
+        raise QgistTypeError(tr('Snapshot must be a dict.') + f' ({name:s})')
+    if not all((isinstance(releases, (set, frozenset)) for releases in snapshot.values())):
+        raise QgistTypeError(tr('Releases of snapshot must be sets.') + f' ({name:s})')
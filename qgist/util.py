@@ -30,17 +30,6 @@ specific language governing rights and limitations under the License.
 
 import os
 
-# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-# IMPORT (External Dependencies)
-# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
-
-from PyQt5.QtCore import (
-    QCoreApplication,
-    QSettings,
-    QTranslator,
-)
-from PyQt5.QtWidgets import QApplication
-
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # IMPORT (Internal Dependencies)
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -50,6 +39,13 @@ from .error import (
     QgistTypeError,
     )
 
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+# STATE (Lazy Qt Imports)
+# +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+_UNRESOLVED = object()
+_translate_func = _UNRESOLVED
+
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 # ROUTINES: TRANSLATION
 # +++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
@@ -68,6 +64,12 @@ def setupTranslation(translationsPath):
             raise QgistTranslationError('Translation not found: %s' % outPath)
         return outPath
 
+    from PyQt5.QtCore import (
+        QCoreApplication,
+        QSettings,
+        QTranslator,
+    )
+
     userLocale = str(QSettings().value('locale/userLocale'))
     if '_' in userLocale:
         language, region = userLocale.split('_')
@@ -93,7 +95,11 @@ def translate(context, key): # OLD API
     http://pyqt.sourceforge.net/Docs/PyQt5/i18n.html#differences-between-pyqt5-and-qt
     """
 
-    return QApplication.translate(context, key)
+    translate_func = _get_translate_func()
+    if translate_func is None:
+        return key
+
+    return translate_func(context, key)
 
 def tr(key, context = 'global'): # NEW API
     """
@@ -106,4 +112,26 @@ def tr(key, context = 'global'): # NEW API
     if not isinstance(context, str):
         raise QgistTypeError('context must be str')
 
-    return QApplication.translate(context, key)
+    translate_func = _get_translate_func()
+    if translate_func is None:
+        return key
+
+    return translate_func(context, key)
+
+def _get_translate_func():
+    """
+    Lazily imports Qt's translation routine on first use.
+    Returns None if PyQt is not importable (headless / worker processes).
+    """
+
+    global _translate_func
+
+    if _translate_func is _UNRESOLVED:
+        try:
+            from PyQt5.QtWidgets import QApplication
+        except ModuleNotFoundError:
+            _translate_func = None
+        else:
+            _translate_func = QApplication.translate
+
+    return _translate_func